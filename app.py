@@ -2,16 +2,40 @@
 GA-SF Mapping Streamlit Application
 Main application file with auth, tabs for GA-SF and NE mapped data, BQ reset with password
 """
+import time
+import uuid
+
+import numpy as np
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 
 from modules.config import SF_REQUIRED_COLUMNS, BQ_TABLE_GA_SF, BQ_TABLE_GA_SF_NE, BQ_TABLE_BHK
-from modules.ga4_client import get_ga4_client
-from modules.data_processor import process_ga_data, map_ne_data, map_bhk_data, get_bimonth_date_range
-from modules.bigquery_manager import upload_ga_sf_data, upload_ga_sf_ne_data, upload_bhk_data, reset_table
+from modules.ga4_client import GA4Client, get_ga4_client
+from modules.ga4_cache import get_ga4_result_cache
+from modules.dataset_registry import get_dataset_registry
+from modules.incremental import get_bucket_state_store
+from modules.bigquery_manager import (
+    upload_ga_sf_data, upload_ga_sf_ne_data, upload_bhk_data, reset_table, get_table_metadata_cache,
+    estimate_upload
+)
 from modules.auth import Authenticator
 from modules.email_alerts import send_security_alert
+from modules.exporter import EXPORT_FORMATS, filter_fingerprint, open_export
+from modules.data_grid import PAGE_SIZE_OPTIONS, page_count, sort_positions, get_page
+from modules.job_runner import get_job_runner, JOB_COMPLETED, JOB_CANCELLED
+from modules.pipeline import run_fetch_and_process, map_ne_into_dataset, map_bhk_into_dataset
+from modules.backfill import run_backfill
+from modules.refresh_scheduler import get_refresh_scheduler, remember_inputs
+from modules.snapshots import save_snapshot, restore_snapshot, list_snapshots
+from modules.sf_delta import select_changed_rows
+from modules.upload_ledger import get_upload_ledger
+from modules.upload_telemetry import summarize_steps
+
+
+FETCH_JOB_NAME = "Fetch & Process Data"
+BACKFILL_JOB_NAME = "Backfill"
+BACKFILL_TARGET_LABELS = {'ga_sf': "GA-SF", 'ne': "NE", 'bhk': "BHK"}
 
 
 # Page Configuration
@@ -126,36 +150,41 @@ def display_percentage_card(label: str, value: float, color: str = "#10b981"):
     """, unsafe_allow_html=True)
 
 
-def apply_filters(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
-    """Apply filters to DataFrame"""
-    filtered_df = df.copy()
+def filter_positions(df: pd.DataFrame, filters: dict) -> np.ndarray:
+    """
+    Evaluate filters as a boolean mask and return the matching row positions.
+    The frame itself is never copied, so the result can be reused for
+    metrics, paging, sorting and exports.
+    """
+    mask = np.ones(len(df), dtype=bool)
     
     # Date filter
     if filters.get('start_date') and filters.get('end_date'):
-        filtered_df['Date'] = pd.to_datetime(filtered_df['Date'])
+        dates = pd.to_datetime(df['Date'])
         start = pd.Timestamp(filters['start_date'])
         end = pd.Timestamp(filters['end_date'])
-        filtered_df = filtered_df[(filtered_df['Date'] >= start) & (filtered_df['Date'] <= end)]
+        mask &= ((dates >= start) & (dates <= end)).to_numpy()
     
-    # Campaign filter (multiselect)
-    if filters.get('campaigns') and 'Final_Source' in filtered_df.columns:
-        if len(filters['campaigns']) > 0:
-            filtered_df = filtered_df[filtered_df['Final_Source'].isin(filters['campaigns'])]
-    
-    # Source Medium filter (multiselect)
-    if filters.get('source_mediums') and 'Source_Medium' in filtered_df.columns:
-        if len(filters['source_mediums']) > 0:
-            filtered_df = filtered_df[filtered_df['Source_Medium'].isin(filters['source_mediums'])]
+    # Multiselect filters: filter key -> column
+    multiselect_columns = {
+        'campaigns': 'Final_Source',
+        'source_mediums': 'Source_Medium',
+        'operating_systems': 'Operating_System',
+        'shifting_types': 'Shifting_Type',
+    }
+    for filter_key, column in multiselect_columns.items():
+        if filters.get(filter_key) and column in df.columns:
+            mask &= df[column].isin(filters[filter_key]).to_numpy()
     
-    # Operating System filter (multiselect)
-    if filters.get('operating_systems') and 'Operating_System' in filtered_df.columns:
-        if len(filters['operating_systems']) > 0:
-            filtered_df = filtered_df[filtered_df['Operating_System'].isin(filters['operating_systems'])]
+    return np.flatnonzero(mask)
+
+
+def apply_filters(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
+    """Apply filters to DataFrame"""
+    filtered_df = df.iloc[filter_positions(df, filters)].copy()
     
-    # Shifting Type filter (multiselect)
-    if filters.get('shifting_types') and 'Shifting_Type' in filtered_df.columns:
-        if len(filters['shifting_types']) > 0:
-            filtered_df = filtered_df[filtered_df['Shifting_Type'].isin(filters['shifting_types'])]
+    if filters.get('start_date') and filters.get('end_date'):
+        filtered_df['Date'] = pd.to_datetime(filtered_df['Date'])
     
     return filtered_df
 
@@ -187,6 +216,90 @@ def calculate_metrics(df: pd.DataFrame) -> dict:
     return metrics
 
 
+def mark_data_changed():
+    """Give the session's data a new version so cached exports are not reused"""
+    st.session_state.dataset_version = uuid.uuid4().hex
+
+
+def render_export_controls(df: pd.DataFrame, filters: dict, file_prefix: str, key: str):
+    """
+    Render an export format picker and a deferred download button.
+    Filtering and file generation only happen when the user clicks download
+    and no export for the same data, filters and format is cached.
+    """
+    export_format = st.selectbox(
+        "Export format",
+        list(EXPORT_FORMATS.keys()),
+        key=f"export_format_{key}",
+        label_visibility="collapsed"
+    )
+    export_info = EXPORT_FORMATS[export_format]
+    dataset_key = f"{key}_{st.session_state.dataset_version}"
+    
+    st.download_button(
+        label="📥 Download",
+        data=lambda: open_export(lambda: apply_filters(df, filters), dataset_key, filters, export_format),
+        file_name=f"{file_prefix}_{datetime.now().strftime('%Y%m%d')}.{export_info['extension']}",
+        mime=export_info['mime'],
+        on_click="ignore",
+        key=f"download_{key}",
+        width="stretch"
+    )
+
+
+def render_data_grid(df: pd.DataFrame, positions: np.ndarray, filters: dict, key: str):
+    """
+    Render one page of filtered rows with column selection and server-side sorting.
+    Only the current page of visible columns is sent to the browser.
+    """
+    all_columns = list(df.columns)
+    
+    control_cols = st.columns([3, 2, 1, 1])
+    with control_cols[0]:
+        visible_columns = st.multiselect(
+            "Visible Columns", all_columns, default=all_columns, key=f"grid_columns_{key}"
+        )
+    with control_cols[1]:
+        sort_column = st.selectbox("Sort By", ["(none)"] + all_columns, key=f"grid_sort_{key}")
+    with control_cols[2]:
+        sort_order = st.selectbox("Order", ["Ascending", "Descending"], key=f"grid_order_{key}")
+    with control_cols[3]:
+        page_size = st.selectbox("Rows per Page", PAGE_SIZE_OPTIONS, index=1, key=f"grid_page_size_{key}")
+    
+    if not visible_columns:
+        st.info("Select at least one column to display.")
+        return
+    
+    # Reuse the sorted order while only the page changes
+    sort_column = None if sort_column == "(none)" else sort_column
+    sort_key = (st.session_state.dataset_version, filter_fingerprint(filters), sort_column, sort_order)
+    cache_key = f"grid_sorted_{key}"
+    cached = st.session_state.get(cache_key)
+    if cached is not None and cached[0] == sort_key:
+        ordered = cached[1]
+    else:
+        ordered = sort_positions(df, positions, sort_column, sort_order == "Ascending")
+        st.session_state[cache_key] = (sort_key, ordered)
+    
+    total_pages = page_count(len(ordered), page_size)
+    page_key = f"grid_page_{key}"
+    if st.session_state.get(page_key, 1) > total_pages:
+        st.session_state[page_key] = total_pages
+    
+    page_df = get_page(df, ordered, visible_columns, st.session_state.get(page_key, 1), page_size)
+    st.dataframe(page_df, width="stretch", height=400)
+    
+    nav_cols = st.columns([1, 3])
+    with nav_cols[0]:
+        page = st.number_input(
+            f"Page (of {total_pages:,})", min_value=1, max_value=total_pages, step=1, key=page_key
+        )
+    with nav_cols[1]:
+        first_row = (page - 1) * page_size + 1
+        last_row = min(page * page_size, len(ordered))
+        st.caption(f"Showing rows {first_row:,}–{last_row:,} of {len(ordered):,}")
+
+
 def handle_reset_with_password(table_name: str, table_display_name: str):
     """Handle BQ table reset with password protection and email alerts"""
     user_email = st.session_state.get('user_email', 'Unknown')
@@ -203,6 +316,23 @@ def handle_reset_with_password(table_name: str, table_display_name: str):
         st.error("🔒 You have been locked out due to too many failed attempts. Contact administrator.")
         return
     
+    # Whole table, or only the rows dated in a range (e.g. one bad month)
+    scope = st.radio(
+        "Reset scope", ["Whole table", "Date range"], horizontal=True, key=f"reset_scope_{table_name}"
+    )
+    start_date = end_date = None
+    if scope == "Date range":
+        date_range = st.date_input(
+            "Delete rows dated",
+            value=(datetime.now().date().replace(day=1), datetime.now().date()),
+            key=f"reset_range_{table_name}"
+        )
+        if len(date_range) != 2:
+            st.info("Select a start and an end date.")
+            return
+        start_date, end_date = date_range
+        st.caption(f"Only rows dated {start_date} to {end_date} will be deleted; the rest of the table is kept.")
+
     # Password input
     password = st.text_input(
         f"Enter reset password for {table_display_name}:", 
@@ -219,7 +349,7 @@ def handle_reset_with_password(table_name: str, table_display_name: str):
                 # Reset successful
                 st.session_state[attempt_key] = 0
                 with st.spinner(f"Resetting {table_display_name}..."):
-                    success, message = reset_table(table_name)
+                    success, message = reset_table(table_name, start_date, end_date)
                     if success:
                         st.success(f"✅ {message}")
                     else:
@@ -247,237 +377,584 @@ def handle_reset_with_password(table_name: str, table_display_name: str):
             st.rerun()
 
 
-def main():
-    # Initialize authenticator
-    auth = Authenticator()
+@st.fragment
+def render_sidebar():
+    """
+    Sidebar controls (date range, uploads, processing actions).
+    Runs as a fragment so uploads and date edits don't redraw the dashboard;
+    actions that change the data trigger a full app rerun.
+    """
+    st.header("📅 Date Range")
     
-    # Check authentication using Streamlit's built-in auth
-    if not auth.is_authenticated():
-        auth.show_login_page()
-        return
+    default_end = datetime.now() - timedelta(days=1)
+    default_start = default_end - timedelta(days=30)
     
-    # Get user email and check domain access
-    user_email = auth.get_user_email()
-    if not auth.check_email_access(user_email):
-        st.error(f"❌ Access denied for {user_email}")
-        st.warning("Your email domain is not authorized to use this application.")
-        st.button("🚪 Logout", on_click=st.logout)
-        return
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("Start Date", value=default_start, max_value=datetime.now(), key="start_date")
+    with col2:
+        end_date = st.date_input("End Date", value=default_end, max_value=datetime.now(), key="end_date")
     
-    # Store user email in session state for security alerts
-    st.session_state.user_email = user_email
+    render_scheduler_status()
     
-    # Show user info in sidebar
-    auth.show_user_info()
+    st.markdown("---")
+    st.header("📁 File Uploads")
+    
+    # Salesforce file upload
+    sf_file = st.file_uploader(
+        "Upload Salesforce CSV", 
+        type=['csv'],
+        help="Required columns: " + ", ".join(SF_REQUIRED_COLUMNS)
+    )
+    
+    # NE file upload (optional)
+    ne_file = st.file_uploader(
+        "Upload NE Data (Optional)", 
+        type=['csv'],
+        help="File with DATE, Customer_Type, Mobile columns"
+    )
+    
+    # BHK file upload (optional)
+    bhk_file = st.file_uploader(
+        "Upload BHK Data (Optional)", 
+        type=['csv'],
+        help="File with OPP_CREATED_DATE, Mobile, PACKAGE_NAME columns"
+    )
     
-    st.title("📊 GA-SF Data Mapping Dashboard")
     st.markdown("---")
     
-    # Initialize session state
-    if 'ga_sf_data' not in st.session_state:
-        st.session_state.ga_sf_data = None
-    if 'ga_sf_ne_data' not in st.session_state:
-        st.session_state.ga_sf_ne_data = None
-    if 'ga_sf_bhk_data' not in st.session_state:
-        st.session_state.ga_sf_bhk_data = None
-    if 'data_loaded' not in st.session_state:
+    # Fetch Data button (runs on a background worker so reruns don't lose the work)
+    fetch_running = st.session_state.get('fetch_job_id') is not None
+    if st.button("🔄 Fetch & Process Data", type="primary", width="stretch", disabled=fetch_running):
+        if sf_file is None:
+            st.error("Please upload Salesforce CSV file first!")
+        elif start_date > end_date:
+            st.error("End date must be after start date!")
+        else:
+            try:
+                sf_bytes = sf_file.getvalue()
+                ne_bytes = ne_file.getvalue() if ne_file is not None else None
+                bhk_bytes = bhk_file.getvalue() if bhk_file is not None else None
+                job = get_job_runner().submit(
+                    FETCH_JOB_NAME,
+                    run_fetch_and_process,
+                    get_ga4_client(),
+                    start_date,
+                    end_date,
+                    sf_bytes,
+                    ne_bytes,
+                    bhk_bytes,
+                    owner=st.session_state.user_email
+                )
+                st.session_state.fetch_job_id = job.job_id
+                if get_refresh_scheduler() is not None:
+                    # Scheduled refreshes reuse the most recent uploads
+                    remember_inputs(sf_bytes, ne_bytes, bhk_bytes)
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error processing data: {str(e)}")
+    
+    # Outcome of the last background fetch
+    notice = st.session_state.pop('fetch_job_notice', None)
+    if notice is not None:
+        level, message, warnings = notice
+        getattr(st, level)(message)
+        for warning in warnings:
+            st.error(warning)
+    
+    # Separate button to process NE data (when GA-SF is already loaded)
+    if st.session_state.data_loaded and st.session_state.dataset is not None:
+        if st.button("📁 Map NE Data", width="stretch"):
+            if ne_file is None:
+                st.error("Please upload NE data file first!")
+            else:
+                with st.spinner("Mapping NE data..."):
+                    try:
+                        # BHK columns are keyed on the base rows, so the BHK view
+                        # picks up the new NE columns without being remapped
+                        map_ne_into_dataset(st.session_state.dataset, ne_file.getvalue())
+                        save_dataset_snapshot(st.session_state.dataset)
+                        mark_data_changed()
+                        st.success("NE data mapped successfully!")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error mapping NE data: {str(e)}")
+                        
+    # Separate button to process BHK data
+    if st.session_state.data_loaded and st.session_state.dataset is not None:
+        if st.button("📦 Map BHK Data", width="stretch"):
+            if bhk_file is None:
+                st.error("Please upload BHK data file first!")
+            else:
+                with st.spinner("Mapping BHK data..."):
+                    try:
+                        map_bhk_into_dataset(st.session_state.dataset, bhk_file.getvalue())
+                        save_dataset_snapshot(st.session_state.dataset)
+                        mark_data_changed()
+                        st.success("BHK data mapped successfully!")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error mapping BHK data: {str(e)}")
+    
+    render_backfill_controls(sf_file, ne_file, bhk_file)
+    render_snapshot_restore()
+    
+    # Clear cache button
+    if st.button("🗑️ Clear Cache", width="stretch"):
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        get_ga4_result_cache().clear()
+        get_dataset_registry().clear()
+        get_bucket_state_store().clear()
+        get_table_metadata_cache().invalidate()
+        get_upload_ledger().invalidate()
+        st.session_state.dataset = None
         st.session_state.data_loaded = False
-    if 'show_reset_ga_sf' not in st.session_state:
-        st.session_state.show_reset_ga_sf = False
-    if 'show_reset_ne' not in st.session_state:
-        st.session_state.show_reset_ne = False
-    if 'show_reset_bhk' not in st.session_state:
-        st.session_state.show_reset_bhk = False
+        mark_data_changed()
+        st.rerun()
+
+
+def render_scheduler_status():
+    """Show when the scheduled refresh last ran (only when scheduling is enabled)"""
+    scheduler = get_refresh_scheduler()
+    if scheduler is None:
+        return
     
-    # Sidebar
-    with st.sidebar:
-        st.header("📅 Date Range")
-        
-        default_end = datetime.now() - timedelta(days=1)
-        default_start = default_end - timedelta(days=30)
-        
+    status = scheduler.status()
+    if status['last_refreshed'] is not None:
+        refreshed = datetime.fromtimestamp(status['last_refreshed']).strftime('%d %b %H:%M')
+        start, end = status['last_range']
+        st.caption(f"🕒 Last refreshed {refreshed} ({start} to {end})")
+    elif status['running']:
+        st.caption("🕒 Scheduled refresh running...")
+    if status['last_error']:
+        st.caption(f"⚠️ {status['last_error']}")
+
+
+def save_dataset_snapshot(dataset):
+    """Persist the dataset to its local snapshot, reporting failures as a warning"""
+    try:
+        save_snapshot(dataset)
+    except Exception as e:
+        st.warning(f"Could not save local snapshot: {str(e)}")
+
+
+def render_backfill_controls(sf_file, ne_file, bhk_file):
+    """Sidebar controls for a checkpointed multi-bucket backfill into BigQuery"""
+    with st.expander("⏩ Backfill"):
+        st.caption(
+            "Loads a long range bi-month by bi-month straight into BigQuery. "
+            "Re-running an interrupted backfill resumes after the last merged bucket."
+        )
         col1, col2 = st.columns(2)
         with col1:
-            start_date = st.date_input("Start Date", value=default_start, max_value=datetime.now())
+            backfill_start = st.date_input("From", value=datetime.now() - timedelta(days=365), key="backfill_start")
         with col2:
-            end_date = st.date_input("End Date", value=default_end, max_value=datetime.now())
-        
-        st.markdown("---")
-        st.header("📁 File Uploads")
-        
-        # Salesforce file upload
-        sf_file = st.file_uploader(
-            "Upload Salesforce CSV", 
-            type=['csv'],
-            help="Required columns: " + ", ".join(SF_REQUIRED_COLUMNS)
-        )
-        
-        # NE file upload (optional)
-        ne_file = st.file_uploader(
-            "Upload NE Data (Optional)", 
-            type=['csv'],
-            help="File with DATE, Customer_Type, Mobile columns"
-        )
-        
-        # BHK file upload (optional)
-        bhk_file = st.file_uploader(
-            "Upload BHK Data (Optional)", 
-            type=['csv'],
-            help="File with OPP_CREATED_DATE, Mobile, PACKAGE_NAME columns"
+            backfill_end = st.date_input("To", value=datetime.now() - timedelta(days=1), key="backfill_end")
+        targets = st.multiselect(
+            "Tables",
+            options=list(BACKFILL_TARGET_LABELS),
+            default=['ga_sf'],
+            format_func=BACKFILL_TARGET_LABELS.get,
+            key="backfill_targets"
         )
         
-        st.markdown("---")
-        
-        # Fetch Data button
-        if st.button("🔄 Fetch & Process Data", type="primary", width="stretch"):
+        backfill_running = st.session_state.get('backfill_job_id') is not None
+        if st.button("▶️ Start Backfill", width="stretch", disabled=backfill_running):
             if sf_file is None:
                 st.error("Please upload Salesforce CSV file first!")
-            elif start_date > end_date:
+            elif backfill_start > backfill_end:
                 st.error("End date must be after start date!")
+            elif not targets:
+                st.error("Select at least one table!")
             else:
-                with st.spinner("Fetching GA4 data..."):
-                    try:
-                        # Load Salesforce data
-                        sf_df = pd.read_csv(sf_file, encoding='latin1')
-                        
-                        # Validate SF columns
-                        missing_cols = [col for col in SF_REQUIRED_COLUMNS if col not in sf_df.columns]
-                        if missing_cols:
-                            st.error(f"Missing required columns in Salesforce file: {missing_cols}")
-                            st.stop()
-                        
-                        # Fetch GA4 data for expanded bi-month range
-                        ga_client = get_ga4_client()
-                        expanded_start, expanded_end = get_bimonth_date_range(
-                            start_date.strftime('%Y-%m-%d'),
-                            end_date.strftime('%Y-%m-%d')
-                        )
-                        ga_data = ga_client.fetch_data(expanded_start, expanded_end)
-                        
-                        if not ga_data:
-                            st.warning("No GA4 data found for the selected date range.")
-                            st.stop()
-                        
-                        # Process GA data and map Salesforce
-                        st.session_state.ga_sf_data = process_ga_data(ga_data, sf_df)
-                        
-                        # Process NE data if uploaded
-                        if ne_file is not None:
-                            try:
-                                ne_df = pd.read_csv(ne_file, encoding='utf-8-sig')
-                                st.session_state.ga_sf_ne_data = map_ne_data(
-                                    st.session_state.ga_sf_data, 
-                                    ne_df
-                                )
-                            except Exception as e:
-                                st.error(f"Error processing NE data: {str(e)}")
-                        
-                        # Process BHK data if uploaded
-                        if bhk_file is not None:
-                            try:
-                                bhk_df = pd.read_csv(bhk_file, encoding='utf-8-sig')
-                                base_df = st.session_state.ga_sf_ne_data if st.session_state.ga_sf_ne_data is not None else st.session_state.ga_sf_data
-                                st.session_state.ga_sf_bhk_data = map_bhk_data(
-                                    base_df, 
-                                    bhk_df
-                                )
-                            except Exception as e:
-                                st.error(f"Error processing BHK data: {str(e)}")
-                        
-                        st.session_state.data_loaded = True
-                        st.success("Data processed successfully!")
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Error processing data: {str(e)}")
-        
-        # Separate button to process NE data (when GA-SF is already loaded)
-        if st.session_state.data_loaded and st.session_state.ga_sf_data is not None:
-            if st.button("📁 Map NE Data", width="stretch"):
-                if ne_file is None:
-                    st.error("Please upload NE data file first!")
-                else:
-                    with st.spinner("Mapping NE data..."):
-                        try:
-                            ne_df = pd.read_csv(ne_file, encoding='utf-8-sig')
-                            st.session_state.ga_sf_ne_data = map_ne_data(
-                                st.session_state.ga_sf_data, 
-                                ne_df
-                            )
-                            # Remap BHK data if it was already processed to reflect NE baseline
-                            if bhk_file is not None:
-                                bhk_df = pd.read_csv(bhk_file, encoding='utf-8-sig')
-                                st.session_state.ga_sf_bhk_data = map_bhk_data(
-                                    st.session_state.ga_sf_ne_data, 
-                                    bhk_df
-                                )
-                            st.success("NE data mapped successfully!")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Error mapping NE data: {str(e)}")
-                            
-        # Separate button to process BHK data
-        if st.session_state.data_loaded and st.session_state.ga_sf_data is not None:
-            if st.button("📦 Map BHK Data", width="stretch"):
-                if bhk_file is None:
-                    st.error("Please upload BHK data file first!")
-                else:
-                    with st.spinner("Mapping BHK data..."):
-                        try:
-                            bhk_df = pd.read_csv(bhk_file, encoding='utf-8-sig')
-                            base_df = st.session_state.ga_sf_ne_data if st.session_state.ga_sf_ne_data is not None else st.session_state.ga_sf_data
-                            st.session_state.ga_sf_bhk_data = map_bhk_data(
-                                base_df, 
-                                bhk_df
-                            )
-                            st.success("BHK data mapped successfully!")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Error mapping BHK data: {str(e)}")
+                try:
+                    job = get_job_runner().submit(
+                        BACKFILL_JOB_NAME,
+                        run_backfill,
+                        get_ga4_client(),
+                        backfill_start,
+                        backfill_end,
+                        sf_file.getvalue(),
+                        ne_file.getvalue() if ne_file is not None else None,
+                        bhk_file.getvalue() if bhk_file is not None else None,
+                        targets=targets,
+                        owner=st.session_state.user_email
+                    )
+                    st.session_state.backfill_job_id = job.job_id
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error starting backfill: {str(e)}")
+
+
+@st.fragment(run_every=2)
+def render_backfill_job_status():
+    """Poll the background backfill job and show per-stage bucket counts"""
+    job = get_job_runner().get(st.session_state.get('backfill_job_id'))
+    if job is None:
+        st.session_state.backfill_job_id = None
+        st.rerun()
+    
+    snapshot = job.snapshot()
+    progress = snapshot['progress']
+    
+    if not job.done:
+        total = progress.get('buckets_total', 0)
+        done = progress.get('buckets_merged', 0) + progress.get('buckets_skipped', 0)
+        st.progress(done / total if total else 0.0, text=f"⏩ {snapshot['stage'] or 'Queued'}")
+        st.caption(
+            f"Fetched {progress.get('buckets_fetched', 0)} · Processed {progress.get('buckets_processed', 0)} · "
+            f"Merged {progress.get('buckets_merged', 0)} · Already done {progress.get('buckets_skipped', 0)} "
+            f"of {total}"
+        )
+        if st.button("✖ Cancel Backfill", key="cancel_backfill_job", width="stretch", disabled=job.cancel_requested):
+            job.cancel()
+        return
+    
+    if snapshot['status'] == JOB_COMPLETED:
+        result = job.result
+        st.success(
+            f"Backfill complete: {len(result['merged'])} bucket(s) merged, "
+            f"{len(result['skipped'])} already done."
+        )
+    elif snapshot['status'] == JOB_CANCELLED:
+        st.warning(f"Backfill cancelled after {progress.get('buckets_merged', 0)} bucket(s). Start it again to resume.")
+    else:
+        st.error(f"Backfill stopped: {snapshot['error']}. Start it again to resume.")
+    
+    if st.button("Dismiss", key="dismiss_backfill_job", width="stretch"):
+        st.session_state.backfill_job_id = None
+        st.rerun()
+
+
+def render_snapshot_restore():
+    """Sidebar picker for reopening a previously processed dataset from disk"""
+    snapshots = list_snapshots()
+    if not snapshots:
+        return
+    
+    with st.expander("🗂️ Saved Snapshots"):
+        labels = {}
+        for snapshot in snapshots:
+            extras = [name for name, present in (('NE', snapshot['has_ne']), ('BHK', snapshot['has_bhk'])) if present]
+            saved = datetime.fromtimestamp(snapshot['created_at']).strftime('%d %b %H:%M')
+            labels[snapshot['id']] = (
+                f"{snapshot['start_date']} → {snapshot['end_date']} · {snapshot['rows']:,} rows"
+                + (f" · {'+'.join(extras)}" if extras else "")
+                + f" · saved {saved}"
+            )
         
-        # Clear cache button
-        if st.button("🗑️ Clear Cache", width="stretch"):
-            st.cache_data.clear()
-            st.cache_resource.clear()
-            st.session_state.ga_sf_data = None
-            st.session_state.ga_sf_ne_data = None
-            st.session_state.ga_sf_bhk_data = None
-            st.session_state.data_loaded = False
+        snapshot_id = st.selectbox(
+            "Snapshot",
+            options=list(labels),
+            format_func=labels.get,
+            key="snapshot_choice",
+            label_visibility="collapsed"
+        )
+        if st.button("♻️ Restore Snapshot", width="stretch"):
+            try:
+                st.session_state.dataset = restore_snapshot(snapshot_id)
+                st.session_state.data_loaded = True
+                mark_data_changed()
+                st.session_state.fetch_job_notice = ('success', "Snapshot restored!", [])
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error restoring snapshot: {str(e)}")
+
+
+@st.fragment(run_every=1)
+def render_fetch_job_status():
+    """
+    Poll the background Fetch & Process job.
+    Shows stage progress with a cancel button, and hands the result to the
+    session (with a full app rerun) once the job finishes.
+    """
+    job = get_job_runner().get(st.session_state.get('fetch_job_id'))
+    if job is None:
+        st.session_state.fetch_job_id = None
+        st.rerun()
+    
+    snapshot = job.snapshot()
+    
+    if not job.done:
+        elapsed = time.time() - (snapshot['started_at'] or snapshot['created_at'])
+        st.info(f"⏳ {snapshot['stage'] or 'Queued'} ({elapsed:.0f}s)")
+        if snapshot['progress']:
+            st.caption(" | ".join(
+                f"{name.replace('_', ' ').title()}: {value:,}" for name, value in snapshot['progress'].items()
+            ))
+        if st.button("✖ Cancel Fetch", key="cancel_fetch_job", width="stretch", disabled=job.cancel_requested):
+            job.cancel()
+        return
+    
+    st.session_state.fetch_job_id = None
+    result = job.take_result()
+    if snapshot['status'] == JOB_COMPLETED:
+        if result is None:
+            # Already handed to another tab of this session's owner
             st.rerun()
+        st.session_state.dataset = result['dataset']
+        st.session_state.data_loaded = True
+        mark_data_changed()
+        message = "Data processed successfully!"
+        if result['reused']:
+            message = "Data loaded from an identical run in another session!"
+        st.session_state.fetch_job_notice = ('success', message, result['warnings'])
+    elif snapshot['status'] == JOB_CANCELLED:
+        st.session_state.fetch_job_notice = ('warning', "Fetch & Process was cancelled.", [])
+    else:
+        st.session_state.fetch_job_notice = ('error', f"Error processing data: {snapshot['error']}", [])
+    st.rerun()
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_filter_options(dataset_version: str, column: str, _df: pd.DataFrame) -> list:
+    """Sorted distinct values of a column, cached per dataset version"""
+    if column not in _df.columns:
+        return []
+    return sorted(_df[column].dropna().unique().tolist())
+
+
+def get_filtered_positions(df: pd.DataFrame, filters: dict, key: str) -> np.ndarray:
+    """filter_positions memoized per (dataset version, filter set) for one view"""
+    cache_key = f"filter_positions_{key}"
+    fingerprint = (st.session_state.dataset_version, filter_fingerprint(filters))
+    cached = st.session_state.get(cache_key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
     
-    # Main Content
-    if not st.session_state.data_loaded or st.session_state.ga_sf_data is None:
-        st.info("👈 Upload Salesforce data and click 'Fetch & Process Data' to begin.")
+    positions = filter_positions(df, filters)
+    st.session_state[cache_key] = (fingerprint, positions)
+    return positions
+
+
+def display_upload_result(success: bool, stats: dict, message: str):
+    """Show the outcome of a BigQuery upload"""
+    if success and stats.get('cached'):
+        # Nothing ran: the counts are those of the original upload
+        st.info(f"ℹ️ Nothing re-uploaded: this data was already uploaded on {stats['recorded_at']}.")
+        st.caption(
+            f"Original upload: {stats['new_records']} new, {stats.get('updated_records', 0)} updated, "
+            f"{stats.get('unchanged_records', 0)} unchanged records"
+        )
+    elif success:
+        st.success(message)
+        st.info(
+            f"📊 **New Records:** {stats['new_records']} | **Updated Records:** {stats.get('updated_records', 0)} "
+            f"| **Unchanged Records:** {stats.get('unchanged_records', 0)} | **Total Rows in BQ:** {stats['total_rows']}"
+        )
+        # Display status breakdown if any
+        if stats['status_updates']:
+            breakdown_text = " | ".join([f"{k}: {v}" for k, v in stats['status_updates'].items()])
+            st.info(f"🔄 **Status Updates:** {breakdown_text}")
+    else:
+        st.error(message)
+
+    if stats.get('telemetry_error'):
+        st.warning(f"⚠️ {stats['telemetry_error']}")
+
+    # Per-step timings, to spot the step that slows down as tables grow
+    if stats.get('telemetry'):
+        with st.expander("⏱️ Upload Step Timings"):
+            st.dataframe(pd.DataFrame(summarize_steps(stats['telemetry'])), hide_index=True, width="stretch")
+
+
+def display_upload_estimate(success: bool, estimate: dict, message: str):
+    """Show a pre-flight upload estimate against the budget"""
+    if not success:
+        st.error(message)
+    elif estimate['budget'] == 'refuse':
+        st.error(f"⛔ {message}, over the upload budget: BigQuery will refuse it.")
+    elif estimate['budget'] == 'warn':
+        st.warning(f"⚠️ {message}.")
+    else:
+        st.caption(f"💰 {message}.")
+
+
+def render_upload_button(df: pd.DataFrame, upload_fn, table_name: str, key: str):
+    """
+    BigQuery upload button with a cost estimate. After a new Salesforce
+    export was applied as a delta, the upload can be limited to the keys
+    whose status changed. The last estimate is kept for the same data, and
+    the upload is disabled while it is over the budget.
+    """
+    changed_keys = st.session_state.dataset.sf_changed_keys
+    upload_df = df
+    changes_only = changed_keys is not None and st.checkbox(
+        f"Only Salesforce changes ({len(changed_keys):,} keys)", key=f"{key}_sf_changes_only"
+    )
+    if changes_only:
+        upload_df = select_changed_rows(df, changed_keys)
+
+    # An estimate only applies to the frame it was made for
+    estimate_key = f"{key}_last_estimate"
+    estimate_scope = (st.session_state.dataset_version, changes_only)
+    if st.button("💰 Estimate Upload Cost", key=f"{key}_estimate", width="stretch"):
+        with st.spinner("Dry-running the merge..."):
+            st.session_state[estimate_key] = (estimate_scope, estimate_upload(upload_df, table_name))
+
+    over_budget = False
+    last_estimate = st.session_state.get(estimate_key)
+    if last_estimate is not None and last_estimate[0] == estimate_scope:
+        success, estimate, message = last_estimate[1]
+        display_upload_estimate(success, estimate, message)
+        over_budget = success and estimate['budget'] == 'refuse'
+
+    if st.button("☁️ Upload to BigQuery", key=key, width="stretch", disabled=over_budget):
+        if upload_df.empty:
+            st.info("No rows changed with the new Salesforce export.")
+            return
+        with st.spinner("Uploading to BigQuery..."):
+            display_upload_result(*upload_fn(upload_df))
+        # The merge changed the table, so the estimate no longer holds
+        st.session_state.pop(estimate_key, None)
+
+
+def render_ga_sf_tab(df: pd.DataFrame, positions: np.ndarray, filters: dict):
+    """GA-SF mapped data tab"""
+    st.subheader("GA-SF Mapped Data")
+    
+    if len(positions) == 0:
+        st.warning("No data available for the selected filters.")
+        return
+    
+    # Data table
+    render_data_grid(df, positions, filters, "ga_sf")
+    
+    # Action buttons
+    col1, col2, col3 = st.columns([1, 1, 1])
+    
+    with col1:
+        render_export_controls(df, filters, "GA_SF_Mapped", "ga_sf")
+    
+    with col2:
+        render_upload_button(df, upload_ga_sf_data, BQ_TABLE_GA_SF, "upload_ga_sf")
+    
+    with col3:
+        if st.button("🔴 Reset BQ Table", key="reset_ga_sf_btn", width="stretch"):
+            st.session_state.show_reset_ga_sf = True
+    
+    # Show reset dialog
+    if st.session_state.show_reset_ga_sf:
+        st.warning("⚠️ This will DELETE data in the GA-SF table (all of it, or the chosen date range)!")
+        handle_reset_with_password(BQ_TABLE_GA_SF, "GA-SF Table")
+
+
+def render_ne_tab(filters: dict):
+    """NE mapped data tab"""
+    st.subheader("NE Mapped Data")
+    
+    ne_df = st.session_state.dataset.ne_view()
+    if ne_df is None:
+        st.info("No NE data uploaded. Upload NE data file in the sidebar and click 'Map NE Data'.")
+        return
+
+    ne_positions = get_filtered_positions(ne_df, filters, "ne")
+    
+    if len(ne_positions) == 0:
+        st.warning("No data available for the selected filters.")
+        return
+    
+    # Data table
+    render_data_grid(ne_df, ne_positions, filters, "ne")
+    
+    # Action buttons
+    col1, col2, col3 = st.columns([1, 1, 1])
+    
+    with col1:
+        render_export_controls(ne_df, filters, "GA_SF_NE_Mapped", "ne")
+    
+    with col2:
+        render_upload_button(ne_df, upload_ga_sf_ne_data, BQ_TABLE_GA_SF_NE, "upload_ga_sf_ne")
+    
+    with col3:
+        if st.button("🔴 Reset BQ Table", key="reset_ne_btn", width="stretch"):
+            st.session_state.show_reset_ne = True
+    
+    # Show reset dialog
+    if st.session_state.show_reset_ne:
+        st.warning("⚠️ This will DELETE data in the NE table (all of it, or the chosen date range)!")
+        handle_reset_with_password(BQ_TABLE_GA_SF_NE, "NE Table")
+
+
+def render_bhk_tab(filters: dict):
+    """BHK mapped data tab"""
+    st.subheader("BHK Mapped Data")
+    
+    bhk_df = st.session_state.dataset.bhk_view()
+    if bhk_df is None:
+        st.info("No BHK data uploaded. Upload BHK data file in the sidebar and click 'Map BHK Data'.")
         return
+
+    bhk_positions = get_filtered_positions(bhk_df, filters, "bhk")
     
+    if len(bhk_positions) == 0:
+        st.warning("No data available for the selected filters.")
+        return
+    
+    # Data table
+    render_data_grid(bhk_df, bhk_positions, filters, "bhk")
+    
+    # Action buttons
+    col1, col2, col3 = st.columns([1, 1, 1])
+    
+    with col1:
+        render_export_controls(bhk_df, filters, "BHK_GA_SF_Mapped", "bhk")
+    
+    with col2:
+        # BHK upload option should only be available if it is mapped with NE_GA_SF_Mapped
+        if not st.session_state.dataset.has_ne:
+            st.warning("⚠️ Upload to BQ disabled: Must map with NE data first.")
+            st.button("☁️ Upload to BigQuery (Disabled)", disabled=True, width="stretch", key="upload_bhk_disabled")
+        else:
+            render_upload_button(bhk_df, upload_bhk_data, BQ_TABLE_BHK, "upload_bhk")
+    
+    with col3:
+        if st.button("🔴 Reset BQ Table", key="reset_bhk_btn", width="stretch"):
+            st.session_state.show_reset_bhk = True
+    
+    # Show reset dialog
+    if st.session_state.show_reset_bhk:
+        st.warning("⚠️ This will DELETE data in the BHK table (all of it, or the chosen date range)!")
+        handle_reset_with_password(BQ_TABLE_BHK, "BHK Table")
+
+
+@st.fragment
+def render_dashboard():
+    """
+    Filters, metrics and data tabs.
+    Runs as a fragment so filter changes only recompute the metrics and the
+    visible tab instead of re-executing the whole app.
+    """
     # Filters
     st.subheader("🔍 Filters")
     
-    df = st.session_state.ga_sf_data
+    df = st.session_state.dataset.base
+    version = st.session_state.dataset_version
     
     # Date filters
     filter_row1 = st.columns(4)
     with filter_row1[0]:
-        filter_start = st.date_input("Filter Start", value=start_date, key="filter_start")
+        filter_start = st.date_input("Filter Start", value=st.session_state.start_date, key="filter_start")
     with filter_row1[1]:
-        filter_end = st.date_input("Filter End", value=end_date, key="filter_end")
+        filter_end = st.date_input("Filter End", value=st.session_state.end_date, key="filter_end")
     
     # Multiselect filters
     filter_row2 = st.columns(4)
     with filter_row2[0]:
-        campaigns = sorted(df['Final_Source'].dropna().unique().tolist())
+        campaigns = get_filter_options(version, 'Final_Source', df)
         selected_campaigns = st.multiselect("Campaign/Source", campaigns, default=[])
     
     with filter_row2[1]:
-        source_mediums = sorted(df['Source_Medium'].dropna().unique().tolist())
+        source_mediums = get_filter_options(version, 'Source_Medium', df)
         selected_source_mediums = st.multiselect("Source/Medium", source_mediums, default=[])
     
     with filter_row2[2]:
-        operating_systems = sorted(df['Operating_System'].dropna().unique().tolist())
+        operating_systems = get_filter_options(version, 'Operating_System', df)
         selected_os = st.multiselect("Operating System", operating_systems, default=[])
     
     with filter_row2[3]:
-        shifting_types = sorted(df['Shifting_Type'].dropna().unique().tolist())
+        shifting_types = get_filter_options(version, 'Shifting_Type', df)
         selected_shifting = st.multiselect("Shifting Type", shifting_types, default=[])
     
     # Apply filters
@@ -490,11 +967,12 @@ def main():
         'shifting_types': selected_shifting
     }
     
-    filtered_df = apply_filters(df, filters)
+    positions = get_filtered_positions(df, filters, "ga_sf")
     
-    # Metrics Cards
+    # Metrics Cards (only the columns the metrics need are materialized)
     st.markdown("---")
-    metrics = calculate_metrics(filtered_df)
+    metric_columns = [col for col in ['Mobile', 'Status'] if col in df.columns]
+    metrics = calculate_metrics(df[metric_columns].iloc[positions])
     
     metric_cols = st.columns(4)
     with metric_cols[0]:
@@ -508,154 +986,89 @@ def main():
     
     st.markdown("---")
     
-    # Tabs
-    tab1, tab2, tab3 = st.tabs(["📊 GA-SF Mapped Data", "📁 NE Mapped Data", "📦 BHK Mapped Data"])
+    # Tabs track the selection so only the open tab's content is computed
+    tab1, tab2, tab3 = st.tabs(
+        ["📊 GA-SF Mapped Data", "📁 NE Mapped Data", "📦 BHK Mapped Data"],
+        key="active_tab",
+        on_change="rerun"
+    )
     
     with tab1:
-        st.subheader("GA-SF Mapped Data")
-        
-        if filtered_df.empty:
-            st.warning("No data available for the selected filters.")
-        else:
-            # Data table
-            st.dataframe(filtered_df, width="stretch", height=400)
-            
-            # Action buttons
-            col1, col2, col3 = st.columns([1, 1, 1])
-            
-            with col1:
-                st.download_button(
-                    label="📥 Download CSV",
-                    data=filtered_df.to_csv(index=False),
-                    file_name=f"GA_SF_Mapped_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv",
-                    width="stretch"
-                )
-            
-            with col2:
-                if st.button("☁️ Upload to BigQuery", key="upload_ga_sf", width="stretch"):
-                    with st.spinner("Uploading to BigQuery..."):
-                        success, stats, message = upload_ga_sf_data(st.session_state.ga_sf_data)
-                        if success:
-                            st.success(message)
-                            st.info(f"📊 **New Records:** {stats['new_records']} | **Total Rows in BQ:** {stats['total_rows']}")
-                            # Display status breakdown if any
-                            if stats['status_updates']:
-                                breakdown_text = " | ".join([f"{k}: {v}" for k, v in stats['status_updates'].items()])
-                                st.info(f"🔄 **Status Updates:** {breakdown_text}")
-                        else:
-                            st.error(message)
-            
-            with col3:
-                if st.button("🔴 Reset BQ Table", key="reset_ga_sf_btn", width="stretch"):
-                    st.session_state.show_reset_ga_sf = True
-            
-            # Show reset dialog
-            if st.session_state.show_reset_ga_sf:
-                st.warning("⚠️ This will DELETE all existing data in the GA-SF table!")
-                handle_reset_with_password(BQ_TABLE_GA_SF, "GA-SF Table")
+        if tab1.open:
+            render_ga_sf_tab(df, positions, filters)
     
     with tab2:
-        st.subheader("NE Mapped Data")
-        
-        if st.session_state.ga_sf_ne_data is None:
-            st.info("No NE data uploaded. Upload NE data file in the sidebar and click 'Map NE Data'.")
-        else:
-            ne_filtered = apply_filters(st.session_state.ga_sf_ne_data, filters)
-            
-            if ne_filtered.empty:
-                st.warning("No data available for the selected filters.")
-            else:
-                # Data table
-                st.dataframe(ne_filtered, width="stretch", height=400)
-                
-                # Action buttons
-                col1, col2, col3 = st.columns([1, 1, 1])
-                
-                with col1:
-                    st.download_button(
-                        label="📥 Download CSV",
-                        data=ne_filtered.to_csv(index=False),
-                        file_name=f"GA_SF_NE_Mapped_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv",
-                        width="stretch"
-                    )
-                
-                with col2:
-                    if st.button("☁️ Upload to BigQuery", key="upload_ga_sf_ne", width="stretch"):
-                        with st.spinner("Uploading to BigQuery..."):
-                            success, stats, message = upload_ga_sf_ne_data(st.session_state.ga_sf_ne_data)
-                            if success:
-                                st.success(message)
-                                st.info(f"📊 **New Records:** {stats['new_records']} | **Total Rows in BQ:** {stats['total_rows']}")
-                                # Display status breakdown if any
-                                if stats['status_updates']:
-                                    breakdown_text = " | ".join([f"{k}: {v}" for k, v in stats['status_updates'].items()])
-                                    st.info(f"🔄 **Status Updates:** {breakdown_text}")
-                            else:
-                                st.error(message)
-                
-                with col3:
-                    if st.button("🔴 Reset BQ Table", key="reset_ne_btn", width="stretch"):
-                        st.session_state.show_reset_ne = True
-                
-                # Show reset dialog
-                if st.session_state.show_reset_ne:
-                    st.warning("⚠️ This will DELETE all existing data in the NE table!")
-                    handle_reset_with_password(BQ_TABLE_GA_SF_NE, "NE Table")
-                    
+        if tab2.open:
+            render_ne_tab(filters)
+    
     with tab3:
-        st.subheader("BHK Mapped Data")
-        
-        if st.session_state.ga_sf_bhk_data is None:
-            st.info("No BHK data uploaded. Upload BHK data file in the sidebar and click 'Map BHK Data'.")
-        else:
-            bhk_filtered = apply_filters(st.session_state.ga_sf_bhk_data, filters)
-            
-            if bhk_filtered.empty:
-                st.warning("No data available for the selected filters.")
-            else:
-                # Data table
-                st.dataframe(bhk_filtered, width="stretch", height=400)
-                
-                # Action buttons
-                col1, col2, col3 = st.columns([1, 1, 1])
-                
-                with col1:
-                    st.download_button(
-                        label="📥 Download CSV",
-                        data=bhk_filtered.to_csv(index=False),
-                        file_name=f"BHK_GA_SF_Mapped_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv",
-                        width="stretch"
-                    )
-                
-                with col2:
-                    # BHK upload option should only be available if it is mapped with NE_GA_SF_Mapped
-                    if st.session_state.ga_sf_ne_data is None:
-                        st.warning("⚠️ Upload to BQ disabled: Must map with NE data first.")
-                        st.button("☁️ Upload to BigQuery (Disabled)", disabled=True, width="stretch", key="upload_bhk_disabled")
-                    else:
-                        if st.button("☁️ Upload to BigQuery", key="upload_bhk", width="stretch"):
-                            with st.spinner("Uploading to BigQuery..."):
-                                success, stats, message = upload_bhk_data(st.session_state.ga_sf_bhk_data)
-                                if success:
-                                    st.success(message)
-                                    st.info(f"📊 **New Records:** {stats['new_records']} | **Total Rows in BQ:** {stats['total_rows']}")
-                                    if stats['status_updates']:
-                                        breakdown_text = " | ".join([f"{k}: {v}" for k, v in stats['status_updates'].items()])
-                                        st.info(f"🔄 **Status Updates:** {breakdown_text}")
-                                else:
-                                    st.error(message)
-                
-                with col3:
-                    if st.button("🔴 Reset BQ Table", key="reset_bhk_btn", width="stretch"):
-                        st.session_state.show_reset_bhk = True
-                
-                # Show reset dialog
-                if st.session_state.show_reset_bhk:
-                    st.warning("⚠️ This will DELETE all existing data in the BHK table!")
-                    handle_reset_with_password(BQ_TABLE_BHK, "BHK Table")
+        if tab3.open:
+            render_bhk_tab(filters)
+
+
+def main():
+    # Initialize authenticator
+    auth = Authenticator()
+    
+    # Check authentication using Streamlit's built-in auth
+    if not auth.is_authenticated():
+        auth.show_login_page()
+        return
+    
+    # Get user email and check domain access
+    user_email = auth.get_user_email()
+    if not auth.check_email_access(user_email):
+        st.error(f"❌ Access denied for {user_email}")
+        st.warning("Your email domain is not authorized to use this application.")
+        st.button("🚪 Logout", on_click=st.logout)
+        return
+    
+    # Store user email in session state for security alerts
+    st.session_state.user_email = user_email
+    
+    # Show user info in sidebar
+    auth.show_user_info()
+    
+    st.title("📊 GA-SF Data Mapping Dashboard")
+    st.markdown("---")
+    
+    # Initialize session state
+    scheduler = get_refresh_scheduler(GA4Client)
+    if 'dataset' not in st.session_state:
+        # Start from the latest scheduled refresh when there is one
+        st.session_state.dataset = scheduler.latest_dataset() if scheduler is not None else None
+    if 'data_loaded' not in st.session_state:
+        st.session_state.data_loaded = st.session_state.dataset is not None
+    if 'fetch_job_id' not in st.session_state or 'backfill_job_id' not in st.session_state:
+        # Re-attach to jobs this user still has running (e.g. after a page reload)
+        active_jobs = get_job_runner().jobs_for_owner(user_email, active_only=True)
+        for state_key, job_name in (('fetch_job_id', FETCH_JOB_NAME), ('backfill_job_id', BACKFILL_JOB_NAME)):
+            if state_key not in st.session_state:
+                matching = [job for job in active_jobs if job.name == job_name]
+                st.session_state[state_key] = matching[0].job_id if matching else None
+    if 'dataset_version' not in st.session_state:
+        mark_data_changed()
+    if 'show_reset_ga_sf' not in st.session_state:
+        st.session_state.show_reset_ga_sf = False
+    if 'show_reset_ne' not in st.session_state:
+        st.session_state.show_reset_ne = False
+    if 'show_reset_bhk' not in st.session_state:
+        st.session_state.show_reset_bhk = False
+    
+    # Sidebar
+    with st.sidebar:
+        render_sidebar()
+        if st.session_state.fetch_job_id is not None:
+            render_fetch_job_status()
+        if st.session_state.backfill_job_id is not None:
+            render_backfill_job_status()
+    
+    # Main Content
+    if not st.session_state.data_loaded or st.session_state.dataset is None:
+        st.info("👈 Upload Salesforce data and click 'Fetch & Process Data' to begin.")
+        return
+    
+    render_dashboard()
 
 
 if __name__ == "__main__":
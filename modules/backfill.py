@@ -0,0 +1,295 @@
+"""
+Backfill module for loading long date ranges bucket by bucket.
+Runs GA4 fetch, processing and BigQuery MERGE as three overlapping stages
+connected by bounded queues (fetch bucket N+1 while processing N and merging
+N-1), and records completed buckets in a checkpoint file so an interrupted
+backfill resumes where it stopped.
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .bigquery_manager import upload_ga_sf_data, upload_ga_sf_ne_data, upload_bhk_data
+from .config import BACKFILL_QUEUE_DEPTH, BACKFILL_CHECKPOINT_DIR, PIPELINE_VERSION
+from .data_processor import process_ga_data, get_ne_columns, get_bhk_columns, iter_bimonth_buckets
+from .dataset_registry import fingerprint_bytes
+from .dataset_store import DatasetStore
+from .job_runner import Job, JobCancelled
+from .pipeline import read_csv_bytes, load_salesforce_csv
+
+
+BACKFILL_TARGETS = ['ga_sf', 'ne', 'bhk']
+
+# Marks the end of a stage's output
+_END = object()
+
+
+class BackfillMergeError(RuntimeError):
+    """Raised when merging a bucket into a target table fails"""
+
+
+def checkpoint_path_for(
+    property_id: str,
+    start_date,
+    end_date,
+    input_hashes: List[Optional[str]],
+    targets: List[str]
+) -> str:
+    """
+    Default checkpoint file for a backfill. Identical inputs map to the same
+    file, so re-running an interrupted backfill picks its progress back up.
+
+    Args:
+        property_id: GA4 property ID
+        start_date: Backfill start
+        end_date: Backfill end
+        input_hashes: fingerprint_bytes of the SF/NE/BHK files (None if absent)
+        targets: Tables being merged into
+
+    Returns:
+        Checkpoint file path
+    """
+    identity = json.dumps([
+        str(property_id), str(start_date), str(end_date), input_hashes, sorted(targets), PIPELINE_VERSION
+    ])
+    digest = hashlib.sha256(identity.encode('utf-8')).hexdigest()[:20]
+    return os.path.join(BACKFILL_CHECKPOINT_DIR, f"backfill_{digest}.json")
+
+
+def load_checkpoint(path: str) -> Dict[str, dict]:
+    """
+    Completed buckets recorded in a checkpoint.
+
+    Args:
+        path: Checkpoint file path
+
+    Returns:
+        Dict of bucket label -> merge stats per target
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('completed', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(path: str, completed: Dict[str, dict]) -> None:
+    """Atomically record completed buckets"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'completed': completed, 'updated_at': time.time()}, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def bucket_label(bucket) -> str:
+    """Checkpoint label for a (start, end) bucket"""
+    return f"{bucket[0]}_{bucket[1]}"
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Put with back-pressure; gives up when the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Get the next item, or _END when the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def _merge_bucket(dataset: DatasetStore, targets: List[str]) -> Dict[str, dict]:
+    """
+    Merge one bucket into each target table.
+
+    Raises:
+        BackfillMergeError: If a merge fails (the bucket is then not checkpointed)
+    """
+    uploads = {
+        'ga_sf': (upload_ga_sf_data, dataset.base),
+        'ne': (upload_ga_sf_ne_data, dataset.ne_view()),
+        'bhk': (upload_bhk_data, dataset.bhk_view()),
+    }
+
+    results = {}
+    for target in targets:
+        upload_fn, df = uploads[target]
+        if df is None:
+            raise BackfillMergeError(f"{target} data was not mapped")
+        success, stats, message = upload_fn(df)
+        if not success:
+            raise BackfillMergeError(message)
+        results[target] = stats
+    return results
+
+
+def run_backfill(
+    job: Job,
+    ga_client,
+    start_date,
+    end_date,
+    sf_bytes: bytes,
+    ne_bytes: Optional[bytes] = None,
+    bhk_bytes: Optional[bytes] = None,
+    targets: Optional[List[str]] = None,
+    checkpoint_path: Optional[str] = None
+) -> dict:
+    """
+    Backfill a date range into BigQuery one bi-month bucket at a time.
+    Fetching and processing run on their own threads; merging runs on the
+    job's thread. Each stage hands at most BACKFILL_QUEUE_DEPTH buckets to
+    the next, so memory stays bounded to a few buckets.
+
+    Args:
+        job: Job used for stage/progress reporting and cancellation
+        ga_client: GA4Client instance
+        start_date: Start date (datetime.date or 'YYYY-MM-DD')
+        end_date: End date (datetime.date or 'YYYY-MM-DD')
+        sf_bytes: Salesforce CSV content
+        ne_bytes: Optional NE CSV content (required for the 'ne' and 'bhk' targets)
+        bhk_bytes: Optional BHK CSV content (required for the 'bhk' target)
+        targets: Subset of BACKFILL_TARGETS to merge into (default: ga_sf)
+        checkpoint_path: Override for the checkpoint file
+
+    Returns:
+        Dict with 'buckets' (labels in the range), 'skipped' (already completed
+        before this run), 'merged' (label -> stats per target) and 'checkpoint'
+
+    Raises:
+        ValueError: On invalid input
+        BackfillMergeError: If a merge fails; completed buckets stay checkpointed
+    """
+    targets = targets or ['ga_sf']
+    if ('ne' in targets or 'bhk' in targets) and ne_bytes is None:
+        raise ValueError("NE data is required to backfill the NE and BHK tables.")
+    if 'bhk' in targets and bhk_bytes is None:
+        raise ValueError("BHK data is required to backfill the BHK table.")
+
+    job.set_stage("Loading input files")
+    sf_df = load_salesforce_csv(sf_bytes)
+    ne_df = read_csv_bytes(ne_bytes, 'utf-8-sig') if ne_bytes is not None else None
+    bhk_df = read_csv_bytes(bhk_bytes, 'utf-8-sig') if bhk_bytes is not None else None
+
+    if checkpoint_path is None:
+        input_hashes = [fingerprint_bytes(data) if data is not None else None for data in (sf_bytes, ne_bytes, bhk_bytes)]
+        checkpoint_path = checkpoint_path_for(ga_client.property_id, start_date, end_date, input_hashes, targets)
+
+    buckets = list(iter_bimonth_buckets(start_date, end_date))
+    completed = load_checkpoint(checkpoint_path)
+    skipped = [bucket_label(bucket) for bucket in buckets if bucket_label(bucket) in completed]
+    pending = [bucket for bucket in buckets if bucket_label(bucket) not in completed]
+
+    counters = {'buckets_total': len(buckets), 'buckets_skipped': len(skipped),
+                'buckets_fetched': 0, 'buckets_processed': 0, 'buckets_merged': 0}
+    counters_lock = threading.Lock()
+
+    def bump(counter: str) -> None:
+        with counters_lock:
+            counters[counter] += 1
+            snapshot = dict(counters)
+        job.update_progress(**snapshot)
+
+    job.update_progress(**counters)
+    fetched: queue.Queue = queue.Queue(maxsize=BACKFILL_QUEUE_DEPTH)
+    processed: queue.Queue = queue.Queue(maxsize=BACKFILL_QUEUE_DEPTH)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def check_stop(*_) -> None:
+        job.check_cancelled()
+        if stop.is_set():
+            raise JobCancelled("Backfill stopped")
+
+    def fetch_stage() -> None:
+        for bucket in pending:
+            # Bypass the shared GA4 cache so history doesn't evict interactive results
+            rows = ga_client.fetch_data(bucket[0], bucket[1], progress_callback=check_stop)
+            bump('buckets_fetched')
+            if not _put(fetched, (bucket, rows), stop):
+                return
+        _put(fetched, _END, stop)
+
+    def process_stage() -> None:
+        while True:
+            item = _get(fetched, stop)
+            if item is _END:
+                _put(processed, _END, stop)
+                return
+            bucket, rows = item
+            dataset = None
+            if rows:
+                dataset = DatasetStore(process_ga_data(rows, sf_df))
+                del rows
+                if ne_df is not None:
+                    dataset.set_ne_columns(get_ne_columns(dataset.base, ne_df))
+                if bhk_df is not None:
+                    dataset.set_bhk_columns(get_bhk_columns(dataset.base, bhk_df))
+            bump('buckets_processed')
+            if not _put(processed, (bucket, dataset), stop):
+                return
+
+    def run_stage(stage_fn) -> None:
+        try:
+            stage_fn()
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [
+        threading.Thread(target=run_stage, args=(fn,), name=f"pnm-backfill-{fn.__name__}", daemon=True)
+        for fn in (fetch_stage, process_stage)
+    ]
+    for thread in threads:
+        thread.start()
+
+    merged: Dict[str, dict] = {}
+    try:
+        job.set_stage(f"Backfilling {len(pending)} of {len(buckets)} bucket(s)")
+        while True:
+            item = _get(processed, stop)
+            if item is _END:
+                break
+            bucket, dataset = item
+            label = bucket_label(bucket)
+            job.set_stage(f"Merging {bucket[0]} to {bucket[1]}")
+            # Empty buckets (no GA4 data) are recorded as done without a merge
+            merged[label] = _merge_bucket(dataset, targets) if dataset is not None else {}
+            completed[label] = merged[label]
+            save_checkpoint(checkpoint_path, completed)
+            bump('buckets_merged')
+    except BaseException as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        # Prefer reporting the root cause over the stop signals it triggered
+        cancelled = [e for e in errors if isinstance(e, JobCancelled)]
+        failures = [e for e in errors if not isinstance(e, JobCancelled)]
+        if job.cancel_requested or not failures:
+            raise cancelled[0] if cancelled else JobCancelled("Backfill stopped")
+        raise failures[0]
+
+    job.set_stage("Done")
+    return {
+        'buckets': [bucket_label(bucket) for bucket in buckets],
+        'skipped': skipped,
+        'merged': merged,
+        'checkpoint': checkpoint_path,
+    }
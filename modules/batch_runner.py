@@ -0,0 +1,316 @@
+"""
+Batch Runner module for headless fetch -> process -> merge runs.
+Drives the same pipeline as the dashboard without Streamlit so heavy runs
+can be scheduled off-peak (cron, CI). Configuration comes from a secrets
+TOML file (PNM_SECRETS_FILE) or environment variables; see modules.config.
+
+Usage:
+    python -m modules.batch_runner --sf sf.csv --trailing-days 30 --upload ga_sf ne
+    python -m modules.batch_runner --sf sf.csv --start 2024-01-01 --end 2024-12-31 --upload ga_sf --backfill
+"""
+import argparse
+import json
+import logging
+import signal
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from .backfill import BackfillMergeError, run_backfill
+from .bigquery_manager import upload_ga_sf_data, upload_ga_sf_ne_data, upload_bhk_data
+from .ga4_client import GA4Client
+from .job_runner import Job, JobCancelled
+from .pipeline import run_fetch_and_process
+
+
+# Exit codes
+EXIT_OK = 0
+EXIT_UNEXPECTED_ERROR = 1
+EXIT_CONFIG_ERROR = 2  # Missing/invalid credentials or property ID (argparse usage errors also exit 2)
+EXIT_INPUT_ERROR = 3  # Unreadable or invalid input files, or no GA4 data for the range
+EXIT_PIPELINE_ERROR = 4  # GA4 fetch or processing failed
+EXIT_UPLOAD_ERROR = 5  # At least one requested BigQuery merge failed (backfills can be re-run to resume)
+EXIT_CANCELLED = 130  # Stopped by SIGINT/SIGTERM
+
+UPLOAD_TARGETS = ['ga_sf', 'ne', 'bhk']
+
+logger = logging.getLogger("pnm.batch")
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event plus structured fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def log_event(level: int, event: str, **fields) -> None:
+    """Log an event with structured fields"""
+    logger.log(level, event, extra={'fields': fields})
+
+
+def _default_fields(record: logging.LogRecord) -> bool:
+    """Give records logged without fields an empty dict so both formats can render them"""
+    if not hasattr(record, 'fields'):
+        record.fields = {}
+    return True
+
+
+def configure_logging(log_format: str, level: str) -> None:
+    """
+    Send logs to stderr as JSON lines or plain text.
+
+    Args:
+        log_format: 'json' or 'text'
+        level: Logging level name
+    """
+    handler = logging.StreamHandler(sys.stderr)
+    if log_format == 'json':
+        handler.setFormatter(JsonLogFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s %(fields)s"))
+    handler.addFilter(_default_fields)
+    logging.basicConfig(level=level.upper(), handlers=[handler], force=True)
+
+
+class LoggingJob(Job):
+    """Job that logs stage changes so batch runs report the same progress as the UI"""
+
+    def set_stage(self, stage: str) -> None:
+        super().set_stage(stage)
+        log_event(logging.INFO, "stage", stage=stage, progress=dict(self.progress))
+
+
+def read_file(path: Optional[str]) -> Optional[bytes]:
+    """Read an input file, or return None when no path was given"""
+    if path is None:
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        prog="python -m modules.batch_runner",
+        description="Fetch GA4 data, map Salesforce/NE/BHK exports and merge into BigQuery."
+    )
+    parser.add_argument("--sf", required=True, help="Salesforce CSV export")
+    parser.add_argument("--ne", help="NE CSV export (optional)")
+    parser.add_argument("--bhk", help="BHK CSV export (optional)")
+
+    dates = parser.add_mutually_exclusive_group(required=True)
+    dates.add_argument("--start", type=date.fromisoformat, help="Start date (YYYY-MM-DD); requires --end")
+    dates.add_argument(
+        "--trailing-days", type=int,
+        help="Process the N days ending yesterday instead of --start/--end"
+    )
+    parser.add_argument("--end", type=date.fromisoformat, help="End date (YYYY-MM-DD)")
+
+    parser.add_argument(
+        "--upload", nargs="*", choices=UPLOAD_TARGETS, default=[],
+        help="Tables to merge the results into (default: none, process only)"
+    )
+    parser.add_argument(
+        "--backfill", action="store_true",
+        help="Walk the range bi-month by bi-month, overlapping fetch, processing and merge, "
+             "and resume from the last completed bucket when re-run"
+    )
+    parser.add_argument("--checkpoint", help="Backfill checkpoint file (default: derived from the inputs)")
+    parser.add_argument("--log-format", choices=['json', 'text'], default='json')
+    parser.add_argument("--log-level", default='INFO')
+
+    args = parser.parse_args(argv)
+    if args.start is not None:
+        if args.end is None:
+            parser.error("--start requires --end")
+        if args.start > args.end:
+            parser.error("--end must be on or after --start")
+    else:
+        if args.trailing_days < 1:
+            parser.error("--trailing-days must be at least 1")
+        args.end = date.today() - timedelta(days=1)
+        args.start = args.end - timedelta(days=args.trailing_days - 1)
+    if 'bhk' in args.upload and args.bhk is None:
+        parser.error("--upload bhk requires --bhk")
+    if 'ne' in args.upload and args.ne is None:
+        parser.error("--upload ne requires --ne")
+    if args.backfill and not args.upload:
+        parser.error("--backfill requires at least one --upload target")
+    return args
+
+
+def upload_results(dataset, targets: List[str]) -> bool:
+    """
+    Merge the processed frames into BigQuery.
+
+    Args:
+        dataset: DatasetStore from the pipeline
+        targets: Subset of UPLOAD_TARGETS
+
+    Returns:
+        True if every requested upload succeeded
+    """
+    uploads = {
+        'ga_sf': (upload_ga_sf_data, dataset.base),
+        'ne': (upload_ga_sf_ne_data, dataset.ne_view()),
+        'bhk': (upload_bhk_data, dataset.bhk_view() if dataset.has_ne else None),
+    }
+
+    all_ok = True
+    for target in targets:
+        upload_fn, df = uploads[target]
+        if df is None:
+            log_event(logging.ERROR, "upload_skipped", target=target, reason="data not mapped")
+            all_ok = False
+            continue
+
+        started = time.time()
+        success, stats, message = upload_fn(df)
+        log_event(
+            logging.INFO if success else logging.ERROR,
+            "upload_finished" if success else "upload_failed",
+            target=target,
+            rows=len(df),
+            seconds=round(time.time() - started, 2),
+            message=message,
+            **stats
+        )
+        if stats.get('telemetry_error'):
+            log_event(logging.WARNING, "telemetry_failed", target=target, message=stats['telemetry_error'])
+        all_ok = all_ok and success
+    return all_ok
+
+
+def run(args: argparse.Namespace) -> int:
+    """
+    Execute one batch run.
+
+    Args:
+        args: Parsed arguments
+
+    Returns:
+        Process exit code
+    """
+    try:
+        sf_bytes = read_file(args.sf)
+        ne_bytes = read_file(args.ne)
+        bhk_bytes = read_file(args.bhk)
+    except OSError as e:
+        log_event(logging.ERROR, "input_error", error=str(e))
+        return EXIT_INPUT_ERROR
+
+    try:
+        ga_client = GA4Client()
+    except (KeyError, OSError, RuntimeError) as e:
+        log_event(logging.ERROR, "config_error", error=str(e))
+        return EXIT_CONFIG_ERROR
+
+    job = LoggingJob("Batch Backfill" if args.backfill else "Batch Fetch & Process", owner="batch")
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: job.cancel())
+
+    log_event(
+        logging.INFO, "run_started",
+        start=args.start, end=args.end, upload=args.upload, backfill=args.backfill
+    )
+    if args.backfill:
+        return run_backfill_mode(args, job, ga_client, sf_bytes, ne_bytes, bhk_bytes)
+
+    started = time.time()
+    try:
+        result = run_fetch_and_process(
+            job, ga_client, args.start, args.end, sf_bytes, ne_bytes, bhk_bytes
+        )
+    except JobCancelled:
+        log_event(logging.WARNING, "run_cancelled", progress=job.progress)
+        return EXIT_CANCELLED
+    except ValueError as e:
+        log_event(logging.ERROR, "input_error", error=str(e))
+        return EXIT_INPUT_ERROR
+    except Exception as e:
+        log_event(logging.ERROR, "pipeline_error", error=str(e))
+        return EXIT_PIPELINE_ERROR
+
+    dataset = result['dataset']
+    for warning in result['warnings']:
+        log_event(logging.WARNING, "pipeline_warning", warning=warning)
+    log_event(
+        logging.INFO, "processed",
+        rows=len(dataset.base),
+        reused=result['reused'],
+        has_ne=dataset.has_ne,
+        has_bhk=dataset.has_bhk,
+        seconds=round(time.time() - started, 2),
+        progress=job.progress
+    )
+
+    if args.upload and not upload_results(dataset, args.upload):
+        return EXIT_UPLOAD_ERROR
+
+    log_event(logging.INFO, "run_finished", seconds=round(time.time() - started, 2))
+    return EXIT_OK
+
+
+def run_backfill_mode(args: argparse.Namespace, job: Job, ga_client, sf_bytes, ne_bytes, bhk_bytes) -> int:
+    """
+    Execute a checkpointed backfill.
+
+    Returns:
+        Process exit code
+    """
+    started = time.time()
+    try:
+        result = run_backfill(
+            job, ga_client, args.start, args.end, sf_bytes, ne_bytes, bhk_bytes,
+            targets=args.upload, checkpoint_path=args.checkpoint
+        )
+    except JobCancelled:
+        log_event(logging.WARNING, "run_cancelled", progress=job.progress)
+        return EXIT_CANCELLED
+    except ValueError as e:
+        log_event(logging.ERROR, "input_error", error=str(e))
+        return EXIT_INPUT_ERROR
+    except BackfillMergeError as e:
+        log_event(logging.ERROR, "upload_failed", error=str(e), progress=job.progress)
+        return EXIT_UPLOAD_ERROR
+    except Exception as e:
+        log_event(logging.ERROR, "pipeline_error", error=str(e), progress=job.progress)
+        return EXIT_PIPELINE_ERROR
+
+    for label, stats in result['merged'].items():
+        log_event(logging.INFO, "bucket_merged", bucket=label, stats=stats)
+    log_event(
+        logging.INFO, "run_finished",
+        buckets=len(result['buckets']),
+        skipped=len(result['skipped']),
+        merged=len(result['merged']),
+        checkpoint=result['checkpoint'],
+        seconds=round(time.time() - started, 2)
+    )
+    return EXIT_OK
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point"""
+    args = parse_args(argv)
+    configure_logging(args.log_format, args.log_level)
+    try:
+        return run(args)
+    except Exception:
+        logger.exception("unexpected_error")
+        return EXIT_UNEXPECTED_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,22 @@
 """
 BigQuery Manager module for data storage and retrieval.
 Uses SQL MERGE with temporary staging tables for efficient upserts.
+Uploads go through a pluggable StorageBackend: BigQuery by default, or a
+local DuckDB database (modules.duckdb_backend) selected in secrets.
+Re-uploading a frame already recorded in the upload ledger is skipped.
 """
-import json
-import tempfile
-from typing import Tuple, Optional, List
+import io
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Tuple, Optional, List
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import streamlit as st
 from google.cloud import bigquery
 from google.oauth2 import service_account
@@ -14,8 +24,13 @@ from google.api_core.exceptions import NotFound
 
 from .config import (
     BQ_PROJECT_ID, BQ_DATASET_ID, BQ_TABLE_GA_SF, BQ_TABLE_GA_SF_NE, BQ_TABLE_BHK,
-    get_gcp_credentials
+    BQ_CLUSTERING_FIELDS, BQ_STAGING_TABLE_EXPIRATION_HOURS, BQ_MERGE_MAX_ATTEMPTS,
+    BQ_LOAD_CHUNK_ROWS, BQ_LOAD_PARALLELISM, BQ_LOAD_PARQUET_COMPRESSION, BQ_METADATA_TTL_SECONDS,
+    BQ_ROW_FINGERPRINT_COLUMN, BQ_UPLOAD_WARN_BYTES, BQ_UPLOAD_MAX_BYTES,
+    get_gcp_credentials, get_storage_settings, get_telemetry_settings
 )
+from .upload_ledger import fingerprint_frame, get_upload_ledger
+from .upload_telemetry import step_record, log_upload_telemetry
 
 
 # Schema for GA_SF_Mapped table
@@ -40,6 +55,24 @@ GA_SF_SCHEMA = [
     bigquery.SchemaField("Year", "INTEGER", mode="NULLABLE"),
 ]
 
+# Rows of the optional upload telemetry table (see upload_telemetry)
+TELEMETRY_SCHEMA = [
+    bigquery.SchemaField("upload_id", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("ts", "TIMESTAMP", mode="REQUIRED"),
+    bigquery.SchemaField("table", "STRING", mode="NULLABLE"),
+    bigquery.SchemaField("success", "BOOLEAN", mode="NULLABLE"),
+    bigquery.SchemaField("step", "STRING", mode="NULLABLE"),
+    bigquery.SchemaField("job_id", "STRING", mode="NULLABLE"),
+    bigquery.SchemaField("wall_ms", "FLOAT", mode="NULLABLE"),
+    bigquery.SchemaField("queue_ms", "FLOAT", mode="NULLABLE"),
+    bigquery.SchemaField("bytes_processed", "INTEGER", mode="NULLABLE"),
+    bigquery.SchemaField("slot_ms", "INTEGER", mode="NULLABLE"),
+    bigquery.SchemaField("rows_affected", "INTEGER", mode="NULLABLE"),
+]
+
+# Identifier quote character per SQL dialect the MERGE is built for
+_SQL_IDENTIFIER_QUOTES = {"bigquery": "`", "duckdb": '"'}
+
 # SQL fragment: maps a Status string to its numeric priority
 _STATUS_PRIORITY_SQL = """
     CASE {col}
@@ -53,21 +86,82 @@ _STATUS_PRIORITY_SQL = """
 """
 
 
+_bq_client: Optional[bigquery.Client] = None
+_bq_client_identity: Optional[tuple] = None
+_bq_client_lock = threading.Lock()
+
+
 def get_bq_client() -> bigquery.Client:
     """
-    Initialize and return BigQuery client using service account credentials.
+    Process-wide BigQuery client built from the in-memory service account
+    credentials. The client (and its HTTP connection pool) is reused across
+    uploads and rebuilt only when the configured service account changes.
 
     Returns:
         BigQuery Client instance
     """
+    global _bq_client, _bq_client_identity
     credentials_dict = get_gcp_credentials()
+    identity = (credentials_dict.get('client_email'), credentials_dict.get('private_key_id'))
+
+    with _bq_client_lock:
+        if _bq_client is None or _bq_client_identity != identity:
+            credentials = service_account.Credentials.from_service_account_info(credentials_dict)
+            _bq_client = bigquery.Client(credentials=credentials, project=BQ_PROJECT_ID)
+            _bq_client_identity = identity
+        return _bq_client
+
+
+class TableMetadataCache:
+    """Process-wide TTL cache of dataset existence and table metadata"""
+
+    def __init__(self, ttl_seconds: int = BQ_METADATA_TTL_SECONDS):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: Seconds an entry is trusted before BigQuery is asked again
+        """
+        self._ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ref: str) -> Optional[Any]:
+        """Cached metadata for a dataset/table ID, or None if unknown or expired"""
+        with self._lock:
+            entry = self._entries.get(ref)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self._ttl_seconds:
+                del self._entries[ref]
+                return None
+            return entry[1]
+
+    def put(self, ref: str, value: Any) -> None:
+        """Cache metadata for a dataset/table ID"""
+        with self._lock:
+            self._entries[ref] = (time.time(), value)
+
+    def invalidate(self, ref: Optional[str] = None) -> None:
+        """Forget one dataset/table ID, or everything when ref is None"""
+        with self._lock:
+            if ref is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(ref, None)
+
+
+_metadata_cache: Optional[TableMetadataCache] = None
+_metadata_cache_lock = threading.Lock()
 
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as temp:
-        json.dump(credentials_dict, temp)
-        temp_path = temp.name
 
-    credentials = service_account.Credentials.from_service_account_file(temp_path)
-    return bigquery.Client(credentials=credentials, project=BQ_PROJECT_ID)
+def get_table_metadata_cache() -> TableMetadataCache:
+    """Get the process-wide table metadata cache"""
+    global _metadata_cache
+    with _metadata_cache_lock:
+        if _metadata_cache is None:
+            _metadata_cache = TableMetadataCache()
+        return _metadata_cache
 
 
 def ensure_dataset_exists(client: bigquery.Client) -> None:
@@ -78,12 +172,94 @@ def ensure_dataset_exists(client: bigquery.Client) -> None:
         client: BigQuery client
     """
     dataset_ref = f"{client.project}.{BQ_DATASET_ID}"
+    cache = get_table_metadata_cache()
+    if cache.get(dataset_ref) is not None:
+        return
 
     try:
         client.get_dataset(dataset_ref)
     except NotFound:
         dataset = bigquery.Dataset(dataset_ref)
         client.create_dataset(dataset)
+    cache.put(dataset_ref, True)
+
+
+def _clustering_fields_for(schema: list) -> Optional[List[str]]:
+    """Clustering columns for a schema, or None if it lacks the merge key columns"""
+    names = {field.name for field in schema}
+    if all(col in names for col in BQ_CLUSTERING_FIELDS):
+        return list(BQ_CLUSTERING_FIELDS)
+    return None
+
+
+def _new_table(full_table_id: str, schema: list) -> bigquery.Table:
+    """
+    Table definition partitioned by day on Date and clustered on the merge key.
+
+    Args:
+        full_table_id: Full table ID
+        schema: Schema for the table
+
+    Returns:
+        bigquery.Table ready for create_table
+    """
+    table = bigquery.Table(full_table_id, schema=schema)
+    table.time_partitioning = bigquery.TimePartitioning(
+        type_=bigquery.TimePartitioningType.DAY,
+        field="Date"
+    )
+    table.clustering_fields = _clustering_fields_for(schema)
+    return table
+
+
+def _migrate_clustering(client: bigquery.Client, table: bigquery.Table) -> bigquery.Table:
+    """
+    Add merge-key clustering to a table created before tables were clustered.
+    BigQuery clusters data written from then on and re-clusters older data
+    in the background.
+
+    Args:
+        client: BigQuery client
+        table: Existing table
+
+    Returns:
+        The table's current metadata
+    """
+    if table.clustering_fields:
+        return table
+    clustering_fields = _clustering_fields_for(table.schema)
+    if clustering_fields is None:
+        return table
+    table.clustering_fields = clustering_fields
+    return client.update_table(table, ["clustering_fields"])
+
+
+def _with_fingerprint(schema: list) -> list:
+    """Schema of a merged main table: the upload schema plus the row fingerprint column"""
+    if any(field.name == BQ_ROW_FINGERPRINT_COLUMN for field in schema):
+        return schema
+    return list(schema) + [bigquery.SchemaField(BQ_ROW_FINGERPRINT_COLUMN, "INTEGER", mode="NULLABLE")]
+
+
+def _migrate_fingerprint(client: bigquery.Client, table: bigquery.Table, schema: list) -> bigquery.Table:
+    """
+    Add the row fingerprint column to a merged table created before rows
+    were fingerprinted. Existing rows keep a NULL fingerprint until their
+    next update.
+
+    Args:
+        client: BigQuery client
+        table: Existing table
+        schema: Schema the table is being ensured with
+
+    Returns:
+        The table's current metadata
+    """
+    fingerprint_fields = [field for field in schema if field.name == BQ_ROW_FINGERPRINT_COLUMN]
+    if not fingerprint_fields or any(field.name == BQ_ROW_FINGERPRINT_COLUMN for field in table.schema):
+        return table
+    table.schema = list(table.schema) + fingerprint_fields
+    return client.update_table(table, ["schema"])
 
 
 def ensure_table_exists(
@@ -92,7 +268,10 @@ def ensure_table_exists(
     schema: list
 ) -> str:
     """
-    Ensure the table exists, create if not.
+    Ensure the table exists, create if not. Existing tables are migrated to
+    merge-key clustering and, if the schema has one, the row fingerprint
+    column. Metadata is cached, so repeated uploads skip the
+    lookups while the cache entry is fresh.
 
     Args:
         client: BigQuery client
@@ -105,253 +284,416 @@ def ensure_table_exists(
     ensure_dataset_exists(client)
 
     full_table_id = f"{client.project}.{BQ_DATASET_ID}.{table_name}"
+    cache = get_table_metadata_cache()
+    if cache.get(full_table_id) is not None:
+        return full_table_id
 
     try:
-        client.get_table(full_table_id)
+        table = _migrate_fingerprint(client, _migrate_clustering(client, client.get_table(full_table_id)), schema)
     except NotFound:
-        table = bigquery.Table(full_table_id, schema=schema)
-        table.time_partitioning = bigquery.TimePartitioning(
-            type_=bigquery.TimePartitioningType.DAY,
-            field="Date"
-        )
-        client.create_table(table)
+        table = client.create_table(_new_table(full_table_id, schema))
+    cache.put(full_table_id, table)
 
     return full_table_id
 
 
-def reset_table(table_name: str) -> Tuple[bool, str]:
+def reset_table(table_name: str, start_date=None, end_date=None) -> Tuple[bool, str]:
     """
-    Drop and recreate a BigQuery table.
+    Empty a table in the configured storage backend, keeping its schema,
+    partitioning and clustering. With a date range only rows dated inside
+    it are deleted, so a bad month can be reloaded on its own.
 
     Args:
         table_name: Name of the table to reset
+        start_date: Optional first Date to delete (datetime.date or 'YYYY-MM-DD'); requires end_date
+        end_date: Optional last Date to delete
 
     Returns:
         Tuple of (success, message)
     """
     try:
-        client = get_bq_client()
-        full_table_id = f"{client.project}.{BQ_DATASET_ID}.{table_name}"
-
-        # Drop table if exists
-        try:
-            client.delete_table(full_table_id)
-        except NotFound:
-            pass  # Table doesn't exist, that's fine
-
-        if table_name == BQ_TABLE_GA_SF:
-            # Create fresh table
-            table = bigquery.Table(full_table_id, schema=GA_SF_SCHEMA)
-            table.time_partitioning = bigquery.TimePartitioning(
-                type_=bigquery.TimePartitioningType.DAY,
-                field="Date"
-            )
-            client.create_table(table)
-
-        return True, f"Successfully reset table {table_name}"
+        date_bounds = None
+        if start_date is not None or end_date is not None:
+            if start_date is None or end_date is None:
+                return False, "Error resetting table: both a start and an end date are required"
+            date_bounds = (pd.Timestamp(start_date).strftime('%Y-%m-%d'), pd.Timestamp(end_date).strftime('%Y-%m-%d'))
+            if date_bounds[0] > date_bounds[1]:
+                return False, "Error resetting table: the end date must be on or after the start date"
+
+        backend = get_storage_backend()
+        success, message = backend.reset(table_name, date_bounds)
+        if success:
+            get_upload_ledger().invalidate(backend.table_ref(table_name), date_bounds)
+        return success, message
 
     except Exception as e:
         return False, f"Error resetting table: {str(e)}"
 
 
-def prepare_upload_df(df: pd.DataFrame, target_columns: list) -> pd.DataFrame:
+# ---------------------------------------------------------------------------
+# Internal helpers for temp-table MERGE approach
+# ---------------------------------------------------------------------------
+
+def _merge_date_bounds(df: pd.DataFrame) -> Optional[Tuple[str, str]]:
     """
-    Prepare DataFrame for upload by selecting and ordering columns.
+    Date range of main-table rows an upload can match, for partition pruning.
+    The merge key includes Month and Year, so a matching row can lie anywhere
+    in the months spanned by the upload: the bounds are widened to whole months.
 
     Args:
-        df: DataFrame to prepare
-        target_columns: List of column names to include
+        df: Prepared DataFrame to upload
 
     Returns:
-        Prepared DataFrame
+        Tuple of (first_day, last_day) as 'YYYY-MM-DD', or None if df has no dates
     """
-    # Create copy with only target columns that exist
-    available_cols = [col for col in target_columns if col in df.columns]
-    upload_df = df[available_cols].copy()
+    if 'Date' not in df.columns:
+        return None
+    dates = pd.to_datetime(df['Date']).dropna()
+    if dates.empty:
+        return None
+    first_day = dates.min().replace(day=1)
+    last_day = dates.max() + pd.offsets.MonthEnd(0)
+    return first_day.strftime('%Y-%m-%d'), last_day.strftime('%Y-%m-%d')
 
-    # Add missing columns with None
-    for col in target_columns:
-        if col not in upload_df.columns:
-            upload_df[col] = None
 
-    # Reorder columns
-    upload_df = upload_df[target_columns]
+def _date_filter(alias: str, date_bounds: Optional[Tuple[str, str]]) -> str:
+    """SQL join condition restricting alias.Date to date_bounds (empty when unbounded)"""
+    if date_bounds is None:
+        return ""
+    return f"AND {alias}.Date BETWEEN DATE '{date_bounds[0]}' AND DATE '{date_bounds[1]}'"
 
-    # Fix Date type for PyArrow
-    if 'Date' in upload_df.columns:
-        upload_df['Date'] = pd.to_datetime(upload_df['Date']).dt.date
 
-    return upload_df
+def _job_telemetry(step: str, job) -> dict:
+    """
+    Telemetry record of a finished BigQuery job.
 
+    Args:
+        step: Upload step the job belongs to
+        job: Finished LoadJob or QueryJob
 
-# ---------------------------------------------------------------------------
-# Internal helpers for temp-table MERGE approach
-# ---------------------------------------------------------------------------
+    Returns:
+        Record from step_record
+    """
+    # totalSlotMs isn't exposed as a property on LoadJob
+    slot_ms = job._properties.get('statistics', {}).get('totalSlotMs')
+    queue_ms = None
+    if job.created is not None and job.started is not None:
+        queue_ms = (job.started - job.created).total_seconds() * 1000
+
+    if job.job_type == "load":
+        bytes_processed, rows_affected = job.output_bytes, job.output_rows
+    else:
+        bytes_processed, rows_affected = job.total_bytes_processed, job.num_dml_affected_rows
+
+    return step_record(
+        step,
+        started=job.started.timestamp() if job.started is not None else None,
+        ended=job.ended.timestamp() if job.ended is not None else None,
+        queue_ms=queue_ms,
+        bytes_processed=bytes_processed,
+        slot_ms=int(slot_ms) if slot_ms is not None else None,
+        rows_affected=rows_affected,
+        job_id=job.job_id
+    )
 
-def _upload_to_temp_table(
-    client: bigquery.Client,
-    df: pd.DataFrame,
-    temp_table_id: str,
-    schema: list
-) -> None:
+
+def _script_step(statement: str) -> str:
+    """Upload step of one statement of a merge script"""
+    statement = statement.lstrip()
+    if statement.startswith("MERGE"):
+        return "merge"
+    if statement.startswith("DROP"):
+        return "cleanup"
+    if statement.startswith("SET main_rows") or statement.startswith("SET total_rows"):
+        return "count"
+    return "stats"
+
+
+def _script_children(client: bigquery.Client, script_job) -> Optional[list]:
+    """Child jobs of a finished script, one per statement (None if they can't be listed)"""
+    try:
+        return list(client.list_jobs(parent_job=script_job))
+    except Exception:
+        return None
+
+
+def _script_telemetry(script_job, children: Optional[list]) -> List[dict]:
     """
-    Upload a DataFrame to a temporary staging table using WRITE_TRUNCATE.
-    Creates the table if it doesn't exist.
+    Telemetry records of a merge script's statements, in the order they ran.
+    Falls back to one record for the whole script if its child jobs can't be listed.
+    """
+    if children is None:
+        return [_job_telemetry("merge_script", script_job)]
+    records = [_job_telemetry(_script_step(child.query or ""), child) for child in children]
+    return sorted(records, key=lambda record: record['started'] or 0)
+
+
+def _merge_dml_stats(children: Optional[list]) -> Optional[Tuple[int, int]]:
+    """(inserted, updated) row counts of a merge script's MERGE statement, if its child job is known"""
+    for child in children or []:
+        if _script_step(child.query or "") == "merge" and child.dml_stats is not None:
+            return child.dml_stats.inserted_row_count or 0, child.dml_stats.updated_row_count or 0
+    return None
+
+
+def _create_staging_table(client: bigquery.Client, table_name: str, schema: list) -> str:
+    """
+    Create a uniquely named, self-expiring staging table for one upload, so
+    concurrent uploads to the same table never share staging data.
 
     Args:
         client: BigQuery client
-        df: DataFrame to upload
-        temp_table_id: Full table ID for the temp table
-        schema: Schema for the temp table
-    """
-    # Drop temp table if it already exists (clean slate)
-    try:
-        client.delete_table(temp_table_id)
-    except NotFound:
-        pass
+        table_name: Name of the main table being uploaded to
+        schema: Schema for the staging table
 
-    # Create temp table
+    Returns:
+        Full table ID of the staging table
+    """
+    temp_table_id = f"{client.project}.{BQ_DATASET_ID}._temp_{table_name}_{uuid.uuid4().hex}"
     table = bigquery.Table(temp_table_id, schema=schema)
+    table.expires = datetime.now(timezone.utc) + timedelta(hours=BQ_STAGING_TABLE_EXPIRATION_HOURS)
     client.create_table(table)
+    return temp_table_id
+
+
+# Arrow types for the BigQuery column types used by the upload schemas
+_ARROW_TYPES = {
+    "DATE": pa.date32(),
+    "INTEGER": pa.int64(),
+    "FLOAT": pa.float64(),
+    "STRING": pa.string(),
+}
 
-    # Upload
+
+# GoogleSQL types and logical bytes per non-NULL value (STRING: 2 + UTF-8 length)
+# for the BigQuery column types used by the upload schemas
+_SQL_TYPES = {
+    "DATE": "DATE",
+    "INTEGER": "INT64",
+    "FLOAT": "FLOAT64",
+    "STRING": "STRING",
+}
+_LOGICAL_VALUE_BYTES = {
+    "DATE": 8,
+    "INTEGER": 8,
+    "FLOAT": 8,
+}
+
+
+def _to_arrow_array(values: pd.Series, field: bigquery.SchemaField) -> pa.Array:
+    """Arrow array of a DataFrame column, typed for the field's BigQuery type"""
+    if field.field_type == "DATE":
+        values = pd.to_datetime(values)
+    return pa.array(values, from_pandas=True).cast(_ARROW_TYPES.get(field.field_type, pa.string()))
+
+
+def to_arrow_table(df: pd.DataFrame, schema: list) -> pa.Table:
+    """
+    Convert the schema's columns of a DataFrame to an Arrow table typed for
+    BigQuery, without an intermediate pandas copy. Columns missing from df
+    are loaded as NULL.
+
+    Args:
+        df: DataFrame to upload
+        schema: BigQuery schema (column order and types)
+
+    Returns:
+        Arrow table with one column per schema field
+    """
+    arrays = []
+    for field in schema:
+        arrow_type = _ARROW_TYPES.get(field.field_type, pa.string())
+        if field.name not in df.columns:
+            arrays.append(pa.nulls(len(df), type=arrow_type))
+            continue
+        arrays.append(_to_arrow_array(df[field.name], field))
+    return pa.Table.from_arrays(arrays, names=[field.name for field in schema])
+
+
+def _logical_bytes(df: pd.DataFrame, schema: list) -> int:
+    """
+    Bytes BigQuery bills for reading the schema's columns of df once,
+    using its logical sizes per type (NULLs are free). Columns are
+    converted one at a time, so no full copy of the frame is made.
+
+    Args:
+        df: DataFrame to upload
+        schema: BigQuery schema of the columns read
+
+    Returns:
+        Logical size in bytes
+    """
+    total = 0
+    for field in schema:
+        if field.name not in df.columns:
+            continue
+        values = _to_arrow_array(df[field.name], field)
+        non_null = len(values) - values.null_count
+        if field.field_type in _LOGICAL_VALUE_BYTES:
+            total += non_null * _LOGICAL_VALUE_BYTES[field.field_type]
+        else:
+            total += 2 * non_null + (pc.sum(pc.binary_length(values)).as_py() or 0)
+    return total
+
+
+def _inline_source_sql(schema: list) -> str:
+    """
+    Empty relation typed like an upload's staging table, so the stats and
+    MERGE can be dry-run without creating one.
+    """
+    fields = ", ".join(f"`{field.name}` {_SQL_TYPES.get(field.field_type, 'STRING')}" for field in schema)
+    return f"UNNEST(ARRAY<STRUCT<{fields}>>[])"
+
+
+def _load_parquet_chunk(
+    client: bigquery.Client,
+    chunk: pa.Table,
+    table_id: str,
+    schema: list,
+    write_disposition: str
+) -> dict:
+    """Serialize one Arrow chunk to compressed Parquet and load it; returns the load job's telemetry"""
+    buffer = io.BytesIO()
+    pq.write_table(chunk, buffer, compression=BQ_LOAD_PARQUET_COMPRESSION)
+    buffer.seek(0)
     job_config = bigquery.LoadJobConfig(
-        write_disposition="WRITE_TRUNCATE",
+        source_format=bigquery.SourceFormat.PARQUET,
+        write_disposition=write_disposition,
+        create_disposition="CREATE_NEVER",
         schema=schema
     )
-    job = client.load_table_from_dataframe(df, temp_table_id, job_config=job_config)
+    job = client.load_table_from_file(buffer, table_id, job_config=job_config)
     job.result()
+    return _job_telemetry("load", job)
 
 
-def _get_merge_stats(
+def _load_arrow_table(
     client: bigquery.Client,
-    main_table: str,
-    temp_table: str,
-    has_status_col: bool = True
-) -> dict:
+    table: pa.Table,
+    table_id: str,
+    schema: list,
+    write_disposition: str = "WRITE_APPEND"
+) -> List[dict]:
     """
-    Compute merge statistics BEFORE the merge executes:
-    - new_records: rows in temp that don't exist in main (by Mobile+Month+Year key)
-    - status_updates: breakdown of status transitions that will occur
-    - total_rows: projected total after merge
+    Load an Arrow table as BQ_LOAD_CHUNK_ROWS-row Parquet chunks, running up
+    to BQ_LOAD_PARALLELISM load jobs at once. Each worker slices (zero-copy)
+    and serializes its own chunk, so at most BQ_LOAD_PARALLELISM compressed
+    chunks are in memory.
 
     Args:
         client: BigQuery client
-        main_table: Full ID of the main table
-        temp_table: Full ID of the temp staging table
-        has_status_col: Whether the table has a Status column
+        table: Output of to_arrow_table
+        table_id: Full ID of an existing table
+        schema: BigQuery schema
+        write_disposition: WRITE_APPEND, or WRITE_TRUNCATE to replace the table
 
     Returns:
-        stats dict with keys: new_records, status_updates, total_rows
+        Telemetry records of the load jobs
     """
-    stats = {
-        'new_records': 0,
-        'status_updates': {},
-        'total_rows': 0
-    }
+    offsets = list(range(0, max(table.num_rows, 1), BQ_LOAD_CHUNK_ROWS))
+    telemetry = []
 
-    # Check if main table has data
-    count_query = f"SELECT COUNT(*) as cnt FROM `{main_table}`"
-    try:
-        count_result = client.query(count_query).result()
-        main_count = list(count_result)[0].cnt
-    except Exception:
-        main_count = 0
-
-    # If main table is empty, all temp rows are new
-    if main_count == 0:
-        temp_count_query = f"SELECT COUNT(*) as cnt FROM `{temp_table}`"
-        temp_result = client.query(temp_count_query).result()
-        temp_count = list(temp_result)[0].cnt
-        stats['new_records'] = temp_count
-        stats['total_rows'] = temp_count
-        return stats
-
-    # Count new records (in temp but not in main)
-    new_records_query = f"""
-        SELECT COUNT(*) as new_records
-        FROM `{temp_table}` t
-        LEFT JOIN `{main_table}` m
-            ON t.Mobile = m.Mobile AND t.Month = m.Month AND t.Year = m.Year
-        WHERE m.Mobile IS NULL
-    """
-    result = client.query(new_records_query).result()
-    stats['new_records'] = list(result)[0].new_records
-
-    # Count status transitions (only for records where source will overwrite target)
-    if has_status_col:
-        status_priority_source = _STATUS_PRIORITY_SQL.format(col="t.Status")
-        status_priority_target = _STATUS_PRIORITY_SQL.format(col="m.Status")
+    # A truncating load must land before the chunks appended after it
+    if write_disposition == "WRITE_TRUNCATE":
+        telemetry.append(
+            _load_parquet_chunk(client, table.slice(0, BQ_LOAD_CHUNK_ROWS), table_id, schema, write_disposition)
+        )
+        offsets = offsets[1:]
+    if not offsets:
+        return telemetry
+
+    with ThreadPoolExecutor(max_workers=BQ_LOAD_PARALLELISM, thread_name_prefix="pnm-bq-load") as pool:
+        futures = [
+            pool.submit(
+                _load_parquet_chunk, client, table.slice(offset, BQ_LOAD_CHUNK_ROWS), table_id, schema, "WRITE_APPEND"
+            )
+            for offset in offsets
+        ]
+        telemetry.extend(future.result() for future in futures)
+    return telemetry
 
-        status_query = f"""
-            SELECT
-                m.Status as old_status,
-                t.Status as new_status,
-                COUNT(*) as cnt
-            FROM `{temp_table}` t
-            JOIN `{main_table}` m
-                ON t.Mobile = m.Mobile AND t.Month = m.Month AND t.Year = m.Year
-            WHERE m.Status != t.Status
-              AND (
-                  t.Date > m.Date
-                  OR (t.Date = m.Date AND ({status_priority_source}) >= ({status_priority_target}))
-              )
-            GROUP BY 1, 2
-        """
-        try:
-            rows = client.query(status_query).result()
-            for row in rows:
-                change_key = f"{row.old_status} → {row.new_status}"
-                stats['status_updates'][change_key] = row.cnt
-        except Exception:
-            pass  # Status tracking is best-effort
 
-    # Projected total rows after merge
-    # = existing rows that won't be touched + new rows from temp
-    # (updates replace existing rows, so count stays same for those)
-    stats['total_rows'] = main_count + stats['new_records']
+def _row_fingerprint_sql(columns: List[str], alias: Optional[str] = None, dialect: str = "bigquery") -> str:
+    """
+    SQL expression fingerprinting a row's non-key columns (NULLs included).
+
+    Args:
+        columns: Upload column names (key columns are skipped)
+        alias: Table alias to qualify the columns with, if any
+        dialect: 'bigquery' (FARM_FINGERPRINT) or 'duckdb' (hash)
 
-    return stats
+    Returns:
+        INT64 SQL expression
+    """
+    quote = _SQL_IDENTIFIER_QUOTES[dialect]
+    prefix = f"{alias}." if alias else ""
+    values = ", ".join(f"{prefix}{quote}{c}{quote}" for c in columns if c not in ('Mobile', 'Month', 'Year'))
+    if dialect == "bigquery":
+        return f"FARM_FINGERPRINT(TO_JSON_STRING(STRUCT({values})))"
+    # DuckDB hashes are UBIGINT; drop the top bit so they fit the INTEGER column
+    return f"CAST(hash({values}) >> 1 AS BIGINT)"
 
 
 def _build_merge_sql(
     main_table: str,
-    temp_table: str,
+    source: str,
     columns: List[str],
-    has_status_col: bool = True
+    has_status_col: bool = True,
+    date_bounds: Optional[Tuple[str, str]] = None,
+    dialect: str = "bigquery",
+    main_has_fingerprint: bool = True
 ) -> str:
     """
     Build the SQL MERGE statement that implements:
     - Key: Mobile + Month + Year
     - If dates differ: keep the record with the LATEST date
     - If dates are same: keep the record with higher STATUS PRIORITY
+    - Rows whose fingerprint matches the stored one are identical: no UPDATE
     - New records (not in main): INSERT
+    Both branches store the source row's fingerprint.
 
     Args:
         main_table: Full ID of the main table
-        temp_table: Full ID of the temp staging table
-        columns: List of column names
+        source: SQL relation the upload is read from (quoted staging table or inline UNNEST)
+        columns: List of column names (without the fingerprint column)
         has_status_col: Whether the table has a Status column
+        date_bounds: Target Date range to scan (see _merge_date_bounds)
+        dialect: 'bigquery' or 'duckdb' (identifier quoting and UPDATE SET syntax)
+        main_has_fingerprint: Whether the main table has the fingerprint column yet;
+            if not, stored fingerprints read as NULL and none is written (estimates only)
 
     Returns:
         SQL MERGE string
     """
+    quote = _SQL_IDENTIFIER_QUOTES[dialect]
+    # DuckDB doesn't accept qualified column names in UPDATE SET
+    set_prefix = "target." if dialect == "bigquery" else ""
+
     # Build the UPDATE SET clause (all columns except the key columns)
     key_cols = {'Mobile', 'Month', 'Year'}
     update_cols = [c for c in columns if c not in key_cols]
     
     update_statements = []
     for c in update_cols:
+        column = f"{quote}{c}{quote}"
         if c in ['CUSTOMER_TYPE', 'PACKAGE_NAME']:
-            update_statements.append(f"target.`{c}` = COALESCE(target.`{c}`, source.`{c}`)")
+            update_statements.append(f"{set_prefix}{column} = COALESCE(target.{column}, source.{column})")
         else:
-            update_statements.append(f"target.`{c}` = source.`{c}`")
+            update_statements.append(f"{set_prefix}{column} = source.{column}")
             
+    fingerprint = f"{quote}{BQ_ROW_FINGERPRINT_COLUMN}{quote}"
+    stored_columns = list(columns)
+    target_fingerprint = "NULL"
+    if main_has_fingerprint:
+        update_statements.append(f"{set_prefix}{fingerprint} = source.{fingerprint}")
+        stored_columns.append(BQ_ROW_FINGERPRINT_COLUMN)
+        target_fingerprint = f"target.{fingerprint}"
+
     update_set = ",\n        ".join(update_statements)
 
     # Build the INSERT columns and values
-    insert_cols = ", ".join([f"`{c}`" for c in columns])
-    insert_vals = ", ".join([f"source.`{c}`" for c in columns])
+    insert_cols = ", ".join(f"{quote}{c}{quote}" for c in stored_columns)
+    insert_vals = ", ".join(f"source.{quote}{c}{quote}" for c in stored_columns)
 
     # Build the WHEN MATCHED condition
     if has_status_col:
@@ -370,13 +712,17 @@ def _build_merge_sql(
         match_condition = "source.Date > target.Date"
 
     merge_sql = f"""
-    MERGE `{main_table}` AS target
-    USING `{temp_table}` AS source
+    MERGE INTO {quote}{main_table}{quote} AS target
+    USING (
+        SELECT *, {_row_fingerprint_sql(columns, dialect=dialect)} AS {fingerprint}
+        FROM {source}
+    ) AS source
     ON target.Mobile = source.Mobile
        AND target.Month = source.Month
        AND target.Year = source.Year
+       {_date_filter("target", date_bounds)}
 
-    WHEN MATCHED AND (
+    WHEN MATCHED AND {target_fingerprint} IS DISTINCT FROM source.{fingerprint} AND (
         {match_condition}
     ) THEN UPDATE SET
         {update_set}
@@ -389,6 +735,143 @@ def _build_merge_sql(
     return merge_sql
 
 
+def _build_merge_stats_queries(
+    main_table: str,
+    source: str,
+    has_status_col: bool = True,
+    date_bounds: Optional[Tuple[str, str]] = None
+) -> Dict[str, str]:
+    """
+    Build the queries computing the merge statistics the MERGE itself
+    doesn't report (inserted and updated rows come from its DML stats):
+    - main_rows: rows in main before the merge
+    - status_updates: ARRAY of (old_status, new_status, cnt) transitions the MERGE applies
+      (only when has_status_col; NULL when there are none)
+
+    Args:
+        main_table: Full ID of the main table
+        source: SQL relation the upload is read from (quoted staging table or inline UNNEST)
+        has_status_col: Whether the table has a Status column
+        date_bounds: Main-table Date range the queries scan (see _merge_date_bounds)
+
+    Returns:
+        Dict of statistic name -> single-value SELECT
+    """
+    queries = {
+        'main_rows': f"SELECT COUNT(*) FROM `{main_table}`",
+    }
+
+    if has_status_col:
+        main_date_filter = _date_filter("m", date_bounds)
+        status_priority_source = _STATUS_PRIORITY_SQL.format(col="t.Status")
+        status_priority_target = _STATUS_PRIORITY_SQL.format(col="m.Status")
+
+        # Count status transitions (only for records where source will overwrite target)
+        queries['status_updates'] = f"""
+        SELECT ARRAY_AGG(STRUCT(old_status, new_status, cnt))
+        FROM (
+            SELECT
+                m.Status AS old_status,
+                t.Status AS new_status,
+                COUNT(*) AS cnt
+            FROM {source} t
+            JOIN `{main_table}` m
+                ON t.Mobile = m.Mobile AND t.Month = m.Month AND t.Year = m.Year
+                {main_date_filter}
+            WHERE m.Status != t.Status
+              AND (
+                  t.Date > m.Date
+                  OR (t.Date = m.Date AND ({status_priority_source}) >= ({status_priority_target}))
+              )
+            GROUP BY 1, 2
+        )"""
+
+    return queries
+
+
+def _build_merge_script(
+    main_table: str,
+    temp_table: str,
+    columns: List[str],
+    has_status_col: bool = True,
+    date_bounds: Optional[Tuple[str, str]] = None
+) -> str:
+    """
+    Build a BigQuery script that computes the merge statistics, runs the
+    MERGE and drops the temp table in a single job. On failure the temp
+    table is kept so the script can be retried. The script's final
+    SELECT returns one row with the statistics of _build_merge_stats_queries
+    plus merged_rows: rows inserted or updated by the MERGE (@@row_count)
+    and total_rows: rows in main after the MERGE. Both counts are
+    metadata-only reads.
+
+    Args:
+        main_table: Full ID of the main table
+        temp_table: Full ID of the temp staging table
+        columns: List of column names
+        has_status_col: Whether the table has a Status column
+        date_bounds: Main-table Date range the stats and MERGE scan (see _merge_date_bounds)
+
+    Returns:
+        SQL script string
+    """
+    queries = _build_merge_stats_queries(main_table, f"`{temp_table}`", has_status_col, date_bounds)
+    status_updates_sql = ""
+    if 'status_updates' in queries:
+        status_updates_sql = f"SET status_updates = IFNULL(({queries['status_updates']}\n    ), []);"
+
+    merge_sql = _build_merge_sql(main_table, f"`{temp_table}`", columns, has_status_col, date_bounds)
+
+    return f"""
+    DECLARE main_rows INT64;
+    DECLARE merged_rows INT64;
+    DECLARE total_rows INT64;
+    DECLARE status_updates ARRAY<STRUCT<old_status STRING, new_status STRING, cnt INT64>> DEFAULT [];
+
+    SET main_rows = ({queries['main_rows']});
+
+    {status_updates_sql}
+
+    {merge_sql};
+    SET merged_rows = @@row_count;
+    SET total_rows = ({queries['main_rows']});
+
+    DROP TABLE IF EXISTS `{temp_table}`;
+
+    SELECT main_rows, merged_rows, total_rows, status_updates;
+    """
+
+
+def _is_concurrent_update_error(error: Exception) -> bool:
+    """Whether a query failed because another DML statement updated the table first"""
+    return "Could not serialize access" in str(error) or "concurrent update" in str(error)
+
+
+def _run_merge_script(client: bigquery.Client, script: str):
+    """
+    Run a merge script, retrying with backoff when it conflicts with a
+    concurrent upload to the same table. Scripts that would bill more than
+    BQ_UPLOAD_MAX_BYTES are refused by BigQuery.
+
+    Args:
+        client: BigQuery client
+        script: Output of _build_merge_script
+
+    Returns:
+        Tuple of (the script's result row, the script job)
+    """
+    # BigQuery fails the job instead of running it when it would bill more than the budget
+    job_config = bigquery.QueryJobConfig(maximum_bytes_billed=BQ_UPLOAD_MAX_BYTES or None)
+    for attempt in range(1, BQ_MERGE_MAX_ATTEMPTS + 1):
+        try:
+            job = client.query(script, job_config=job_config)
+            return list(job.result())[0], job
+        except Exception as e:
+            if attempt == BQ_MERGE_MAX_ATTEMPTS or not _is_concurrent_update_error(e):
+                raise
+            time.sleep(2 ** attempt)
+
+
 def _execute_merge_via_temp_table(
     client: bigquery.Client,
     df: pd.DataFrame,
@@ -400,60 +883,436 @@ def _execute_merge_via_temp_table(
     """
     Core merge routine shared by both upload functions.
 
-    1. Upload df to a temp staging table
-    2. Compute merge stats (new records, status changes)
-    3. Execute SQL MERGE from temp → main
-    4. Drop temp table
-    5. Return stats
+    1. Load df into a new, uniquely named staging table (parallel Parquet load jobs)
+    2. Run one script that computes the merge stats, executes the SQL MERGE
+       from temp → main and drops the temp table (retried when a concurrent
+       upload to the same table conflicts)
+    3. Return stats, taking inserted and updated rows from the MERGE's DML
+       stats, with a telemetry record per job in stats['telemetry']
 
     Args:
         client: BigQuery client
-        df: Prepared DataFrame to upload
+        df: DataFrame to upload (only the schema's columns are loaded)
         table_name: Name of the main table
-        schema: BigQuery schema
+        schema: BigQuery schema of the upload (the main table also gets the fingerprint column)
         columns: Ordered list of column names
         has_status_col: Whether Status column exists
 
     Returns:
         Tuple of (success, stats_dict, message)
     """
-    main_table_id = ensure_table_exists(client, table_name, schema)
-    temp_table_name = f"_temp_{table_name}"
-    temp_table_id = f"{client.project}.{BQ_DATASET_ID}.{temp_table_name}"
+    temp_table_id = None
+    telemetry = []
 
     try:
-        # Step 1: Upload new data to temp table
-        _upload_to_temp_table(client, df, temp_table_id, schema)
+        # Step 1: Upload new data to a staging table private to this upload
+        started = time.time()
+        main_table_id = ensure_table_exists(client, table_name, _with_fingerprint(schema))
+        temp_table_id = _create_staging_table(client, table_name, schema)
+        telemetry.append(step_record("setup", started, time.time()))
+        telemetry.extend(_load_arrow_table(client, to_arrow_table(df, schema), temp_table_id, schema))
+
+        # Step 2: Stats + MERGE + cleanup in a single scripted job
+        script = _build_merge_script(
+            main_table_id, temp_table_id, columns, has_status_col, _merge_date_bounds(df)
+        )
+        result, script_job = _run_merge_script(client, script)
+        children = _script_children(client, script_job)
+        telemetry.extend(_script_telemetry(script_job, children))
 
-        # Step 2: Get merge stats before executing
-        stats = _get_merge_stats(client, main_table_id, temp_table_id, has_status_col)
+        dml_stats = _merge_dml_stats(children)
+        if dml_stats is not None:
+            new_records, updated_records = dml_stats
+        else:
+            # Only the MERGE adds rows, so the growth of the table is what it inserted
+            new_records = (result.total_rows or 0) - (result.main_rows or 0)
+            updated_records = (result.merged_rows or 0) - new_records
+        stats = {
+            'new_records': new_records,
+            'updated_records': updated_records,
+            # Staged rows neither inserted nor updated were left untouched
+            'unchanged_records': len(df) - new_records - updated_records,
+            'status_updates': {
+                f"{update['old_status']} → {update['new_status']}": update['cnt']
+                for update in (result.status_updates or [])
+            },
+            'total_rows': result.total_rows or 0,
+            'telemetry': telemetry
+        }
 
-        # Step 3: Execute MERGE
-        merge_sql = _build_merge_sql(main_table_id, temp_table_id, columns, has_status_col)
-        merge_job = client.query(merge_sql)
-        merge_job.result()  # Wait for completion
+        message = f"Successfully uploaded to {table_name}"
+        return True, stats, message
 
-        # Update total_rows with actual count after merge
-        count_query = f"SELECT COUNT(*) as cnt FROM `{main_table_id}`"
-        count_result = client.query(count_query).result()
-        stats['total_rows'] = list(count_result)[0].cnt
+    except Exception as e:
+        # The table may have been dropped or changed elsewhere; look it up again next time
+        get_table_metadata_cache().invalidate(f"{client.project}.{BQ_DATASET_ID}.{table_name}")
 
-        # Step 4: Cleanup temp table
+        # Cleanup temp table on error (it expires on its own if this fails too)
+        if temp_table_id is not None:
+            try:
+                client.delete_table(temp_table_id, not_found_ok=True)
+            except Exception:
+                pass
+        stats = {'new_records': 0, 'status_updates': {}, 'total_rows': 0, 'telemetry': telemetry}
+        return False, stats, f"Error uploading to BigQuery: {str(e)}"
+
+
+# ---------------------------------------------------------------------------
+# Storage backends
+# ---------------------------------------------------------------------------
+
+class StorageBackend:
+    """
+    Where uploads are merged. Implementations apply the same MERGE rules
+    (see _build_merge_sql) and return the same stats dict.
+    """
+
+    name = ""
+    display_name = ""
+
+    def table_ref(self, table_name: str) -> str:
+        """Identifier of a table across backends and projects (used as the upload ledger key)"""
+        raise NotImplementedError
+
+    def merge(self, table_name: str, df: pd.DataFrame, schema: list, has_status_col: bool) -> Tuple[bool, dict, str]:
+        """
+        Upsert df into a table by Mobile + Month + Year.
+
+        Args:
+            table_name: Name of the main table (created if missing)
+            df: DataFrame to upload (only the schema's columns are loaded)
+            schema: BigQuery schema describing the table
+            has_status_col: Whether the table has a Status column
+
+        Returns:
+            Tuple of (success, stats_dict, message)
+        """
+        raise NotImplementedError
+
+    def replace(self, table_name: str, df: pd.DataFrame, schema: list) -> Tuple[bool, dict, str]:
+        """
+        Replace a table's contents with df (for frames without merge keys).
+
+        Returns:
+            Tuple of (success, stats_dict, message)
+        """
+        raise NotImplementedError
+
+    def reset(self, table_name: str, date_bounds: Optional[Tuple[str, str]] = None) -> Tuple[bool, str]:
+        """
+        Delete a table's rows, or only those dated within date_bounds. A
+        missing GA-SF table is created empty.
+
+        Args:
+            table_name: Name of the table
+            date_bounds: Optional ('YYYY-MM-DD', 'YYYY-MM-DD') Date range, inclusive
+
+        Returns:
+            Tuple of (success, message)
+        """
+        raise NotImplementedError
+
+    def export_telemetry(self, rows: List[dict]) -> None:
+        """Copy logged telemetry rows to the warehouse, if configured (no-op by default)"""
+
+    def estimate(self, table_name: str, df: pd.DataFrame, schema: list, has_status_col: bool) -> dict:
+        """
+        Estimate what merging df would scan, without writing anything.
+
+        Returns:
+            Dict with bytes_processed and partitions (existing Date partitions
+            the merge scans, None when the table isn't partitioned)
+        """
+        raise NotImplementedError
+
+
+class BigQueryBackend(StorageBackend):
+    """Merges into BigQuery through staging tables and a scripted MERGE"""
+
+    name = "bigquery"
+    display_name = "BigQuery"
+
+    def table_ref(self, table_name: str) -> str:
+        return f"bigquery:{get_bq_client().project}.{BQ_DATASET_ID}.{table_name}"
+
+    def merge(self, table_name: str, df: pd.DataFrame, schema: list, has_status_col: bool) -> Tuple[bool, dict, str]:
+        return _execute_merge_via_temp_table(
+            client=get_bq_client(),
+            df=df,
+            table_name=table_name,
+            schema=schema,
+            columns=[field.name for field in schema],
+            has_status_col=has_status_col
+        )
+
+    def replace(self, table_name: str, df: pd.DataFrame, schema: list) -> Tuple[bool, dict, str]:
+        client = get_bq_client()
+        started = time.time()
+        full_table_id = ensure_table_exists(client, table_name, schema)
+        telemetry = [step_record("setup", started, time.time())]
+        telemetry.extend(_load_arrow_table(client, to_arrow_table(df, schema), full_table_id, schema, "WRITE_TRUNCATE"))
+
+        stats = {
+            'new_records': len(df),
+            'status_updates': {},
+            'total_rows': len(df),
+            'telemetry': telemetry
+        }
+        return True, stats, f"Successfully uploaded to {table_name}"
+
+    def reset(self, table_name: str, date_bounds: Optional[Tuple[str, str]] = None) -> Tuple[bool, str]:
+        client = get_bq_client()
+        ensure_dataset_exists(client)
+        full_table_id = f"{client.project}.{BQ_DATASET_ID}.{table_name}"
+
+        cache = get_table_metadata_cache()
+        cache.invalidate(full_table_id)
         try:
-            client.delete_table(temp_table_id)
+            cache.put(full_table_id, client.get_table(full_table_id))
         except NotFound:
-            pass
+            if table_name == BQ_TABLE_GA_SF:
+                # Create fresh table
+                ensure_table_exists(client, table_name, _with_fingerprint(GA_SF_SCHEMA))
+                return True, f"Successfully reset table {table_name}"
+            return True, f"Table {table_name} does not exist yet; nothing to reset"
+
+        if date_bounds is None:
+            # Keeps the schema, partitioning and clustering, unlike drop-and-recreate
+            client.query(f"TRUNCATE TABLE `{full_table_id}`").result()
+            return True, f"Successfully reset table {table_name}"
+
+        # A filter on whole Date partitions is applied by dropping those partitions
+        job = client.query(
+            f"DELETE FROM `{full_table_id}` WHERE Date BETWEEN DATE '{date_bounds[0]}' AND DATE '{date_bounds[1]}'"
+        )
+        job.result()
+        return True, (
+            f"Successfully deleted {job.num_dml_affected_rows or 0} rows dated "
+            f"{date_bounds[0]} to {date_bounds[1]} from {table_name}"
+        )
 
-        message = f"Successfully uploaded to {table_name}"
-        return True, stats, message
+    def export_telemetry(self, rows: List[dict]) -> None:
+        telemetry_table = get_telemetry_settings()['bigquery_table']
+        if telemetry_table is None or not rows:
+            return
+        client = get_bq_client()
+        ensure_dataset_exists(client)
+        table = bigquery.Table(f"{client.project}.{BQ_DATASET_ID}.{telemetry_table}", schema=TELEMETRY_SCHEMA)
+        client.create_table(table, exists_ok=True)
+        # A load job rather than streaming inserts: free, and the rows are queryable at once
+        job_config = bigquery.LoadJobConfig(schema=TELEMETRY_SCHEMA, write_disposition="WRITE_APPEND")
+        fields = [field.name for field in TELEMETRY_SCHEMA]
+        client.load_table_from_json(
+            [{name: row.get(name) for name in fields} for row in rows], table, job_config=job_config
+        ).result()
+
+    def estimate(self, table_name: str, df: pd.DataFrame, schema: list, has_status_col: bool) -> dict:
+        # Dry-run the stats queries and the MERGE against an inline, empty upload
+        client = get_bq_client()
+        full_table_id = f"{client.project}.{BQ_DATASET_ID}.{table_name}"
+        columns = [field.name for field in schema]
+        date_bounds = _merge_date_bounds(df)
+
+        # The MERGE reads every staged column; the status transitions read the key, Date and Status
+        staging_bytes = _logical_bytes(df, schema)
+        if has_status_col:
+            read_columns = {'Mobile', 'Month', 'Year', 'Date', 'Status'}
+            staging_bytes += _logical_bytes(df, [field for field in schema if field.name in read_columns])
+
+        # A cached entry has already been migrated; don't cache one that hasn't
+        table = get_table_metadata_cache().get(full_table_id)
+        if table is None:
+            try:
+                table = client.get_table(full_table_id)
+            except NotFound:
+                # The upload would create the table, so only the staged rows are read
+                return {'bytes_processed': staging_bytes, 'partitions': 0}
+
+        source = _inline_source_sql(schema)
+        queries = list(_build_merge_stats_queries(full_table_id, source, has_status_col, date_bounds).values())
+        queries.append(_build_merge_sql(
+            full_table_id, source, columns, has_status_col, date_bounds,
+            main_has_fingerprint=any(field.name == BQ_ROW_FINGERPRINT_COLUMN for field in table.schema)
+        ))
+        job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+        main_bytes = sum(
+            client.query(query, job_config=job_config).total_bytes_processed or 0
+            for query in queries
+        )
+
+        return {
+            'bytes_processed': main_bytes + staging_bytes,
+            'partitions': _existing_partitions(client, table, date_bounds),
+        }
+
+
+def _existing_partitions(
+    client: bigquery.Client,
+    table: bigquery.Table,
+    date_bounds: Optional[Tuple[str, str]]
+) -> Optional[int]:
+    """
+    Date partitions of a table that hold rows within date_bounds (every
+    partition when unbounded), read from INFORMATION_SCHEMA.PARTITIONS.
+
+    Returns:
+        Partition count, or None if the table isn't partitioned by day
+    """
+    if table.time_partitioning is None:
+        return None
+    range_filter = ""
+    if date_bounds is not None:
+        first, last = (bound.replace('-', '') for bound in date_bounds)
+        range_filter = f"AND partition_id BETWEEN '{first}' AND '{last}'"
+    query = f"""
+    SELECT COUNT(*)
+    FROM `{table.project}.{table.dataset_id}.INFORMATION_SCHEMA.PARTITIONS`
+    WHERE table_name = '{table.table_id}'
+      AND partition_id NOT IN ('__NULL__', '__UNPARTITIONED__')
+      AND total_rows > 0
+      {range_filter}
+    """
+    return list(client.query(query).result())[0][0]
+
+
+_storage_backend: Optional[StorageBackend] = None
+_storage_backend_settings: Optional[dict] = None
+_storage_backend_lock = threading.Lock()
+
+
+def get_storage_backend() -> StorageBackend:
+    """
+    Get the process-wide storage backend selected by the [storage] secrets
+    section (BigQuery by default).
+
+    Returns:
+        StorageBackend instance
+    """
+    global _storage_backend, _storage_backend_settings
+    settings = get_storage_settings()
+
+    with _storage_backend_lock:
+        if _storage_backend is None or _storage_backend_settings != settings:
+            if settings['backend'] == "duckdb":
+                # Imported lazily so BigQuery-only deployments don't need duckdb installed
+                from .duckdb_backend import DuckDBBackend
+                _storage_backend = DuckDBBackend(settings['duckdb_path'])
+            else:
+                _storage_backend = BigQueryBackend()
+            _storage_backend_settings = settings
+        return _storage_backend
+
+
+def _upload_once(
+    backend: StorageBackend,
+    table_name: str,
+    df: pd.DataFrame,
+    date_bounds: Optional[Tuple[str, str]],
+    upload
+) -> Tuple[bool, dict, str]:
+    """
+    Run an upload unless the upload ledger shows this exact frame was already
+    uploaded to the table (and nothing overlapping was uploaded since).
+
+    Args:
+        backend: Storage backend
+        table_name: Name of the main table
+        df: Frame being uploaded
+        date_bounds: Date range the upload can change (None for the whole table)
+        upload: Zero-argument callable performing the upload
 
+    Returns:
+        Tuple of (success, stats_dict, message); stats of a skipped upload are
+        the recorded ones (without telemetry), with cached=True and recorded_at;
+        telemetry_error is set when the upload's telemetry couldn't be recorded
+    """
+    ledger = get_upload_ledger()
+    table_ref = backend.table_ref(table_name)
+    fingerprint = fingerprint_frame(df)
+
+    entry = ledger.lookup(table_ref, fingerprint)
+    if entry is not None:
+        uploaded_at = datetime.fromtimestamp(entry['uploaded_at']).strftime('%Y-%m-%d %H:%M')
+        stats = dict(entry['stats'], cached=True, recorded_at=uploaded_at)
+        return True, stats, f"{table_name} already has this data (uploaded {uploaded_at}); nothing was re-uploaded"
+
+    success, stats, message = upload()
+    if stats.get('telemetry'):
+        telemetry_error = _record_telemetry(backend, table_ref, stats['telemetry'], success)
+        if telemetry_error:
+            stats['telemetry_error'] = telemetry_error
+    if success:
+        recorded = {k: v for k, v in stats.items() if k not in ('telemetry', 'telemetry_error')}
+        ledger.record(table_ref, fingerprint, len(df), date_bounds, recorded)
+    return success, stats, message
+
+
+def _record_telemetry(backend: StorageBackend, table_ref: str, telemetry: List[dict], success: bool) -> Optional[str]:
+    """
+    Log an upload's job telemetry locally and to the backend. A failure here
+    never fails the upload; it is reported instead.
+
+    Returns:
+        Error message if the telemetry couldn't be recorded, else None
+    """
+    try:
+        backend.export_telemetry(log_upload_telemetry(table_ref, telemetry, success))
     except Exception as e:
-        # Cleanup temp table on error
-        try:
-            client.delete_table(temp_table_id)
-        except Exception:
-            pass
-        return False, {'new_records': 0, 'status_updates': {}, 'total_rows': 0}, f"Error uploading to BigQuery: {str(e)}"
+        return f"Upload telemetry was not recorded: {str(e)}"
+    return None
+
+
+def _dynamic_schema(df: pd.DataFrame) -> list:
+    """BigQuery schema derived from a DataFrame's columns and dtypes"""
+    schema = []
+    for col in df.columns:
+        dtype = df[col].dtype
+        if col == 'Date':
+            schema.append(bigquery.SchemaField(col, "DATE", mode="REQUIRED"))
+        elif dtype in ['int64', 'int32']:
+            schema.append(bigquery.SchemaField(col, "INTEGER", mode="NULLABLE"))
+        elif dtype == 'float64':
+            schema.append(bigquery.SchemaField(col, "FLOAT", mode="NULLABLE"))
+        else:
+            schema.append(bigquery.SchemaField(col, "STRING", mode="NULLABLE"))
+    return schema
+
+
+def _upload_plan(df: pd.DataFrame, table_name: str) -> Tuple[list, bool, bool]:
+    """
+    How a frame is uploaded to a table.
+
+    Returns:
+        Tuple of (schema, has_merge_keys, has_status_col); frames without
+        merge keys replace the table instead of being merged
+    """
+    if table_name == BQ_TABLE_GA_SF:
+        return GA_SF_SCHEMA, True, True
+    columns = list(df.columns)
+    has_merge_keys = all(c in columns for c in ['Mobile', 'Month', 'Year'])
+    return _dynamic_schema(df), has_merge_keys, 'Status' in columns
+
+
+def _upload_with_dynamic_schema(df: pd.DataFrame, table_name: str) -> Tuple[bool, dict, str]:
+    """
+    Merge a frame whose columns vary (NE/BHK views) into table_name, or
+    replace the table when the frame has no merge keys.
+    """
+    backend = get_storage_backend()
+    try:
+        schema, has_merge_keys, has_status_col = _upload_plan(df, table_name)
+
+        if has_merge_keys:
+            return _upload_once(
+                backend, table_name, df, _merge_date_bounds(df),
+                lambda: backend.merge(table_name, df, schema, has_status_col=has_status_col)
+            )
+        else:
+            # Fallback: no merge keys available, replace the table
+            return _upload_once(backend, table_name, df, None, lambda: backend.replace(table_name, df, schema))
+
+    except Exception as e:
+        return False, {'new_records': 0, 'status_updates': {}, 'total_rows': 0}, f"Error uploading to {backend.display_name}: {str(e)}"
 
 
 # ---------------------------------------------------------------------------
@@ -464,7 +1323,7 @@ def upload_ga_sf_data(
     df: pd.DataFrame
 ) -> Tuple[bool, dict, str]:
     """
-    Upload GA-SF mapped data to BigQuery using SQL MERGE with a temp table.
+    Upload GA-SF mapped data to the storage backend using SQL MERGE.
     For each Mobile-Month-Year key, keeps the record with the LATEST date.
     On same date, keeps the record with the higher STATUS PRIORITY.
 
@@ -473,32 +1332,24 @@ def upload_ga_sf_data(
 
     Returns:
         Tuple of (success, stats_dict, message)
-        stats_dict contains: new_records, status_updates, total_rows
+        stats_dict contains: new_records, updated_records, status_updates, total_rows
     """
     try:
-        client = get_bq_client()
-
-        target_columns = [field.name for field in GA_SF_SCHEMA]
-        upload_df = prepare_upload_df(df, target_columns)
-
-        return _execute_merge_via_temp_table(
-            client=client,
-            df=upload_df,
-            table_name=BQ_TABLE_GA_SF,
-            schema=GA_SF_SCHEMA,
-            columns=target_columns,
-            has_status_col=True
+        backend = get_storage_backend()
+        return _upload_once(
+            backend, BQ_TABLE_GA_SF, df, _merge_date_bounds(df),
+            lambda: backend.merge(BQ_TABLE_GA_SF, df, GA_SF_SCHEMA, has_status_col=True)
         )
 
     except Exception as e:
-        return False, {'new_records': 0, 'status_updates': {}, 'total_rows': 0}, f"Error uploading to BigQuery: {str(e)}"
+        return False, {'new_records': 0, 'status_updates': {}, 'total_rows': 0}, f"Error uploading data: {str(e)}"
 
 
 def upload_ga_sf_ne_data(
     df: pd.DataFrame
 ) -> Tuple[bool, dict, str]:
     """
-    Upload GA-SF-NE mapped data to BigQuery using SQL MERGE with a temp table.
+    Upload GA-SF-NE mapped data to the storage backend using SQL MERGE.
     Dynamically creates schema based on DataFrame columns.
     For each Mobile-Month-Year key, keeps the record with the LATEST date.
 
@@ -507,71 +1358,16 @@ def upload_ga_sf_ne_data(
 
     Returns:
         Tuple of (success, stats_dict, message)
-        stats_dict contains: new_records, status_updates, total_rows
+        stats_dict contains: new_records, updated_records, status_updates, total_rows
     """
-    try:
-        client = get_bq_client()
-
-        # Create dynamic schema based on DataFrame columns
-        schema = []
-        for col in df.columns:
-            dtype = df[col].dtype
-            if col == 'Date':
-                schema.append(bigquery.SchemaField(col, "DATE", mode="REQUIRED"))
-            elif dtype in ['int64', 'int32']:
-                schema.append(bigquery.SchemaField(col, "INTEGER", mode="NULLABLE"))
-            elif dtype == 'float64':
-                schema.append(bigquery.SchemaField(col, "FLOAT", mode="NULLABLE"))
-            else:
-                schema.append(bigquery.SchemaField(col, "STRING", mode="NULLABLE"))
-
-        # Ensure table exists
-        ensure_table_exists(client, BQ_TABLE_GA_SF_NE, schema)
-
-        # Prepare upload DataFrame
-        upload_df = df.copy()
-        if 'Date' in upload_df.columns:
-            upload_df['Date'] = pd.to_datetime(upload_df['Date']).dt.date
-
-        columns = list(upload_df.columns)
-        has_status = 'Status' in columns
-        has_merge_keys = all(c in columns for c in ['Mobile', 'Month', 'Year'])
-
-        if has_merge_keys:
-            return _execute_merge_via_temp_table(
-                client=client,
-                df=upload_df,
-                table_name=BQ_TABLE_GA_SF_NE,
-                schema=schema,
-                columns=columns,
-                has_status_col=has_status
-            )
-        else:
-            # Fallback: no merge keys available, do a simple append
-            full_table_id = f"{client.project}.{BQ_DATASET_ID}.{BQ_TABLE_GA_SF_NE}"
-            job_config = bigquery.LoadJobConfig(
-                write_disposition="WRITE_TRUNCATE",
-                schema=schema
-            )
-            job = client.load_table_from_dataframe(upload_df, full_table_id, job_config=job_config)
-            job.result()
-
-            stats = {
-                'new_records': len(upload_df),
-                'status_updates': {},
-                'total_rows': len(upload_df)
-            }
-            return True, stats, f"Successfully uploaded to {BQ_TABLE_GA_SF_NE}"
-
-    except Exception as e:
-        return False, {'new_records': 0, 'status_updates': {}, 'total_rows': 0}, f"Error uploading to BigQuery: {str(e)}"
+    return _upload_with_dynamic_schema(df, BQ_TABLE_GA_SF_NE)
 
 
 def upload_bhk_data(
     df: pd.DataFrame
 ) -> Tuple[bool, dict, str]:
     """
-    Upload BHK mapped data to BigQuery using SQL MERGE with a temp table.
+    Upload BHK mapped data to the storage backend using SQL MERGE.
     Dynamically creates schema based on DataFrame columns.
     For each Mobile-Month-Year key, keeps the record with the LATEST date.
 
@@ -580,61 +1376,53 @@ def upload_bhk_data(
 
     Returns:
         Tuple of (success, stats_dict, message)
-        stats_dict contains: new_records, status_updates, total_rows
+        stats_dict contains: new_records, updated_records, status_updates, total_rows
     """
-    try:
-        client = get_bq_client()
-
-        # Create dynamic schema based on DataFrame columns
-        schema = []
-        for col in df.columns:
-            dtype = df[col].dtype
-            if col == 'Date':
-                schema.append(bigquery.SchemaField(col, "DATE", mode="REQUIRED"))
-            elif dtype in ['int64', 'int32']:
-                schema.append(bigquery.SchemaField(col, "INTEGER", mode="NULLABLE"))
-            elif dtype == 'float64':
-                schema.append(bigquery.SchemaField(col, "FLOAT", mode="NULLABLE"))
-            else:
-                schema.append(bigquery.SchemaField(col, "STRING", mode="NULLABLE"))
+    return _upload_with_dynamic_schema(df, BQ_TABLE_BHK)
 
-        # Ensure table exists
-        ensure_table_exists(client, BQ_TABLE_BHK, schema)
 
-        # Prepare upload DataFrame
-        upload_df = df.copy()
-        if 'Date' in upload_df.columns:
-            upload_df['Date'] = pd.to_datetime(upload_df['Date']).dt.date
+def estimate_upload(
+    df: pd.DataFrame,
+    table_name: str
+) -> Tuple[bool, dict, str]:
+    """
+    Pre-flight an upload: dry-run its stats queries and MERGE to estimate the
+    bytes it would process, and check the estimate against the budget
+    (BQ_UPLOAD_WARN_BYTES / BQ_UPLOAD_MAX_BYTES). Nothing is written; when
+    the table doesn't exist yet, only the staged rows are counted.
 
-        columns = list(upload_df.columns)
-        has_status = 'Status' in columns
-        has_merge_keys = all(c in columns for c in ['Mobile', 'Month', 'Year'])
+    Args:
+        df: DataFrame that would be uploaded
+        table_name: Target table (BQ_TABLE_GA_SF, BQ_TABLE_GA_SF_NE or BQ_TABLE_BHK)
 
+    Returns:
+        Tuple of (success, estimate_dict, message)
+        estimate_dict contains: bytes_processed, partitions, budget ('ok', 'warn' or 'refuse')
+    """
+    try:
+        backend = get_storage_backend()
+        schema, has_merge_keys, has_status_col = _upload_plan(df, table_name)
         if has_merge_keys:
-            return _execute_merge_via_temp_table(
-                client=client,
-                df=upload_df,
-                table_name=BQ_TABLE_BHK,
-                schema=schema,
-                columns=columns,
-                has_status_col=has_status
-            )
+            estimate = backend.estimate(table_name, df, schema, has_status_col)
         else:
-            # Fallback: no merge keys available, do a simple append
-            full_table_id = f"{client.project}.{BQ_DATASET_ID}.{BQ_TABLE_BHK}"
-            job_config = bigquery.LoadJobConfig(
-                write_disposition="WRITE_TRUNCATE",
-                schema=schema
-            )
-            job = client.load_table_from_dataframe(upload_df, full_table_id, job_config=job_config)
-            job.result()
-
-            stats = {
-                'new_records': len(upload_df),
-                'status_updates': {},
-                'total_rows': len(upload_df)
-            }
-            return True, stats, f"Successfully uploaded to {BQ_TABLE_BHK}"
+            # Replacing a table is a load job, which BigQuery doesn't bill
+            estimate = {'bytes_processed': 0, 'partitions': None}
 
     except Exception as e:
-        return False, {'new_records': 0, 'status_updates': {}, 'total_rows': 0}, f"Error uploading to BigQuery: {str(e)}"
+        return False, {'bytes_processed': 0, 'partitions': None, 'budget': 'ok'}, f"Error estimating upload: {str(e)}"
+
+    bytes_processed = estimate['bytes_processed']
+    if BQ_UPLOAD_MAX_BYTES and bytes_processed > BQ_UPLOAD_MAX_BYTES:
+        estimate['budget'] = 'refuse'
+    elif bytes_processed > BQ_UPLOAD_WARN_BYTES:
+        estimate['budget'] = 'warn'
+    else:
+        estimate['budget'] = 'ok'
+
+    if not has_merge_keys:
+        return True, estimate, f"Upload to {table_name} replaces the table with a load job, which isn't billed"
+
+    partitions = estimate['partitions']
+    scope = f"{partitions} existing Date partition(s)" if partitions is not None else "the whole table"
+    message = f"Upload to {table_name} would process ~{bytes_processed / 1024 ** 3:.2f} GB across {scope}"
+    return True, estimate, message
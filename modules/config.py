@@ -1,14 +1,39 @@
 """
 Configuration module for GA-SF Mapping App
 """
+import json
+import os
+import tempfile
+from typing import Optional
+
 import streamlit as st
 
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
 # BigQuery Configuration
 BQ_PROJECT_ID = "dashbords-450707"
 BQ_DATASET_ID = "porter_pnm"
 BQ_TABLE_GA_SF = "GA_SF_Mapped"
 BQ_TABLE_GA_SF_NE = "NE_GA_SF_Mapped"
 BQ_TABLE_BHK = "BHK_NE_GA_SF_Mapped"
+BQ_CLUSTERING_FIELDS = ["Mobile", "Year", "Month"]  # Matches the MERGE key so lookups read few blocks
+BQ_STAGING_TABLE_EXPIRATION_HOURS = 6  # Staging tables left behind by a crashed upload expire on their own
+BQ_MERGE_MAX_ATTEMPTS = 3  # Retries when a concurrent upload to the same table wins the MERGE race
+BQ_LOAD_CHUNK_ROWS = 500_000  # Rows per Parquet chunk loaded into staging
+BQ_LOAD_PARALLELISM = 4  # Concurrent load jobs per upload
+BQ_LOAD_PARQUET_COMPRESSION = "snappy"
+BQ_METADATA_TTL_SECONDS = 10 * 60  # Dataset/table existence and schema cached between BigQuery actions
+BQ_ROW_FINGERPRINT_COLUMN = "Row_Fingerprint"  # Hash of a merged row's non-key columns; identical re-uploads skip the UPDATE
+BQ_UPLOAD_WARN_BYTES = 10 * 1024 ** 3  # Upload estimates above this are flagged before uploading
+BQ_UPLOAD_MAX_BYTES = 100 * 1024 ** 3  # Uploads processing more are refused (0 disables the limit)
+
+# Export Configuration
+EXPORT_CHUNK_ROWS = 50000
+EXPORT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "pnm_dashboard_exports")
+EXPORT_CACHE_MAX_FILES = 20
 
 # GA4 Configuration
 GA_SCOPES = ['https://www.googleapis.com/auth/analytics.readonly']
@@ -77,24 +102,189 @@ GA4_METRICS = [
     "engagedSessions"
 ]
 
+# Identifies the shape of GA4Client.fetch_data output; bump when its dimensions change
+GA4_DIMENSION_PROFILE = "pnm_mobile_campaign_v1"
+
+# Shared GA4 result cache
+GA4_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB across all sessions
+GA4_CACHE_FRESH_TTL_SECONDS = 15 * 60  # ranges that include recent, still-changing days
+GA4_CACHE_FINAL_TTL_SECONDS = 24 * 60 * 60  # ranges GA4 has finished processing
+GA4_DATA_FINAL_AFTER_DAYS = 3  # GA4 data older than this is treated as final
+INCREMENTAL_STATE_MAX_BYTES = 1024 * 1024 * 1024  # Per-bucket processed state kept for incremental refreshes
+SF_DELTA_MAX_EXPORTS = 2  # Recent Salesforce exports kept to diff the next upload against
+
+# Version of the processing logic (process_ga_data, NE/BHK mapping).
+# Bump whenever a change would alter processed output so shared results aren't reused.
+PIPELINE_VERSION = "2"
+
+# Shared processed-dataset store
+PROCESSED_STORE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2 GB across all sessions
+
+# Local snapshots of processed datasets (Arrow IPC files)
+SNAPSHOT_DIR = os.path.join(tempfile.gettempdir(), "pnm_dashboard_snapshots")
+SNAPSHOT_MAX_AGE_DAYS = 14  # Snapshots not used for this long are deleted
+SNAPSHOT_MAX_COUNT = 30  # Oldest snapshots beyond this count are deleted
+
+# Backfill (bucket-by-bucket fetch -> process -> merge pipeline)
+BACKFILL_QUEUE_DEPTH = 1  # Buckets buffered between stages; bounds memory to a few buckets
+BACKFILL_CHECKPOINT_DIR = os.path.join(tempfile.gettempdir(), "pnm_dashboard_backfill")
+
+# In-app refresh scheduler (enable with a [scheduler] section in secrets)
+SCHEDULER_DEFAULT_INTERVAL_MINUTES = 60
+SCHEDULER_DEFAULT_TRAILING_DAYS = 30
+SCHEDULER_STATE_DIR = os.path.join(tempfile.gettempdir(), "pnm_dashboard_scheduler")
+
+# Storage backend for uploads (select with a [storage] section in secrets)
+STORAGE_BACKENDS = ["bigquery", "duckdb"]
+STORAGE_DEFAULT_BACKEND = "bigquery"
+DUCKDB_DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "pnm_dashboard_warehouse.duckdb")
+
+# Ledger of recent uploads, so re-submitting an already merged frame is a no-op
+UPLOAD_LEDGER_PATH = os.path.join(tempfile.gettempdir(), "pnm_dashboard_upload_ledger.json")
+UPLOAD_LEDGER_MAX_ENTRIES = 50  # Uploads remembered per table
+
+# Per-job upload telemetry (an optional BigQuery copy is enabled with a [telemetry] section in secrets)
+TELEMETRY_LOG_PATH = os.path.join(tempfile.gettempdir(), "pnm_dashboard_upload_telemetry.jsonl")
+
+
+# Headless configuration (batch runs outside Streamlit)
+SECRETS_FILE_ENV = "PNM_SECRETS_FILE"  # Path to a secrets.toml with the same sections as st.secrets
+GA_PROPERTY_ID_ENV = "PNM_GA_PROPERTY_ID"
+GCP_CREDENTIALS_FILE_ENV = "GOOGLE_APPLICATION_CREDENTIALS"  # Service account JSON key file
+
+_secrets_file_cache = {}
+
+
+def _load_secrets_file(path: str) -> dict:
+    """Parse a secrets TOML file once per path"""
+    if path not in _secrets_file_cache:
+        with open(path, 'rb') as f:
+            _secrets_file_cache[path] = tomllib.load(f)
+    return _secrets_file_cache[path]
+
+
+def get_secret_section(section: str) -> Optional[dict]:
+    """
+    Read a secrets section. Uses the file named by PNM_SECRETS_FILE when set,
+    otherwise st.secrets (which also works headless when .streamlit/secrets.toml
+    exists).
+
+    Args:
+        section: Section name, e.g. "ga_property"
+
+    Returns:
+        Dict of the section's values, or None if it isn't configured
+    """
+    secrets_file = os.environ.get(SECRETS_FILE_ENV)
+    if secrets_file:
+        return _load_secrets_file(secrets_file).get(section)
+
+    try:
+        return dict(st.secrets[section])
+    except (KeyError, FileNotFoundError):  # No secrets.toml raises a FileNotFoundError subclass
+        return None
+
+
+def get_scheduler_settings() -> dict:
+    """
+    Refresh scheduler settings from secrets, e.g.
+
+        [scheduler]
+        enabled = true
+        interval_minutes = 60
+        trailing_days = 30
+
+    Returns:
+        Dict with enabled, interval_minutes and trailing_days
+    """
+    section = get_secret_section("scheduler") or {}
+    return {
+        'enabled': bool(section.get('enabled', False)),
+        'interval_minutes': int(section.get('interval_minutes', SCHEDULER_DEFAULT_INTERVAL_MINUTES)),
+        'trailing_days': int(section.get('trailing_days', SCHEDULER_DEFAULT_TRAILING_DAYS)),
+    }
+
+
+def get_telemetry_settings() -> dict:
+    """
+    Upload telemetry settings from secrets, e.g.
+
+        [telemetry]
+        log_path = "/var/log/pnm/upload_telemetry.jsonl"
+        bigquery_table = "Upload_Telemetry"
+
+    Returns:
+        Dict with log_path and bigquery_table (a table in BQ_DATASET_ID, or
+        None to keep telemetry local)
+    """
+    section = get_secret_section("telemetry") or {}
+    return {
+        'log_path': str(section.get('log_path', TELEMETRY_LOG_PATH)),
+        'bigquery_table': section.get('bigquery_table') or None,
+    }
+
+
+def get_storage_settings() -> dict:
+    """
+    Storage backend settings from secrets, e.g.
+
+        [storage]
+        backend = "duckdb"
+        duckdb_path = "/data/pnm_warehouse.duckdb"
+
+    Returns:
+        Dict with backend and duckdb_path
+
+    Raises:
+        ValueError: If the backend isn't one of STORAGE_BACKENDS
+    """
+    section = get_secret_section("storage") or {}
+    backend = str(section.get('backend', STORAGE_DEFAULT_BACKEND)).lower()
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}', expected one of {STORAGE_BACKENDS}")
+    return {
+        'backend': backend,
+        'duckdb_path': str(section.get('duckdb_path', DUCKDB_DEFAULT_PATH)),
+    }
+
 
 def get_ga_property_id():
-    """Get GA Property ID from secrets"""
-    return st.secrets["ga_property"]["property_id"]
+    """Get GA Property ID from secrets, falling back to PNM_GA_PROPERTY_ID"""
+    section = get_secret_section("ga_property")
+    if section is not None:
+        return section["property_id"]
+
+    property_id = os.environ.get(GA_PROPERTY_ID_ENV)
+    if not property_id:
+        raise KeyError(f"GA property ID not configured (secrets [ga_property] or {GA_PROPERTY_ID_ENV})")
+    return property_id
 
 
 def get_gcp_credentials():
-    """Get GCP service account credentials from secrets"""
+    """
+    Get GCP service account credentials from secrets, falling back to the
+    JSON key file named by GOOGLE_APPLICATION_CREDENTIALS
+    """
+    section = get_secret_section("gcp_service_account")
+    if section is None:
+        key_file = os.environ.get(GCP_CREDENTIALS_FILE_ENV)
+        if not key_file:
+            raise KeyError(
+                f"GCP credentials not configured (secrets [gcp_service_account] or {GCP_CREDENTIALS_FILE_ENV})"
+            )
+        with open(key_file, 'r', encoding='utf-8') as f:
+            section = json.load(f)
+
     return {
-        "type": st.secrets["gcp_service_account"]["type"],
-        "project_id": st.secrets["gcp_service_account"]["project_id"],
-        "private_key_id": st.secrets["gcp_service_account"]["private_key_id"],
-        "private_key": st.secrets["gcp_service_account"]["private_key"],
-        "client_email": st.secrets["gcp_service_account"]["client_email"],
-        "client_id": st.secrets["gcp_service_account"]["client_id"],
-        "auth_uri": st.secrets["gcp_service_account"]["auth_uri"],
-        "token_uri": st.secrets["gcp_service_account"]["token_uri"],
-        "auth_provider_x509_cert_url": st.secrets["gcp_service_account"]["auth_provider_x509_cert_url"],
-        "client_x509_cert_url": st.secrets["gcp_service_account"]["client_x509_cert_url"],
-        "universe_domain": st.secrets["gcp_service_account"]["universe_domain"]
+        "type": section["type"],
+        "project_id": section["project_id"],
+        "private_key_id": section["private_key_id"],
+        "private_key": section["private_key"],
+        "client_email": section["client_email"],
+        "client_id": section["client_id"],
+        "auth_uri": section["auth_uri"],
+        "token_uri": section["token_uri"],
+        "auth_provider_x509_cert_url": section["auth_provider_x509_cert_url"],
+        "client_x509_cert_url": section["client_x509_cert_url"],
+        "universe_domain": section.get("universe_domain", "googleapis.com")
     }
@@ -0,0 +1,89 @@
+"""
+Data Grid module for server-side pagination of large DataFrames.
+Rows are addressed by positional filter indices so only one page of
+projected columns is ever materialized and sent to the browser.
+"""
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+PAGE_SIZE_OPTIONS = [50, 100, 250, 500]
+
+
+def page_count(total_rows: int, page_size: int) -> int:
+    """
+    Number of pages needed to show total_rows (at least 1).
+
+    Args:
+        total_rows: Number of rows in the filtered view
+        page_size: Rows per page
+
+    Returns:
+        Page count
+    """
+    return max(1, -(-total_rows // page_size))
+
+
+def sort_positions(
+    df: pd.DataFrame,
+    positions: np.ndarray,
+    sort_column: Optional[str],
+    ascending: bool = True
+) -> np.ndarray:
+    """
+    Reorder filter positions by the values of one column.
+    Only the sort column is touched; the rest of the frame is never copied.
+
+    Args:
+        df: Full DataFrame
+        positions: Positional row indices that passed the filters
+        sort_column: Column to sort by, or None to keep filter order
+        ascending: Sort direction
+
+    Returns:
+        Positional row indices in display order
+    """
+    if not sort_column or sort_column not in df.columns or len(positions) == 0:
+        return positions
+
+    values = df[sort_column].iloc[positions].reset_index(drop=True)
+    order = values.sort_values(
+        ascending=ascending,
+        kind='stable',
+        na_position='last'
+    ).index.to_numpy()
+
+    return positions[order]
+
+
+def get_page(
+    df: pd.DataFrame,
+    positions: np.ndarray,
+    columns: List[str],
+    page: int,
+    page_size: int
+) -> pd.DataFrame:
+    """
+    Materialize a single page of rows restricted to the visible columns.
+
+    Args:
+        df: Full DataFrame
+        positions: Positional row indices in display order
+        columns: Columns to include
+        page: 1-based page number
+        page_size: Rows per page
+
+    Returns:
+        DataFrame with at most page_size rows
+    """
+    start = (page - 1) * page_size
+    page_positions = positions[start:start + page_size]
+    column_indices = [df.columns.get_loc(col) for col in columns if col in df.columns]
+
+    page_df = df.iloc[page_positions, column_indices]
+
+    # Show row numbers relative to the filtered view rather than the full frame
+    page_df.index = pd.RangeIndex(start + 1, start + 1 + len(page_df))
+    return page_df
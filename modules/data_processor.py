@@ -2,8 +2,9 @@
 Data Processor module for GA-SF data processing
 """
 import re
+import numpy as np
 import pandas as pd
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from .config import CAMPAIGN_NA_MAPPING, STATUS_PRIORITY, SF_REQUIRED_COLUMNS
 
@@ -80,6 +81,31 @@ def get_bimonth_date_range(start_date, end_date):
     return expanded_start.strftime('%Y-%m-%d'), expanded_end.strftime('%Y-%m-%d')
 
 
+def iter_bimonth_buckets(start_date, end_date) -> Iterator[Tuple[str, str]]:
+    """
+    Split a date range into whole bi-month buckets, oldest first.
+    Each bucket can be processed independently because GA deduplication
+    never crosses a bucket boundary.
+
+    Args:
+        start_date: Start date (datetime.date or string 'YYYY-MM-DD')
+        end_date: End date (datetime.date or string 'YYYY-MM-DD')
+
+    Yields:
+        Tuples of (bucket_start, bucket_end) as strings 'YYYY-MM-DD'
+    """
+    from datetime import datetime, timedelta
+
+    expanded_start, expanded_end = get_bimonth_date_range(start_date, end_date)
+    bucket_start = datetime.strptime(expanded_start, '%Y-%m-%d').date()
+    last = datetime.strptime(expanded_end, '%Y-%m-%d').date()
+
+    while bucket_start <= last:
+        bucket = get_bimonth_date_range(bucket_start, bucket_start)
+        yield bucket
+        bucket_start = datetime.strptime(bucket[1], '%Y-%m-%d').date() + timedelta(days=1)
+
+
 def remove_duplicates_bimonth_ga(df: pd.DataFrame) -> pd.DataFrame:
     """
     Remove duplicates within 2-month calendar windows for GA data.
@@ -233,10 +259,67 @@ def calculate_final_source(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def build_salesforce_lookup(sf_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deduplicate Salesforce data by priority into a (Mobile, Year, _Period) lookup.
+    Rows without a parseable created date can't be placed in a period and are dropped.
+    
+    Args:
+        sf_df: Salesforce DataFrame with Mobile, Status, Shifting Type columns
+        
+    Returns:
+        Lookup DataFrame with Mobile, Year, _Period, Status, Shifting Type columns
+    """
+    sf_df = sf_df.copy()
+    
+    # Ensure Mobile is string type
+    sf_df['Mobile'] = sf_df['Mobile'].astype(str)
+    
+    # Deduplicate SF data by priority (one row per Mobile per period-year)
+    sf_deduped = dedupe_salesforce_by_priority(sf_df)
+    
+    created = pd.to_datetime(sf_deduped['House Shifting Opportunity: Created Date'])
+    dated = created.notna().to_numpy()
+    created = created[dated]
+    return pd.DataFrame({
+        'Mobile': sf_deduped['Mobile'].to_numpy()[dated],
+        'Year': created.dt.year.to_numpy(dtype='int64'),
+        '_Period': ((created.dt.month - 1) // 2 + 1).to_numpy(dtype='int64'),
+        'Status': sf_deduped['Status'].to_numpy()[dated],
+        'Shifting Type': sf_deduped['Shifting Type'].to_numpy()[dated],
+    })
+
+
+def lookup_salesforce_columns(ga_df: pd.DataFrame, lookup: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Look up Status and Shifting Type for the rows of a GA frame from the
+    Salesforce record of the same mobile and bi-month period.
+    Unmatched rows are marked as 'Not Found'.
+    
+    Args:
+        ga_df: GA DataFrame with Mobile and Date (or Month/Year) columns
+        lookup: Output of build_salesforce_lookup
+        
+    Returns:
+        Dict with Status and Shifting_Type arrays aligned with ga_df rows
+    """
+    if 'Month' in ga_df.columns and 'Year' in ga_df.columns:
+        keyed = ga_df
+    else:
+        keyed = ga_df[['Mobile', 'Date']]
+    keyed = keyed.assign(Mobile=keyed['Mobile'].astype(str))
+    
+    joined = _lookup_period_columns(keyed, lookup, ['Status', 'Shifting Type'])
+    return {
+        'Status': np.where(pd.isna(joined['Status']), 'Not Found', joined['Status']).astype(object),
+        'Shifting_Type': np.where(pd.isna(joined['Shifting Type']), 'Not Found', joined['Shifting Type']).astype(object),
+    }
+
+
 def map_salesforce_data(ga_df: pd.DataFrame, sf_df: pd.DataFrame) -> pd.DataFrame:
     """
-    Map Salesforce Status and Shifting Type to GA data based on mobile number.
-    Uses left join to keep all GA records.
+    Map Salesforce Status and Shifting Type to GA data based on mobile number
+    and 2-month period. Uses left join to keep all GA records.
     Unmatched records are marked as 'Not Found'.
     
     Args:
@@ -258,43 +341,25 @@ def map_salesforce_data(ga_df: pd.DataFrame, sf_df: pd.DataFrame) -> pd.DataFram
     if missing_cols:
         raise ValueError(f"Missing required Salesforce columns: {missing_cols}")
     
-    sf_df = sf_df.copy()
-    
-    # Ensure Mobile is string type
-    sf_df['Mobile'] = sf_df['Mobile'].astype(str)
     ga_df['Mobile'] = ga_df['Mobile'].astype(str)
     
-    # Deduplicate SF data by priority
-    sf_deduped = dedupe_salesforce_by_priority(sf_df)
-    
-    # Create lookup dictionaries
-    status_dict = sf_deduped.set_index('Mobile')['Status'].to_dict()
-    shifting_dict = sf_deduped.set_index('Mobile')['Shifting Type'].to_dict()
-    
-    # Map values - use 'Not Found' for unmatched
-    ga_df['Status'] = ga_df['Mobile'].map(status_dict).fillna('Not Found')
-    ga_df['Shifting_Type'] = ga_df['Mobile'].map(shifting_dict).fillna('Not Found')
+    for col, values in lookup_salesforce_columns(ga_df, build_salesforce_lookup(sf_df)).items():
+        ga_df[col] = values
     
     return ga_df
 
 
-def map_ne_data(mapped_df: pd.DataFrame, ne_df: pd.DataFrame) -> pd.DataFrame:
+def _prepare_ne_lookup(ne_df: pd.DataFrame) -> pd.DataFrame:
     """
-    Map NE data columns to GA-SF mapped data based on mobile number and 2-month period.
-    Uses left join to keep all GA-SF records.
-    Deduplicates NE data keeping the oldest CUSTOMER_TYPE per 2-month group.
+    Clean and deduplicate NE data into a (Mobile, Year, _Period) lookup.
+    Keeps the oldest CUSTOMER_TYPE per 2-month group.
     
     Args:
-        mapped_df: GA-SF mapped DataFrame with Mobile, Month, Year columns
         ne_df: NE DataFrame with Mobile, DATE, CUSTOMER_TYPE
         
     Returns:
-        DataFrame with NE columns mapped
+        Lookup DataFrame with Mobile, Year, _Period, CUSTOMER_TYPE columns
     """
-    if ne_df is None or ne_df.empty:
-        return mapped_df
-    
-    mapped_df = mapped_df.copy()
     ne_df = ne_df.copy()
     
     # Standardize column names (case-insensitive and remove invisible BOM chars)
@@ -335,39 +400,20 @@ def map_ne_data(mapped_df: pd.DataFrame, ne_df: pd.DataFrame) -> pd.DataFrame:
     # Deduplicate keeping oldest classification
     ne_df = ne_df.drop_duplicates(subset=['Mobile', '_Year', '_Period'], keep='first')
     
-    # Prepare mapped_df for joining
-    if 'Month' not in mapped_df.columns or 'Year' not in mapped_df.columns:
-         mapped_df = add_month_year_columns(mapped_df)
-    
-    mapped_df['_Period'] = mapped_df['Month'].apply(lambda x: get_bimonth_period(x) if pd.notna(x) else 0)
-    ne_lookup = ne_df[['Mobile', '_Year', '_Period', 'CUSTOMER_TYPE']].rename(columns={'_Year': 'Year'})
-    
-    # Merge using left join
-    result = mapped_df.merge(ne_lookup, on=['Mobile', 'Year', '_Period'], how='left')
-    
-    # Clean up
-    result = result.drop(columns=['_Period'])
-    
-    return result
+    return ne_df[['Mobile', '_Year', '_Period', 'CUSTOMER_TYPE']].rename(columns={'_Year': 'Year'})
 
 
-def map_bhk_data(mapped_df: pd.DataFrame, bhk_df: pd.DataFrame) -> pd.DataFrame:
+def _prepare_bhk_lookup(bhk_df: pd.DataFrame) -> pd.DataFrame:
     """
-    Map BHK data columns to mapped data based on mobile number and 2-month period.
-    Uses left join to keep all records.
-    Deduplicates BHK data keeping the oldest PACKAGE_NAME per 2-month group.
+    Clean and deduplicate BHK data into a (Mobile, Year, _Period) lookup.
+    Keeps the oldest PACKAGE_NAME per 2-month group.
     
     Args:
-        mapped_df: GA-SF mapped DataFrame with Mobile, Month, Year columns
         bhk_df: BHK DataFrame with Mobile, OPP_CREATED_DATE, PACKAGE_NAME
         
     Returns:
-        DataFrame with PACKAGE_NAME mapped
+        Lookup DataFrame with Mobile, Year, _Period, PACKAGE_NAME columns
     """
-    if bhk_df is None or bhk_df.empty:
-        return mapped_df
-    
-    mapped_df = mapped_df.copy()
     bhk_df = bhk_df.copy()
     
     # Standardize column names (case-insensitive and remove invisible BOM chars)
@@ -408,20 +454,126 @@ def map_bhk_data(mapped_df: pd.DataFrame, bhk_df: pd.DataFrame) -> pd.DataFrame:
     # Deduplicate keeping oldest classification
     bhk_df = bhk_df.drop_duplicates(subset=['Mobile', '_Year', '_Period'], keep='first')
     
-    # Prepare mapped_df for joining
+    return bhk_df[['Mobile', '_Year', '_Period', 'PACKAGE_NAME']].rename(columns={'_Year': 'Year'})
+
+
+def _lookup_period_columns(
+    mapped_df: pd.DataFrame,
+    lookup: pd.DataFrame,
+    value_columns: List[str]
+) -> Dict[str, np.ndarray]:
+    """
+    Left-join a (Mobile, Year, _Period) lookup against the keys of a mapped frame.
+    Only the key columns are materialized; the mapped frame is never copied.
+    
+    Args:
+        mapped_df: GA-SF mapped DataFrame with Mobile and Date (or Month/Year) columns
+        lookup: Deduplicated lookup keyed by Mobile, Year, _Period
+        value_columns: Lookup columns to return
+        
+    Returns:
+        Dict of column name -> array aligned row-for-row with mapped_df
+    """
+    if 'Month' in mapped_df.columns and 'Year' in mapped_df.columns:
+        month = mapped_df['Month']
+        year = mapped_df['Year']
+    else:
+        dates = pd.to_datetime(mapped_df['Date'])
+        month = dates.dt.month
+        year = dates.dt.year
+    
+    keys = pd.DataFrame({
+        'Mobile': mapped_df['Mobile'].to_numpy(),
+        'Year': year.to_numpy(),
+        '_Period': ((month - 1) // 2 + 1).fillna(0).to_numpy(dtype='int64')
+    })
+    
+    # Lookup keys are unique, so a left join keeps row count and order
+    merged = keys.merge(lookup, on=['Mobile', 'Year', '_Period'], how='left', validate='many_to_one')
+    
+    return {col: merged[col].to_numpy() for col in value_columns}
+
+
+def get_ne_columns(mapped_df: pd.DataFrame, ne_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Compute the NE enrichment columns for a GA-SF mapped frame.
+    
+    Args:
+        mapped_df: GA-SF mapped DataFrame
+        ne_df: NE DataFrame with Mobile, DATE, CUSTOMER_TYPE
+        
+    Returns:
+        Dict with a CUSTOMER_TYPE array aligned with mapped_df rows
+    """
+    return _lookup_period_columns(mapped_df, _prepare_ne_lookup(ne_df), ['CUSTOMER_TYPE'])
+
+
+def get_bhk_columns(mapped_df: pd.DataFrame, bhk_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Compute the BHK enrichment columns for a GA-SF mapped frame.
+    
+    Args:
+        mapped_df: GA-SF mapped DataFrame
+        bhk_df: BHK DataFrame with Mobile, OPP_CREATED_DATE, PACKAGE_NAME
+        
+    Returns:
+        Dict with a PACKAGE_NAME array aligned with mapped_df rows
+    """
+    return _lookup_period_columns(mapped_df, _prepare_bhk_lookup(bhk_df), ['PACKAGE_NAME'])
+
+
+def map_ne_data(mapped_df: pd.DataFrame, ne_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Map NE data columns to GA-SF mapped data based on mobile number and 2-month period.
+    Uses left join to keep all GA-SF records.
+    Deduplicates NE data keeping the oldest CUSTOMER_TYPE per 2-month group.
+    
+    Args:
+        mapped_df: GA-SF mapped DataFrame with Mobile, Month, Year columns
+        ne_df: NE DataFrame with Mobile, DATE, CUSTOMER_TYPE
+        
+    Returns:
+        DataFrame with NE columns mapped
+    """
+    if ne_df is None or ne_df.empty:
+        return mapped_df
+    
     if 'Month' not in mapped_df.columns or 'Year' not in mapped_df.columns:
-         mapped_df = add_month_year_columns(mapped_df)
+        mapped_df = add_month_year_columns(mapped_df)
+    else:
+        mapped_df = mapped_df.copy()
+    
+    for col, values in get_ne_columns(mapped_df, ne_df).items():
+        mapped_df[col] = values
+    
+    return mapped_df
+
+
+def map_bhk_data(mapped_df: pd.DataFrame, bhk_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Map BHK data columns to mapped data based on mobile number and 2-month period.
+    Uses left join to keep all records.
+    Deduplicates BHK data keeping the oldest PACKAGE_NAME per 2-month group.
     
-    mapped_df['_Period'] = mapped_df['Month'].apply(lambda x: get_bimonth_period(x) if pd.notna(x) else 0)
-    bhk_lookup = bhk_df[['Mobile', '_Year', '_Period', 'PACKAGE_NAME']].rename(columns={'_Year': 'Year'})
+    Args:
+        mapped_df: GA-SF mapped DataFrame with Mobile, Month, Year columns
+        bhk_df: BHK DataFrame with Mobile, OPP_CREATED_DATE, PACKAGE_NAME
+        
+    Returns:
+        DataFrame with PACKAGE_NAME mapped
+    """
+    if bhk_df is None or bhk_df.empty:
+        return mapped_df
     
-    # Merge using left join
-    result = mapped_df.merge(bhk_lookup, on=['Mobile', 'Year', '_Period'], how='left')
+    if 'Month' not in mapped_df.columns or 'Year' not in mapped_df.columns:
+        mapped_df = add_month_year_columns(mapped_df)
+    else:
+        mapped_df = mapped_df.copy()
     
-    # Clean up
-    result = result.drop(columns=['_Period'])
+    for col, values in get_bhk_columns(mapped_df, bhk_df).items():
+        mapped_df[col] = values
     
-    return result
+    return mapped_df
 
 
 def add_month_year_columns(df: pd.DataFrame) -> pd.DataFrame:
@@ -0,0 +1,291 @@
+"""
+Dataset Registry module for processed results shared across sessions.
+Keys processed frames and enrichment columns by input fingerprints (GA4
+range, Salesforce/NE/BHK content hashes, pipeline version) so identical
+inputs are processed once per server. Entries are reference counted by the
+sessions using them; only unreferenced entries are evicted, least recently
+used first, once the memory budget is exceeded.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import GA4_DIMENSION_PROFILE, PIPELINE_VERSION, PROCESSED_STORE_MAX_BYTES
+
+
+def fingerprint_bytes(data: bytes) -> str:
+    """
+    Content hash of an uploaded file.
+
+    Args:
+        data: Raw file bytes
+
+    Returns:
+        Hex digest prefix identifying the content
+    """
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def make_dataset_key(property_id: str, start_date: str, end_date: str, sf_hash: str) -> tuple:
+    """
+    Registry key for a processed GA-SF frame.
+
+    Args:
+        property_id: GA4 property ID
+        start_date: Expanded range start in YYYY-MM-DD format
+        end_date: Expanded range end in YYYY-MM-DD format
+        sf_hash: fingerprint_bytes of the Salesforce file
+
+    Returns:
+        Key tuple
+    """
+    return (str(property_id), start_date, end_date, GA4_DIMENSION_PROFILE, sf_hash, PIPELINE_VERSION)
+
+
+def make_enrichment_key(dataset_key: tuple, kind: str, content_hash: str) -> tuple:
+    """
+    Registry key for NE/BHK columns mapped onto a processed frame.
+
+    Args:
+        dataset_key: Key of the base frame from make_dataset_key
+        kind: 'ne' or 'bhk'
+        content_hash: fingerprint_bytes of the uploaded file
+
+    Returns:
+        Key tuple
+    """
+    return dataset_key + (kind, content_hash)
+
+
+def estimate_value_bytes(value: Any) -> int:
+    """
+    Memory footprint of a registry value.
+
+    Args:
+        value: DataFrame or dict of column name -> array
+
+    Returns:
+        Size in bytes
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sum(
+            int(pd.Series(values, copy=False).memory_usage(index=False, deep=True))
+            for values in value.values()
+        )
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    return 0
+
+
+class _RegistryEntry:
+    """A shared processed value"""
+
+    def __init__(self, value: Any, ttl_seconds: int):
+        self.value = value
+        self.size_bytes = estimate_value_bytes(value)
+        self.refcount = 0
+        self.stored_at = time.time()
+        self.expires_at = self.stored_at + ttl_seconds
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+
+class DatasetRegistry:
+    """Process-wide, reference counted store of immutable processed results"""
+
+    def __init__(self, max_bytes: int = PROCESSED_STORE_MAX_BYTES):
+        """
+        Initialize the registry.
+
+        Args:
+            max_bytes: Memory budget across all shared values
+        """
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, _RegistryEntry]" = OrderedDict()
+        self._detached: Dict[int, _RegistryEntry] = {}
+        self._building: Dict[tuple, threading.Lock] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _acquire(self, key: tuple) -> Optional[Any]:
+        """Return a live value with its refcount raised (caller holds lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expired:
+            self._detach(key)
+            return None
+        entry.refcount += 1
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def _detach(self, key: tuple) -> None:
+        """
+        Remove an entry from lookup (caller holds lock). Entries still in use
+        are kept aside until their last session releases them.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry.size_bytes
+        if entry.refcount > 0:
+            self._detached[id(entry.value)] = entry
+
+    def _evict(self) -> None:
+        """Evict unreferenced LRU entries past the budget (caller holds lock)"""
+        if self._total_bytes <= self._max_bytes:
+            return
+        for key in [key for key, entry in self._entries.items() if entry.refcount == 0]:
+            if self._total_bytes <= self._max_bytes:
+                break
+            self._detach(key)
+
+    def get_or_build(
+        self,
+        key: tuple,
+        build_fn: Callable[[], Any],
+        ttl_seconds: int,
+        wait_callback: Optional[Callable[[], None]] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Return the shared value for key, building it once if absent. Concurrent
+        callers with the same key wait for the first build instead of repeating it.
+        The returned value is referenced on the caller's behalf; pair every call
+        with release(key, value).
+
+        Args:
+            key: Key from make_dataset_key / make_enrichment_key
+            build_fn: Zero-argument callable producing the value
+            ttl_seconds: How long the value may be handed to new callers
+            wait_callback: Called periodically while waiting on another caller's
+                build; may raise to stop waiting (e.g. on cancellation)
+
+        Returns:
+            Tuple of (value, reused). The value is shared and must not be modified.
+        """
+        with self._lock:
+            value = self._acquire(key)
+            if value is not None:
+                self.hits += 1
+                return value, True
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        while not build_lock.acquire(timeout=0.5):
+            if wait_callback is not None:
+                wait_callback()
+
+        try:
+            with self._lock:
+                value = self._acquire(key)
+                if value is not None:
+                    self.hits += 1
+                    return value, True
+                self.misses += 1
+
+            try:
+                value = build_fn()
+                entry = _RegistryEntry(value, ttl_seconds)
+            except BaseException:
+                with self._lock:
+                    self._building.pop(key, None)
+                raise
+
+            entry.refcount = 1
+            with self._lock:
+                self._detach(key)
+                self._entries[key] = entry
+                self._total_bytes += entry.size_bytes
+                self._building.pop(key, None)
+                self._evict()
+            return value, False
+        finally:
+            build_lock.release()
+
+    def release(self, key: tuple, value: Any) -> None:
+        """
+        Drop one reference taken by get_or_build.
+
+        Args:
+            key: Key passed to get_or_build
+            value: Value returned by get_or_build
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.value is value:
+                entry.refcount = max(0, entry.refcount - 1)
+                self._evict()
+                return
+
+            entry = self._detached.get(id(value))
+            if entry is not None and entry.value is value:
+                entry.refcount -= 1
+                if entry.refcount <= 0:
+                    del self._detached[id(value)]
+
+    def retain(self, key: tuple, value: Any) -> None:
+        """
+        Take one more reference on a value the caller already holds, e.g. to
+        share one result with another session. Pair with release(key, value).
+
+        Args:
+            key: Key passed to get_or_build
+            value: Value returned by get_or_build
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.value is not value:
+                entry = self._detached.get(id(value))
+            if entry is None or entry.value is not value:
+                raise ValueError("Value is not held in the dataset registry")
+            entry.refcount += 1
+
+    def remaining_ttl(self, key: tuple, default: int = 0) -> int:
+        """Seconds until key stops being handed out, or default if unknown"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            return max(0, int(entry.expires_at - time.time()))
+
+    def clear(self) -> None:
+        """Stop sharing all entries; values in use stay alive until released"""
+        with self._lock:
+            for key in list(self._entries):
+                self._detach(key)
+
+    def stats(self) -> dict:
+        """Registry statistics"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'in_use': sum(1 for entry in self._entries.values() if entry.refcount > 0),
+                'detached_in_use': len(self._detached),
+                'bytes': self._total_bytes,
+                'max_bytes': self._max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_registry: Optional[DatasetRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_dataset_registry() -> DatasetRegistry:
+    """Get the process-wide dataset registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DatasetRegistry()
+        return _registry
@@ -0,0 +1,151 @@
+"""
+Dataset Store module for per-session processed data.
+Keeps the GA-SF base frame once and stores NE/BHK enrichment as aligned
+column arrays, composing full views on demand without copying the base.
+"""
+import weakref
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class DatasetStore:
+    """Immutable GA-SF base frame plus NE/BHK column deltas"""
+
+    def __init__(self, base_df: pd.DataFrame, key: Optional[tuple] = None):
+        """
+        Initialize the store with a processed GA-SF frame.
+
+        Args:
+            base_df: Output of process_ga_data. Treated as immutable.
+            key: Dataset registry key of base_df when it is shared across sessions
+        """
+        self._base = base_df
+        self.key = key
+        # (Mobile, Month, Year) keys remapped from the previous Salesforce export, if known
+        self.sf_changed_keys: Optional[pd.DataFrame] = None
+        self._ne_columns: Optional[Dict[str, np.ndarray]] = None
+        self._bhk_columns: Optional[Dict[str, np.ndarray]] = None
+        self._leases: Dict[str, weakref.finalize] = {}
+        self._lease_info: Dict[str, tuple] = {}
+
+    @property
+    def base(self) -> pd.DataFrame:
+        """GA-SF mapped frame (do not modify in place)"""
+        return self._base
+
+    @property
+    def has_ne(self) -> bool:
+        """Whether NE enrichment has been mapped"""
+        return self._ne_columns is not None
+
+    @property
+    def has_bhk(self) -> bool:
+        """Whether BHK enrichment has been mapped"""
+        return self._bhk_columns is not None
+
+    def _validate_columns(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Ensure enrichment arrays line up with the base frame"""
+        for col, values in columns.items():
+            if len(values) != len(self._base):
+                raise ValueError(
+                    f"Enrichment column '{col}' has {len(values)} rows, expected {len(self._base)}"
+                )
+        return dict(columns)
+
+    def set_ne_columns(self, columns: Dict[str, np.ndarray]) -> None:
+        """
+        Store NE enrichment columns (e.g. CUSTOMER_TYPE).
+
+        Args:
+            columns: Dict of column name -> array aligned with the base frame
+        """
+        self._ne_columns = self._validate_columns(columns)
+
+    def set_bhk_columns(self, columns: Dict[str, np.ndarray]) -> None:
+        """
+        Store BHK enrichment columns (e.g. PACKAGE_NAME).
+
+        Args:
+            columns: Dict of column name -> array aligned with the base frame
+        """
+        self._bhk_columns = self._validate_columns(columns)
+
+    def hold(self, slot: str, registry, key: tuple, value: Any) -> None:
+        """
+        Keep a shared registry value referenced for as long as this store uses it.
+        The reference is dropped when the slot is reassigned or the store is
+        garbage collected (e.g. the session ends or loads other data).
+
+        Args:
+            slot: 'base', 'ne' or 'bhk'
+            registry: DatasetRegistry the value was acquired from
+            key: Registry key of the value
+            value: Value returned by registry.get_or_build
+        """
+        previous = self._leases.pop(slot, None)
+        if previous is not None:
+            previous()
+        self._leases[slot] = weakref.finalize(self, registry.release, key, value)
+        self._lease_info[slot] = (registry, key, value)
+
+    def held_key(self, slot: str) -> Optional[tuple]:
+        """Registry key currently held for a slot ('base', 'ne' or 'bhk'), if any"""
+        info = self._lease_info.get(slot)
+        return info[1] if info is not None else None
+
+    def clone(self) -> 'DatasetStore':
+        """
+        Independent store over the same shared frames, e.g. to hand one result
+        to another session. Mapping NE/BHK on the clone doesn't affect this store.
+
+        Returns:
+            New DatasetStore holding its own registry references
+        """
+        clone = DatasetStore(self._base, key=self.key)
+        clone.sf_changed_keys = self.sf_changed_keys
+        clone._ne_columns = self._ne_columns
+        clone._bhk_columns = self._bhk_columns
+        for slot, (registry, key, value) in self._lease_info.items():
+            registry.retain(key, value)
+            clone._leases[slot] = weakref.finalize(clone, registry.release, key, value)
+            clone._lease_info[slot] = (registry, key, value)
+        return clone
+
+    def enrichment_columns(self, slot: str) -> Optional[Dict[str, np.ndarray]]:
+        """NE ('ne') or BHK ('bhk') enrichment columns, or None if unmapped"""
+        return self._ne_columns if slot == 'ne' else self._bhk_columns
+
+    def _compose(self, *column_sets: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """Build a view of the base frame plus extra columns, sharing base column memory"""
+        columns = {col: self._base[col] for col in self._base.columns}
+        for column_set in column_sets:
+            for col, values in column_set.items():
+                columns[col] = pd.Series(values, index=self._base.index, name=col, copy=False)
+        return pd.DataFrame(columns, copy=False)
+
+    def ne_view(self) -> Optional[pd.DataFrame]:
+        """GA-SF + NE columns, or None if NE hasn't been mapped"""
+        if self._ne_columns is None:
+            return None
+        return self._compose(self._ne_columns)
+
+    def bhk_view(self) -> Optional[pd.DataFrame]:
+        """GA-SF (+ NE when mapped) + BHK columns, or None if BHK hasn't been mapped"""
+        if self._bhk_columns is None:
+            return None
+        if self._ne_columns is None:
+            return self._compose(self._bhk_columns)
+        return self._compose(self._ne_columns, self._bhk_columns)
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the base frame and enrichment columns"""
+        total = int(self._base.memory_usage(index=True, deep=True).sum())
+        for column_set in (self._ne_columns, self._bhk_columns):
+            if column_set:
+                total += sum(
+                    int(pd.Series(values).memory_usage(index=False, deep=True))
+                    for values in column_set.values()
+                )
+        return total
@@ -0,0 +1,222 @@
+"""
+DuckDB storage backend for running the upload path without BigQuery.
+Keeps the warehouse tables in a local DuckDB file and applies the same
+MERGE rules and merge stats as BigQuery, so uploads can be load-tested
+offline and the file doubles as a local copy of the warehouse.
+
+Enable it in secrets:
+
+    [storage]
+    backend = "duckdb"
+    duckdb_path = "/data/pnm_warehouse.duckdb"
+"""
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from .bigquery_manager import (
+    StorageBackend, GA_SF_SCHEMA, _STATUS_PRIORITY_SQL,
+    _build_merge_sql, _date_filter, _merge_date_bounds, _with_fingerprint,
+    to_arrow_table
+)
+from .config import BQ_TABLE_GA_SF, BQ_ROW_FINGERPRINT_COLUMN
+from .upload_telemetry import step_record
+
+try:
+    import duckdb
+except ImportError:  # Optional dependency, only needed for this backend
+    duckdb = None
+
+
+# DuckDB column types for the BigQuery column types used by the upload schemas
+_DUCKDB_TYPES = {
+    "DATE": "DATE",
+    "INTEGER": "BIGINT",
+    "FLOAT": "DOUBLE",
+    "STRING": "VARCHAR",
+}
+
+# Name the upload's Arrow table is registered under for the MERGE
+_STAGING_VIEW = "_staging"
+
+
+def _quote(name: str) -> str:
+    """Quote a DuckDB identifier"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuckDBBackend(StorageBackend):
+    """Merges into tables in a local DuckDB database file"""
+
+    name = "duckdb"
+    display_name = "DuckDB"
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the database.
+
+        Args:
+            path: DuckDB database file, or ':memory:'
+
+        Raises:
+            RuntimeError: If duckdb is not installed
+        """
+        if duckdb is None:
+            raise RuntimeError("The DuckDB storage backend requires the 'duckdb' package (pip install duckdb)")
+        self.path = path
+        self._con = duckdb.connect(path)
+        # One connection shared by all sessions; DuckDB transactions serialize writers
+        self._lock = threading.Lock()
+
+    def table_ref(self, table_name: str) -> str:
+        return f"duckdb:{self.path}:{table_name}"
+
+    def _ensure_table(self, table_name: str, schema: list) -> None:
+        """Create the table if it doesn't exist, adding the fingerprint column to older tables"""
+        columns = ", ".join(
+            f"{_quote(field.name)} {_DUCKDB_TYPES.get(field.field_type, 'VARCHAR')}"
+            + (" NOT NULL" if field.mode == "REQUIRED" else "")
+            for field in schema
+        )
+        self._con.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table_name)} ({columns})")
+        if any(field.name == BQ_ROW_FINGERPRINT_COLUMN for field in schema):
+            self._con.execute(
+                f"ALTER TABLE {_quote(table_name)} ADD COLUMN IF NOT EXISTS {_quote(BQ_ROW_FINGERPRINT_COLUMN)} BIGINT"
+            )
+
+    def _query(self, telemetry: List[dict], step: str, sql: str) -> list:
+        """Run a statement and fetch its rows, recording its timing as a telemetry step"""
+        started = time.time()
+        rows = self._con.execute(sql).fetchall()
+        telemetry.append(step_record(step, started, time.time()))
+        return rows
+
+    def merge(self, table_name: str, df: pd.DataFrame, schema: list, has_status_col: bool) -> Tuple[bool, dict, str]:
+        columns = [field.name for field in schema]
+        date_bounds = _merge_date_bounds(df)
+        main_date_filter = _date_filter("m", date_bounds)
+        main_table = _quote(table_name)
+        telemetry = []
+
+        started = time.time()
+        staging = to_arrow_table(df, schema)
+        telemetry.append(step_record("load", started, time.time(), rows_affected=len(df)))
+
+        with self._lock:
+            started = time.time()
+            self._ensure_table(table_name, _with_fingerprint(schema))
+            self._con.register(_STAGING_VIEW, staging)
+            telemetry.append(step_record("setup", started, time.time()))
+            try:
+                self._con.begin()
+                main_rows = self._query(telemetry, "count", f"SELECT COUNT(*) FROM {main_table}")[0][0]
+
+                status_updates = []
+                if has_status_col:
+                    status_priority_source = _STATUS_PRIORITY_SQL.format(col="t.Status")
+                    status_priority_target = _STATUS_PRIORITY_SQL.format(col="m.Status")
+                    status_updates = self._query(telemetry, "stats", f"""
+                        SELECT m.Status AS old_status, t.Status AS new_status, COUNT(*) AS cnt
+                        FROM {_STAGING_VIEW} t
+                        JOIN {main_table} m
+                            ON t.Mobile = m.Mobile AND t.Month = m.Month AND t.Year = m.Year
+                            {main_date_filter}
+                        WHERE m.Status != t.Status
+                          AND (
+                              t.Date > m.Date
+                              OR (t.Date = m.Date AND ({status_priority_source}) >= ({status_priority_target}))
+                          )
+                        GROUP BY 1, 2
+                    """)
+
+                merge_sql = _build_merge_sql(
+                    table_name, _quote(_STAGING_VIEW), columns, has_status_col, date_bounds, dialect="duckdb"
+                )
+                merged_rows = self._query(telemetry, "merge", merge_sql)[0][0]
+                telemetry[-1]['rows_affected'] = merged_rows
+                total_rows = self._query(telemetry, "count", f"SELECT COUNT(*) FROM {main_table}")[0][0]
+                self._con.commit()
+
+            except Exception as e:
+                self._con.rollback()
+                stats = {'new_records': 0, 'status_updates': {}, 'total_rows': 0, 'telemetry': telemetry}
+                return False, stats, f"Error uploading to DuckDB: {str(e)}"
+            finally:
+                self._con.unregister(_STAGING_VIEW)
+
+        # Only the MERGE adds rows (in this transaction), so the table's growth is what it inserted
+        new_records = total_rows - main_rows
+        stats = {
+            'new_records': new_records,
+            'updated_records': merged_rows - new_records,
+            'unchanged_records': len(df) - merged_rows,
+            'status_updates': {
+                f"{old_status} → {new_status}": cnt
+                for old_status, new_status, cnt in status_updates
+            },
+            'total_rows': total_rows,
+            'telemetry': telemetry
+        }
+        return True, stats, f"Successfully uploaded to {table_name}"
+
+    def replace(self, table_name: str, df: pd.DataFrame, schema: list) -> Tuple[bool, dict, str]:
+        staging = to_arrow_table(df, schema)
+        telemetry = []
+        with self._lock:
+            self._con.register(_STAGING_VIEW, staging)
+            try:
+                self._query(
+                    telemetry, "load", f"CREATE OR REPLACE TABLE {_quote(table_name)} AS SELECT * FROM {_STAGING_VIEW}"
+                )
+                telemetry[-1]['rows_affected'] = len(df)
+            finally:
+                self._con.unregister(_STAGING_VIEW)
+
+        stats = {
+            'new_records': len(df),
+            'status_updates': {},
+            'total_rows': len(df),
+            'telemetry': telemetry
+        }
+        return True, stats, f"Successfully uploaded to {table_name}"
+
+    def reset(self, table_name: str, date_bounds: Optional[Tuple[str, str]] = None) -> Tuple[bool, str]:
+        with self._lock:
+            exists = self._con.execute(
+                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [table_name]
+            ).fetchone()[0]
+            if not exists:
+                if table_name == BQ_TABLE_GA_SF:
+                    # Create fresh table
+                    self._ensure_table(table_name, _with_fingerprint(GA_SF_SCHEMA))
+                    return True, f"Successfully reset table {table_name}"
+                return True, f"Table {table_name} does not exist yet; nothing to reset"
+
+            if date_bounds is None:
+                self._con.execute(f"TRUNCATE {_quote(table_name)}")
+                return True, f"Successfully reset table {table_name}"
+
+            deleted = self._con.execute(
+                f"DELETE FROM {_quote(table_name)} WHERE Date BETWEEN DATE '{date_bounds[0]}' AND DATE '{date_bounds[1]}'"
+            ).fetchone()[0]
+        return True, f"Successfully deleted {deleted} rows dated {date_bounds[0]} to {date_bounds[1]} from {table_name}"
+
+    def estimate(self, table_name: str, df: pd.DataFrame, schema: list, has_status_col: bool) -> dict:
+        # Local merges aren't billed; count the dates holding rows in the merged range,
+        # the daily partitions BigQuery would scan
+        date_bounds = _merge_date_bounds(df)
+        with self._lock:
+            exists = self._con.execute(
+                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [table_name]
+            ).fetchone()[0]
+            if not exists:
+                return {'bytes_processed': 0, 'partitions': 0}
+            date_filter = ""
+            if date_bounds is not None:
+                date_filter = f"WHERE Date BETWEEN DATE '{date_bounds[0]}' AND DATE '{date_bounds[1]}'"
+            partitions = self._con.execute(
+                f"SELECT COUNT(DISTINCT Date) FROM {_quote(table_name)} {date_filter}"
+            ).fetchone()[0]
+        return {'bytes_processed': 0, 'partitions': partitions}
@@ -0,0 +1,226 @@
+"""
+Export module for on-demand, chunked file downloads.
+Files are only generated when a download is requested and are cached on disk
+per (dataset version, filter set, format).
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import BinaryIO, Callable, Iterator
+
+import pandas as pd
+
+from .config import EXPORT_CHUNK_ROWS, EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_FILES
+
+
+# Supported export formats: label -> file extension and MIME type
+EXPORT_FORMATS = {
+    "CSV (gzip)": {
+        "extension": "csv.gz",
+        "mime": "application/gzip"
+    },
+    "Parquet": {
+        "extension": "parquet",
+        "mime": "application/vnd.apache.parquet"
+    },
+    "Excel": {
+        "extension": "xlsx",
+        "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    },
+}
+
+# Excel hard limit (including the header row)
+EXCEL_MAX_ROWS = 1048576
+
+
+def filter_fingerprint(filters: dict) -> str:
+    """
+    Build a stable fingerprint for a filter set.
+    Multiselect values are sorted so selection order doesn't matter.
+
+    Args:
+        filters: Filter dict as passed to apply_filters
+
+    Returns:
+        Short hex fingerprint
+    """
+    normalized = {
+        key: sorted(value) if isinstance(value, (list, tuple)) else value
+        for key, value in filters.items()
+    }
+    payload = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def iter_row_chunks(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Yield consecutive row slices of a DataFrame.
+
+    Args:
+        df: DataFrame to slice
+        chunk_rows: Number of rows per chunk
+
+    Yields:
+        DataFrame chunks (views where pandas allows)
+    """
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def iter_csv_chunks(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Serialize a DataFrame to CSV one chunk at a time.
+    Only the first chunk carries the header row.
+
+    Args:
+        df: DataFrame to serialize
+        chunk_rows: Number of rows per chunk
+
+    Yields:
+        UTF-8 encoded CSV chunks
+    """
+    if df.empty:
+        yield df.to_csv(index=False).encode('utf-8')
+        return
+
+    for i, chunk in enumerate(iter_row_chunks(df, chunk_rows)):
+        yield chunk.to_csv(index=False, header=(i == 0)).encode('utf-8')
+
+
+def _write_csv_gzip(df: pd.DataFrame, path: str) -> None:
+    """Write a gzip-compressed CSV in chunks"""
+    with gzip.open(path, 'wb', compresslevel=6) as f:
+        for chunk in iter_csv_chunks(df):
+            f.write(chunk)
+
+
+def _write_parquet(df: pd.DataFrame, path: str) -> None:
+    """Write a Parquet file with one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for chunk in iter_row_chunks(df):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _write_xlsx(df: pd.DataFrame, path: str) -> None:
+    """Write an Excel workbook row by row using openpyxl's streaming writer"""
+    from openpyxl import Workbook
+
+    if len(df) + 1 > EXCEL_MAX_ROWS:
+        raise ValueError(
+            f"Excel supports at most {EXCEL_MAX_ROWS - 1:,} rows; "
+            f"this export has {len(df):,}. Use CSV (gzip) or Parquet instead."
+        )
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Data")
+    sheet.append([str(col) for col in df.columns])
+
+    for chunk in iter_row_chunks(df):
+        # openpyxl can't write NaN/NaT, so convert missing values to empty cells
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append(row)
+
+    workbook.save(path)
+
+
+_WRITERS = {
+    "csv.gz": _write_csv_gzip,
+    "parquet": _write_parquet,
+    "xlsx": _write_xlsx,
+}
+
+
+def _prune_export_cache(keep_path: str) -> None:
+    """Remove the oldest cached exports beyond EXPORT_CACHE_MAX_FILES"""
+    try:
+        entries = [
+            os.path.join(EXPORT_CACHE_DIR, name)
+            for name in os.listdir(EXPORT_CACHE_DIR)
+            if not name.endswith('.tmp')
+        ]
+    except FileNotFoundError:
+        return
+
+    entries.sort(key=lambda p: os.path.getmtime(p), reverse=True)
+    for path in entries[EXPORT_CACHE_MAX_FILES:]:
+        if path == keep_path:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def get_export_path(
+    frame_fn: Callable[[], pd.DataFrame],
+    dataset_key: str,
+    filters: dict,
+    export_format: str
+) -> str:
+    """
+    Return the path of an export file, generating it only on a cache miss.
+
+    Args:
+        frame_fn: Zero-argument callable returning the filtered DataFrame;
+            only called on a cache miss
+        dataset_key: Identifier of the dataset version the frame comes from
+        filters: Filter dict frame_fn applies
+        export_format: One of the EXPORT_FORMATS labels
+
+    Returns:
+        Path to the export file on local disk
+    """
+    extension = EXPORT_FORMATS[export_format]["extension"]
+    file_name = f"{dataset_key}_{filter_fingerprint(filters)}.{extension}"
+    path = os.path.join(EXPORT_CACHE_DIR, file_name)
+
+    if os.path.exists(path):
+        # Touch so LRU pruning keeps recently used exports
+        os.utime(path)
+        return path
+
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+
+    # Write to a temp name and rename so readers never see a partial file
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        _WRITERS[extension](frame_fn(), temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    _prune_export_cache(path)
+    return path
+
+
+def open_export(
+    frame_fn: Callable[[], pd.DataFrame],
+    dataset_key: str,
+    filters: dict,
+    export_format: str
+) -> BinaryIO:
+    """
+    Open an export file for st.download_button, generating it if needed.
+    Intended to be wrapped in a zero-argument callable so Streamlit only
+    runs it when the user actually clicks download. The file is handed over
+    as an open binary file rather than read into memory here.
+
+    Args:
+        frame_fn: Zero-argument callable returning the filtered DataFrame;
+            only called on a cache miss
+        dataset_key: Identifier of the dataset version the frame comes from
+        filters: Filter dict frame_fn applies
+        export_format: One of the EXPORT_FORMATS labels
+
+    Returns:
+        Export file opened for binary reading
+    """
+    return open(get_export_path(frame_fn, dataset_key, filters, export_format), 'rb')
@@ -0,0 +1,271 @@
+"""
+GA4 result cache shared by all sessions on the server.
+Keys results by (property, expanded date range, dimension profile), expires
+them based on how final the underlying GA4 data is, evicts least recently
+used entries past a memory budget, and coalesces concurrent identical
+requests onto a single in-flight fetch.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import (
+    GA4_DIMENSION_PROFILE, GA4_CACHE_MAX_BYTES, GA4_CACHE_FRESH_TTL_SECONDS,
+    GA4_CACHE_FINAL_TTL_SECONDS, GA4_DATA_FINAL_AFTER_DAYS
+)
+
+
+# How a request was served
+SOURCE_CACHE = "cache"
+SOURCE_COALESCED = "coalesced"
+SOURCE_FETCHED = "fetched"
+
+
+def estimate_rows_bytes(rows: List[Dict[str, Any]]) -> int:
+    """
+    Rough memory footprint of a list of GA4 row dicts, extrapolated from a sample.
+
+    Args:
+        rows: GA4 rows as returned by GA4Client.fetch_data
+
+    Returns:
+        Estimated size in bytes
+    """
+    if not rows:
+        return sys.getsizeof(rows)
+
+    sample = rows[:100]
+    sample_bytes = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+        for row in sample
+    )
+    return sys.getsizeof(rows) + int(sample_bytes / len(sample) * len(rows))
+
+
+def ttl_for_range(end_date: str, today: Optional[date] = None) -> int:
+    """
+    TTL for a cached range: short while GA4 may still revise its last days,
+    long once every day in the range is final.
+
+    Args:
+        end_date: Range end in YYYY-MM-DD format
+        today: Override for the current date (defaults to today)
+
+    Returns:
+        TTL in seconds
+    """
+    today = today or date.today()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    if end <= today - timedelta(days=GA4_DATA_FINAL_AFTER_DAYS):
+        return GA4_CACHE_FINAL_TTL_SECONDS
+    return GA4_CACHE_FRESH_TTL_SECONDS
+
+
+class _CacheEntry:
+    """A cached GA4 result"""
+
+    def __init__(self, rows: List[Dict[str, Any]], ttl_seconds: int):
+        self.rows = rows
+        self.size_bytes = estimate_rows_bytes(rows)
+        self.stored_at = time.time()
+        self.expires_at = self.stored_at + ttl_seconds
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+
+class _InFlight:
+    """A fetch currently running on behalf of one or more requesters"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.rows: Optional[List[Dict[str, Any]]] = None
+        self.error: Optional[BaseException] = None
+
+
+class GA4ResultCache:
+    """Process-wide, memory-budgeted GA4 result cache with request coalescing"""
+
+    def __init__(self, max_bytes: int = GA4_CACHE_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Memory budget across all cached results
+        """
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, _CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[tuple, _InFlight] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(property_id: str, start_date: str, end_date: str) -> tuple:
+        """Cache key for a GA4 request"""
+        return (str(property_id), start_date, end_date, GA4_DIMENSION_PROFILE)
+
+    def _lookup(self, key: tuple) -> Optional[_CacheEntry]:
+        """Return a live entry and mark it recently used (caller holds lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expired:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: tuple) -> None:
+        """Drop an entry (caller holds lock)"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size_bytes
+
+    def _store(self, key: tuple, rows: List[Dict[str, Any]], ttl_seconds: int) -> None:
+        """Insert an entry and evict LRU entries past the budget (caller holds lock)"""
+        entry = _CacheEntry(rows, ttl_seconds)
+        if entry.size_bytes > self._max_bytes:
+            return  # Larger than the whole budget: serve it but don't cache it
+
+        self._remove(key)
+        self._entries[key] = entry
+        self._total_bytes += entry.size_bytes
+
+        while self._total_bytes > self._max_bytes and self._entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+
+    def get_or_fetch(
+        self,
+        key: tuple,
+        ttl_seconds: int,
+        fetch_fn: Callable[[], List[Dict[str, Any]]],
+        wait_callback: Optional[Callable[[], None]] = None
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Return cached rows for key, or fetch them once for all concurrent callers.
+
+        Args:
+            key: Cache key from make_key
+            ttl_seconds: TTL to apply if the rows are fetched
+            fetch_fn: Zero-argument callable performing the GA4 fetch
+            wait_callback: Called periodically while waiting on another caller's
+                fetch; may raise to stop waiting (e.g. on cancellation)
+
+        Returns:
+            Tuple of (rows, source) where source is cache, coalesced or fetched.
+            Rows are shared between sessions and must not be modified.
+        """
+        retried = False
+        while True:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    self.hits += 1
+                    return entry.rows, SOURCE_CACHE
+
+                flight = self._in_flight.get(key)
+                is_leader = flight is None
+                if is_leader:
+                    flight = _InFlight()
+                    self._in_flight[key] = flight
+                    self.misses += 1
+                else:
+                    self.coalesced += 1
+
+            if is_leader:
+                try:
+                    rows = fetch_fn()
+                    flight.rows = rows
+                    with self._lock:
+                        self._store(key, rows, ttl_seconds)
+                    return rows, SOURCE_FETCHED
+                except BaseException as e:
+                    flight.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        self._in_flight.pop(key, None)
+                    flight.event.set()
+
+            # Wait for the leader's fetch
+            while not flight.event.wait(timeout=0.5):
+                if wait_callback is not None:
+                    wait_callback()
+
+            if flight.error is None:
+                return flight.rows, SOURCE_COALESCED
+
+            # The leader failed (or was cancelled); retry once as a new leader
+            if retried:
+                raise flight.error
+            retried = True
+
+    def clear(self) -> None:
+        """Drop all cached results (in-flight fetches are unaffected)"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Cache statistics"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self._max_bytes,
+                'in_flight': len(self._in_flight),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+            }
+
+
+_cache: Optional[GA4ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_ga4_result_cache() -> GA4ResultCache:
+    """Get the process-wide GA4 result cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GA4ResultCache()
+        return _cache
+
+
+def fetch_ga_data(
+    ga_client,
+    start_date: str,
+    end_date: str,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    wait_callback: Optional[Callable[[], None]] = None
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Fetch GA4 rows through the shared result cache.
+
+    Args:
+        ga_client: GA4Client instance
+        start_date: Start date in YYYY-MM-DD format
+        end_date: End date in YYYY-MM-DD format
+        progress_callback: Passed to GA4Client.fetch_data when this call fetches
+        wait_callback: Called while waiting on another session's identical fetch
+
+    Returns:
+        Tuple of (rows, source)
+    """
+    cache = get_ga4_result_cache()
+    key = cache.make_key(ga_client.property_id, start_date, end_date)
+    return cache.get_or_fetch(
+        key,
+        ttl_for_range(end_date),
+        lambda: ga_client.fetch_data(start_date, end_date, progress_callback=progress_callback),
+        wait_callback=wait_callback
+    )
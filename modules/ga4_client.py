@@ -4,7 +4,7 @@ GA4 Client module for fetching Google Analytics data
 import json
 import tempfile
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
 
 import streamlit as st
 from google.oauth2.service_account import Credentials
@@ -38,10 +38,15 @@ class GA4Client:
             credentials = Credentials.from_service_account_file(temp_path, scopes=GA_SCOPES)
             return BetaAnalyticsDataClient(credentials=credentials)
         except Exception as e:
-            st.error(f"Failed to initialize GA4 client: {str(e)}")
-            raise
+            # Callers surface this (st.error in the app, logging in batch runs)
+            raise RuntimeError(f"Failed to initialize GA4 client: {str(e)}") from e
     
-    def fetch_data(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+    def fetch_data(
+        self,
+        start_date: str,
+        end_date: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Fetch GA4 data with dimension filter to exclude blank or '(not set)' PnM_parameters.
         Uses 2 API calls due to GA4's 9 dimension limit, then merges the results.
@@ -49,6 +54,8 @@ class GA4Client:
         Args:
             start_date: Start date in YYYY-MM-DD format
             end_date: End date in YYYY-MM-DD format
+            progress_callback: Optional callable(pages_fetched, rows_fetched) invoked
+                after every report page. It may raise to abort the fetch.
             
         Returns:
             List of dictionaries containing GA4 data
@@ -83,6 +90,8 @@ class GA4Client:
         all_rows_main = []
         offset = 0
         limit = 100000
+        pages_fetched = 0
+        rows_fetched = 0
         
         while True:
             request = RunReportRequest(
@@ -115,6 +124,11 @@ class GA4Client:
             
             all_rows_main.extend(response.rows)
             
+            pages_fetched += 1
+            rows_fetched += len(response.rows)
+            if progress_callback is not None:
+                progress_callback(pages_fetched, rows_fetched)
+            
             if len(response.rows) < limit:
                 break
             
@@ -162,6 +176,11 @@ class GA4Client:
                 if session_key not in campaign_id_map:
                     campaign_id_map[session_key] = session_campaign_id
             
+            pages_fetched += 1
+            rows_fetched += len(response.rows)
+            if progress_callback is not None:
+                progress_callback(pages_fetched, rows_fetched)
+            
             if len(response.rows) < limit:
                 break
             
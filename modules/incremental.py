@@ -0,0 +1,366 @@
+"""
+Incremental module for re-processing GA4 ranges from per-bucket state.
+Keeps the deduplicated, Salesforce-mapped frame of every bi-month bucket
+together with the date through which its GA4 data is final. Refreshing a
+range then only fetches and processes the days after that watermark: the
+"oldest row per bucket" rule means those days can add new mobiles but never
+replace an existing winner. When a new Salesforce export is uploaded, the
+state mapped against the previous export is patched for the changed mobiles
+instead of being rebuilt.
+"""
+import bisect
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .config import (
+    GA4_DIMENSION_PROFILE, GA4_DATA_FINAL_AFTER_DAYS, INCREMENTAL_STATE_MAX_BYTES, PIPELINE_VERSION,
+    SF_DELTA_MAX_EXPORTS
+)
+from .data_processor import process_ga_data, iter_bimonth_buckets
+from .ga4_cache import fetch_ga_data
+from .sf_delta import SF_KEY_COLUMNS, changed_mobiles, apply_salesforce_delta
+
+
+def bucket_state_key(property_id: str, bucket: Tuple[str, str], sf_hash: str) -> tuple:
+    """
+    State key for one bucket processed against one Salesforce file.
+
+    Args:
+        property_id: GA4 property ID
+        bucket: (bucket_start, bucket_end) from iter_bimonth_buckets
+        sf_hash: fingerprint_bytes of the Salesforce file
+
+    Returns:
+        Key tuple
+    """
+    return (str(property_id), bucket[0], bucket[1], GA4_DIMENSION_PROFILE, sf_hash, PIPELINE_VERSION)
+
+
+def final_through(bucket_end: str, today: Optional[date] = None) -> str:
+    """
+    Last day of a bucket whose GA4 data will no longer be revised.
+
+    Args:
+        bucket_end: Bucket end in YYYY-MM-DD format
+        today: Override for the current date (defaults to today)
+
+    Returns:
+        Date in YYYY-MM-DD format (may precede the bucket start)
+    """
+    today = today or date.today()
+    last_final = today - timedelta(days=GA4_DATA_FINAL_AFTER_DAYS)
+    end = datetime.strptime(bucket_end, '%Y-%m-%d').date()
+    return min(end, last_final).strftime('%Y-%m-%d')
+
+
+def _next_day(day: str) -> str:
+    return (datetime.strptime(day, '%Y-%m-%d').date() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+class _BucketState:
+    """Processed frame of one bucket, its final-data watermark and Salesforce delta keys"""
+
+    def __init__(self, frame: pd.DataFrame, final_through: str, changed_keys: Optional[pd.DataFrame] = None):
+        self.frame = frame
+        self.final_through = final_through
+        self.changed_keys = changed_keys
+        self.size_bytes = int(frame.memory_usage(index=True, deep=True).sum())
+
+
+class BucketStateStore:
+    """Process-wide, memory-budgeted LRU store of per-bucket processed frames"""
+
+    def __init__(self, max_bytes: int = INCREMENTAL_STATE_MAX_BYTES):
+        """
+        Initialize the store.
+
+        Args:
+            max_bytes: Memory budget across all bucket frames
+        """
+        self._max_bytes = max_bytes
+        self._states: "OrderedDict[tuple, _BucketState]" = OrderedDict()
+        self._total_bytes = 0
+        self._salesforce: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[_BucketState]:
+        """State for key (marked recently used), or None"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+            return state
+
+    def put(
+        self,
+        key: tuple,
+        frame: pd.DataFrame,
+        final_through: str,
+        changed_keys: Optional[pd.DataFrame] = None
+    ) -> _BucketState:
+        """Store a bucket's frame, evicting least recently used buckets past the budget"""
+        state = _BucketState(frame, final_through, changed_keys)
+        with self._lock:
+            previous = self._states.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous.size_bytes
+            if state.size_bytes > self._max_bytes:
+                return state
+            self._states[key] = state
+            self._total_bytes += state.size_bytes
+            while self._total_bytes > self._max_bytes and self._states:
+                _, evicted = self._states.popitem(last=False)
+                self._total_bytes -= evicted.size_bytes
+        return state
+
+    def find_previous(self, key: tuple) -> Optional[Tuple[tuple, _BucketState]]:
+        """
+        Most recently used state for the same bucket mapped against another
+        Salesforce export whose content is still remembered.
+
+        Args:
+            key: bucket_state_key for the new export
+
+        Returns:
+            Tuple of (key, state), or None
+        """
+        with self._lock:
+            for other_key in reversed(self._states):
+                if (other_key[:4] == key[:4] and other_key[5:] == key[5:]
+                        and other_key[4] != key[4] and other_key[4] in self._salesforce):
+                    return other_key, self._states[other_key]
+        return None
+
+    def remember_salesforce(self, sf_hash: str, sf_df: pd.DataFrame) -> None:
+        """Keep a Salesforce export so the next upload can be diffed against it"""
+        with self._lock:
+            self._salesforce[sf_hash] = sf_df
+            self._salesforce.move_to_end(sf_hash)
+            while len(self._salesforce) > SF_DELTA_MAX_EXPORTS:
+                self._salesforce.popitem(last=False)
+
+    def salesforce(self, sf_hash: str) -> Optional[pd.DataFrame]:
+        """A remembered Salesforce export, or None"""
+        with self._lock:
+            return self._salesforce.get(sf_hash)
+
+    def clear(self) -> None:
+        """Drop all bucket state"""
+        with self._lock:
+            self._states.clear()
+            self._salesforce.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Store statistics"""
+        with self._lock:
+            return {
+                'buckets': len(self._states),
+                'bytes': self._total_bytes,
+                'max_bytes': self._max_bytes,
+                'salesforce_exports': len(self._salesforce),
+            }
+
+
+_store: Optional[BucketStateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_state_store() -> BucketStateStore:
+    """Get the process-wide bucket state store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BucketStateStore()
+        return _store
+
+
+def changed_keys_for(property_id: str, start_date: str, end_date: str, sf_hash: str) -> Optional[pd.DataFrame]:
+    """
+    Keys whose Salesforce mapping changed when the range's state was patched
+    from a previous export.
+
+    Args:
+        property_id: GA4 property ID
+        start_date: Expanded range start (YYYY-MM-DD)
+        end_date: Expanded range end (YYYY-MM-DD)
+        sf_hash: fingerprint_bytes of the Salesforce file
+
+    Returns:
+        DataFrame of (Mobile, Month, Year) keys, or None if any bucket of the
+        range wasn't derived from a previous export (or is no longer held)
+    """
+    store = get_bucket_state_store()
+    keys = []
+    for bucket in iter_bimonth_buckets(start_date, end_date):
+        state = store.get(bucket_state_key(property_id, bucket, sf_hash))
+        if state is None or state.changed_keys is None:
+            return None
+        keys.append(state.changed_keys)
+    return pd.concat(keys, ignore_index=True) if keys else pd.DataFrame(columns=SF_KEY_COLUMNS)
+
+
+def _patch_from_previous_export(
+    store: BucketStateStore,
+    key: tuple,
+    sf_df: pd.DataFrame,
+    diffs: Dict[str, pd.Index]
+) -> Optional[_BucketState]:
+    """
+    Derive a bucket's state for a new Salesforce export from the state
+    mapped against a previous one, remapping only the changed mobiles.
+
+    Args:
+        store: Bucket state store
+        key: bucket_state_key for the new export
+        sf_df: New Salesforce DataFrame
+        diffs: Changed mobiles per previous sf_hash (filled in as exports are diffed)
+
+    Returns:
+        The stored state, or None if no previous export can be diffed
+    """
+    previous = store.find_previous(key)
+    if previous is None:
+        return None
+    previous_key, previous_state = previous
+    previous_hash = previous_key[4]
+    if previous_hash not in diffs:
+        previous_sf = store.salesforce(previous_hash)
+        if previous_sf is None:
+            return None
+        diffs[previous_hash] = changed_mobiles(previous_sf, sf_df)
+
+    frame, keys = apply_salesforce_delta(previous_state.frame, sf_df, diffs[previous_hash])
+    return store.put(key, frame, previous_state.final_through, changed_keys=keys)
+
+
+def process_range_incrementally(
+    ga_client,
+    start_date: str,
+    end_date: str,
+    sf_df: Optional[pd.DataFrame],
+    sf_hash: str,
+    set_stage: Callable[[str], None] = lambda stage: None,
+    progress_callback: Optional[Callable[..., None]] = None,
+    wait_callback: Optional[Callable[[], None]] = None,
+    today: Optional[date] = None
+) -> pd.DataFrame:
+    """
+    Build the processed GA-SF frame for an expanded bi-month range, fetching
+    and processing only the days not already final in the bucket state.
+    With no prior state this is a full fetch and process of the range; state
+    mapped against a previous Salesforce export is patched rather than rebuilt.
+
+    Args:
+        ga_client: GA4Client instance
+        start_date: Expanded range start (YYYY-MM-DD, a bucket start)
+        end_date: Expanded range end (YYYY-MM-DD, a bucket end)
+        sf_df: Salesforce DataFrame used to map the new rows
+        sf_hash: fingerprint_bytes of the Salesforce file
+        set_stage: Called with a description of the current step
+        progress_callback: Called with progress counters as keyword arguments
+        wait_callback: Passed to fetch_ga_data
+        today: Override for the current date (defaults to today)
+
+    Returns:
+        Processed frame for the whole range (empty if GA4 has no data)
+    """
+    store = get_bucket_state_store()
+    report = progress_callback or (lambda **counters: None)
+    buckets = list(iter_bimonth_buckets(start_date, end_date))
+
+    # Decide per bucket what can be kept and from which day data is needed
+    kept: Dict[Tuple[str, str], pd.DataFrame] = {}
+    fetch_from: Dict[Tuple[str, str], str] = {}
+    delta_keys: Dict[Tuple[str, str], Optional[pd.DataFrame]] = {}
+    diffs: Dict[str, pd.Index] = {}
+    for bucket in buckets:
+        key = bucket_state_key(ga_client.property_id, bucket, sf_hash)
+        state = store.get(key)
+        if state is None and sf_df is not None:
+            state = _patch_from_previous_export(store, key, sf_df, diffs)
+        if state is not None:
+            delta_keys[bucket] = state.changed_keys
+        if state is None or state.final_through < bucket[0]:
+            fetch_from[bucket] = bucket[0]
+            continue
+        if state.final_through >= bucket[1]:
+            kept[bucket] = state.frame
+            continue
+        frame = state.frame
+        kept[bucket] = frame[frame['Date'] <= pd.Timestamp(state.final_through)]
+        fetch_from[bucket] = _next_day(state.final_through)
+
+    report(buckets_reused=len(buckets) - len(fetch_from))
+    if diffs:
+        report(sf_mobiles_changed=sum(len(mobiles) for mobiles in diffs.values()))
+
+    new_frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+    if fetch_from:
+        fetch_start = min(fetch_from.values())
+        set_stage(f"Fetching GA4 data ({fetch_start} to {end_date})")
+        rows, _ = fetch_ga_data(
+            ga_client,
+            fetch_start,
+            end_date,
+            progress_callback=lambda pages, fetched: report(pages_fetched=pages, rows_fetched=fetched),
+            wait_callback=wait_callback
+        )
+        report(rows_fetched=len(rows))
+
+        # Keep only rows after each bucket's watermark (one fetch can span several buckets)
+        bucket_starts = [bucket[0] for bucket in buckets]
+        new_rows: List[dict] = []
+        for row in rows:
+            index = bisect.bisect_right(bucket_starts, row['Date']) - 1
+            if index < 0:
+                continue
+            bucket = buckets[index]
+            if bucket in fetch_from and row['Date'] >= fetch_from[bucket]:
+                new_rows.append(row)
+        del rows
+
+        set_stage(f"Processing {len(new_rows):,} new GA4 rows")
+        processed = process_ga_data(new_rows, sf_df)
+        del new_rows
+        for bucket in fetch_from:
+            if processed.empty:
+                new_frames[bucket] = processed
+                continue
+            in_bucket = (processed['Date'] >= pd.Timestamp(bucket[0])) & (processed['Date'] <= pd.Timestamp(bucket[1]))
+            new_frames[bucket] = processed[in_bucket]
+
+    # Combine kept winners with genuinely new keys, bucket by bucket
+    bucket_frames = []
+    for bucket in buckets:
+        frame = kept.get(bucket)
+        if bucket in new_frames:
+            new_frame = new_frames[bucket]
+            if frame is not None and not new_frame.empty:
+                # Year and period are fixed within a bucket, so the dedupe key is the mobile
+                new_frame = new_frame[~new_frame['Mobile'].isin(frame['Mobile'])]
+                frame = pd.concat([frame, new_frame]).sort_values('Date', kind='stable')
+            elif frame is None:
+                frame = new_frame
+            frame = frame.reset_index(drop=True)
+            store.put(
+                bucket_state_key(ga_client.property_id, bucket, sf_hash),
+                frame,
+                final_through(bucket[1], today),
+                changed_keys=delta_keys.get(bucket)
+            )
+        if frame is not None and not frame.empty:
+            bucket_frames.append(frame)
+
+    if sf_df is not None:
+        store.remember_salesforce(sf_hash, sf_df)
+
+    if not bucket_frames:
+        return pd.DataFrame()
+    if len(bucket_frames) == 1:
+        return bucket_frames[0]
+    return pd.concat(bucket_frames, ignore_index=True)
@@ -0,0 +1,228 @@
+"""
+Job Runner module for long-running pipeline work.
+Runs jobs on a server-wide worker thread pool so they survive Streamlit
+reruns, and exposes per-stage progress and cooperative cancellation.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Job lifecycle states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = {JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED}
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested"""
+
+
+class Job:
+    """A unit of background work with progress tracking and cancellation"""
+
+    def __init__(self, name: str, owner: Optional[str] = None):
+        """
+        Initialize a job.
+
+        Args:
+            name: Human readable job name
+            owner: Optional owner identifier (e.g. user email)
+        """
+        self.job_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.owner = owner
+        self.status = JOB_QUEUED
+        self.stage = ""
+        self.progress: Dict[str, int] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has finished (successfully or not)"""
+        return self.status in FINISHED_STATES
+
+    @property
+    def cancel_requested(self) -> bool:
+        """Whether cancellation has been requested"""
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> None:
+        """Request cancellation; the job stops at its next checkpoint"""
+        self._cancel_event.set()
+
+    def check_cancelled(self) -> None:
+        """Raise JobCancelled if cancellation has been requested"""
+        if self._cancel_event.is_set():
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+    def set_stage(self, stage: str) -> None:
+        """
+        Move the job to a new stage. Also acts as a cancellation checkpoint.
+
+        Args:
+            stage: Stage description shown to the user
+        """
+        self.check_cancelled()
+        with self._lock:
+            self.stage = stage
+
+    def update_progress(self, **counters: int) -> None:
+        """
+        Set progress counters (e.g. pages_fetched=3, rows_processed=1200).
+        Also acts as a cancellation checkpoint.
+        """
+        self.check_cancelled()
+        with self._lock:
+            self.progress.update(counters)
+
+    def take_result(self) -> Any:
+        """
+        Hand the result over to the caller and drop the job's reference to it,
+        so retained jobs don't keep large results alive.
+        """
+        with self._lock:
+            result, self.result = self.result, None
+            return result
+
+    def snapshot(self) -> dict:
+        """Thread-safe copy of the job's public state"""
+        with self._lock:
+            return {
+                'job_id': self.job_id,
+                'name': self.name,
+                'owner': self.owner,
+                'status': self.status,
+                'stage': self.stage,
+                'progress': dict(self.progress),
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+            }
+
+
+class JobRunner:
+    """Server-wide worker pool that executes Jobs"""
+
+    def __init__(self, max_workers: int = 2, retention_seconds: int = 3600):
+        """
+        Initialize the runner.
+
+        Args:
+            max_workers: Number of worker threads
+            retention_seconds: How long finished jobs stay retrievable
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pnm-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._retention_seconds = retention_seconds
+
+    def submit(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        *args,
+        owner: Optional[str] = None,
+        **kwargs
+    ) -> Job:
+        """
+        Submit work to the pool. fn is called as fn(job, *args, **kwargs)
+        and its return value becomes job.result.
+
+        Args:
+            name: Human readable job name
+            fn: Callable doing the work
+            owner: Optional owner identifier (e.g. user email)
+
+        Returns:
+            The submitted Job
+        """
+        job = Job(name, owner=owner)
+        with self._lock:
+            self._prune()
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        """Execute a job and record its outcome"""
+        job.started_at = time.time()
+        job.status = JOB_RUNNING
+        try:
+            job.check_cancelled()
+            job.result = fn(job, *args, **kwargs)
+            job.status = JOB_COMPLETED
+        except JobCancelled:
+            job.status = JOB_CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = JOB_FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        """Look up a job by ID"""
+        if not job_id:
+            return None
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Request cancellation of a job.
+
+        Returns:
+            True if the job exists and was not already finished
+        """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job.cancel()
+        return True
+
+    def jobs_for_owner(self, owner: str, active_only: bool = False) -> List[Job]:
+        """Jobs submitted by an owner, newest first"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.owner == owner]
+        if active_only:
+            jobs = [job for job in jobs if not job.done]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the retention window (caller holds lock)"""
+        cutoff = time.time() - self._retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.done and (job.finished_at or 0) < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """
+    Get the process-wide job runner.
+    Kept outside st.cache_resource so "Clear Cache" can't orphan running jobs.
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
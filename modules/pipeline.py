@@ -0,0 +1,214 @@
+"""
+Pipeline module for the fetch -> process -> map workflow.
+Free of Streamlit UI calls so it can run on background workers.
+"""
+import io
+from typing import Optional
+
+import pandas as pd
+
+from .config import SF_REQUIRED_COLUMNS
+from .data_processor import get_ne_columns, get_bhk_columns, get_bimonth_date_range
+from .dataset_registry import (
+    get_dataset_registry, fingerprint_bytes, make_dataset_key, make_enrichment_key
+)
+from .dataset_store import DatasetStore
+from .ga4_cache import ttl_for_range
+from .incremental import process_range_incrementally, changed_keys_for
+from .snapshots import load_snapshot_frame, save_snapshot
+from .job_runner import Job
+
+
+def read_csv_bytes(data: bytes, encoding: str) -> pd.DataFrame:
+    """
+    Parse uploaded CSV content.
+
+    Args:
+        data: Raw file bytes
+        encoding: Text encoding of the file
+
+    Returns:
+        Parsed DataFrame
+    """
+    return pd.read_csv(io.BytesIO(data), encoding=encoding)
+
+
+def load_salesforce_csv(data: bytes) -> pd.DataFrame:
+    """
+    Parse and validate a Salesforce export.
+
+    Args:
+        data: Raw file bytes
+
+    Returns:
+        Salesforce DataFrame
+
+    Raises:
+        ValueError: If required columns are missing
+    """
+    sf_df = read_csv_bytes(data, 'latin1')
+
+    missing_cols = [col for col in SF_REQUIRED_COLUMNS if col not in sf_df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing required columns in Salesforce file: {missing_cols}")
+
+    return sf_df
+
+
+def _map_enrichment(dataset: DatasetStore, kind: str, data: bytes, build_fn) -> bool:
+    """
+    Attach NE/BHK columns to a dataset, sharing them across sessions when the
+    dataset itself is shared.
+
+    Args:
+        dataset: Target DatasetStore
+        kind: 'ne' or 'bhk'
+        data: Uploaded file content
+        build_fn: Callable(base_df, uploaded_df) returning the column dict
+
+    Returns:
+        True if the columns were reused from another session
+    """
+    def build():
+        return build_fn(dataset.base, read_csv_bytes(data, 'utf-8-sig'))
+
+    setter = dataset.set_ne_columns if kind == 'ne' else dataset.set_bhk_columns
+    if dataset.key is None:
+        setter(build())
+        return False
+
+    registry = get_dataset_registry()
+    key = make_enrichment_key(dataset.key, kind, fingerprint_bytes(data))
+    # Enrichment expires with the frame it was mapped onto (key[2] is the range end)
+    ttl = registry.remaining_ttl(dataset.key, default=ttl_for_range(dataset.key[2]))
+    columns, reused = registry.get_or_build(key, build, ttl)
+    dataset.hold(kind, registry, key, columns)
+    setter(columns)
+    return reused
+
+
+def map_ne_into_dataset(dataset: DatasetStore, ne_bytes: bytes) -> bool:
+    """
+    Map an NE export onto a dataset.
+
+    Args:
+        dataset: Target DatasetStore
+        ne_bytes: NE CSV content
+
+    Returns:
+        True if the columns were reused from another session
+    """
+    return _map_enrichment(dataset, 'ne', ne_bytes, get_ne_columns)
+
+
+def map_bhk_into_dataset(dataset: DatasetStore, bhk_bytes: bytes) -> bool:
+    """
+    Map a BHK export onto a dataset.
+
+    Args:
+        dataset: Target DatasetStore
+        bhk_bytes: BHK CSV content
+
+    Returns:
+        True if the columns were reused from another session
+    """
+    return _map_enrichment(dataset, 'bhk', bhk_bytes, get_bhk_columns)
+
+
+def run_fetch_and_process(
+    job: Job,
+    ga_client,
+    start_date,
+    end_date,
+    sf_bytes: bytes,
+    ne_bytes: Optional[bytes] = None,
+    bhk_bytes: Optional[bytes] = None
+) -> dict:
+    """
+    Fetch GA4 data for the expanded bi-month range, map Salesforce, then
+    optionally map NE and BHK. Reports progress and honours cancellation
+    through the job. Results for identical inputs are shared with other
+    sessions through the dataset registry, or reloaded from a local snapshot
+    while the GA4 data in it is still current, instead of being rebuilt.
+    When the Salesforce export replaces one mapped earlier in this process,
+    dataset.sf_changed_keys lists the keys whose Status/Shifting_Type changed.
+
+    Args:
+        job: Job used for stage/progress reporting and cancellation
+        ga_client: GA4Client instance
+        start_date: Start date (datetime.date or 'YYYY-MM-DD')
+        end_date: End date (datetime.date or 'YYYY-MM-DD')
+        sf_bytes: Salesforce CSV content
+        ne_bytes: Optional NE CSV content
+        bhk_bytes: Optional BHK CSV content
+
+    Returns:
+        Dict with 'dataset' (DatasetStore), 'warnings' (list of str) and
+        'reused' (True if the GA-SF frame came from another session)
+
+    Raises:
+        ValueError: On invalid input or when GA4 returns no data
+    """
+    warnings = []
+    expanded_start, expanded_end = get_bimonth_date_range(start_date, end_date)
+    registry = get_dataset_registry()
+    sf_hash = fingerprint_bytes(sf_bytes)
+    key = make_dataset_key(ga_client.property_id, expanded_start, expanded_end, sf_hash)
+    ttl = ttl_for_range(expanded_end)
+
+    def build_base() -> pd.DataFrame:
+        job.set_stage("Checking local snapshots")
+        snapshot_df = load_snapshot_frame(key, max_age_seconds=ttl)
+        if snapshot_df is not None:
+            return snapshot_df
+
+        job.set_stage("Loading Salesforce data")
+        sf_df = load_salesforce_csv(sf_bytes)
+        job.update_progress(sf_rows=len(sf_df))
+
+        # Only days not already final in the per-bucket state are fetched and processed
+        df = process_range_incrementally(
+            ga_client,
+            expanded_start,
+            expanded_end,
+            sf_df,
+            sf_hash,
+            set_stage=job.set_stage,
+            progress_callback=job.update_progress,
+            wait_callback=job.check_cancelled
+        )
+        if df.empty:
+            raise ValueError("No GA4 data found for the selected date range.")
+        return df
+
+    job.set_stage("Checking for shared results")
+    base_df, reused = registry.get_or_build(key, build_base, ttl, wait_callback=job.check_cancelled)
+    dataset = DatasetStore(base_df, key=key)
+    dataset.hold('base', registry, key, base_df)
+    dataset.sf_changed_keys = changed_keys_for(ga_client.property_id, expanded_start, expanded_end, sf_hash)
+    job.update_progress(rows_processed=len(base_df))
+
+    # Process NE data if uploaded
+    if ne_bytes is not None:
+        job.set_stage("Mapping NE data")
+        try:
+            map_ne_into_dataset(dataset, ne_bytes)
+        except Exception as e:
+            warnings.append(f"Error processing NE data: {str(e)}")
+
+    # Process BHK data if uploaded
+    if bhk_bytes is not None:
+        job.set_stage("Mapping BHK data")
+        try:
+            map_bhk_into_dataset(dataset, bhk_bytes)
+        except Exception as e:
+            warnings.append(f"Error processing BHK data: {str(e)}")
+
+    job.set_stage("Saving snapshot")
+    try:
+        save_snapshot(dataset)
+    except Exception as e:
+        warnings.append(f"Could not save local snapshot: {str(e)}")
+
+    job.set_stage("Done")
+    return {'dataset': dataset, 'warnings': warnings, 'reused': reused}
@@ -0,0 +1,200 @@
+"""
+Refresh Scheduler module for keeping recent data precomputed.
+An optional background thread in the server process re-runs Fetch & Process
+for the trailing N days on an interval, using the Salesforce/NE/BHK files
+from the most recent interactive run. The latest result stays referenced in
+the shared caches so new sessions can open it without waiting.
+"""
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Callable, Optional, Tuple
+
+from .config import SCHEDULER_STATE_DIR, get_scheduler_settings
+from .dataset_store import DatasetStore
+from .job_runner import Job, JobCancelled
+from .pipeline import run_fetch_and_process
+
+
+SCHEDULER_OWNER = "scheduler"
+
+_INPUT_FILES = {'sf': "sf.csv", 'ne': "ne.csv", 'bhk': "bhk.csv"}
+_inputs_lock = threading.Lock()
+
+
+def remember_inputs(sf_bytes: bytes, ne_bytes: Optional[bytes] = None, bhk_bytes: Optional[bytes] = None) -> None:
+    """
+    Store the latest uploaded files for scheduled refreshes (kept on disk so
+    they survive a server restart).
+
+    Args:
+        sf_bytes: Salesforce CSV content
+        ne_bytes: Optional NE CSV content
+        bhk_bytes: Optional BHK CSV content
+    """
+    contents = {'sf': sf_bytes, 'ne': ne_bytes, 'bhk': bhk_bytes}
+    with _inputs_lock:
+        os.makedirs(SCHEDULER_STATE_DIR, exist_ok=True)
+        for name, filename in _INPUT_FILES.items():
+            path = os.path.join(SCHEDULER_STATE_DIR, filename)
+            if contents[name] is None:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(contents[name])
+            os.replace(tmp_path, path)
+
+
+def load_inputs() -> Optional[Tuple[bytes, Optional[bytes], Optional[bytes]]]:
+    """
+    Latest remembered inputs.
+
+    Returns:
+        Tuple of (sf_bytes, ne_bytes, bhk_bytes), or None if no run has been remembered
+    """
+    contents = {}
+    with _inputs_lock:
+        for name, filename in _INPUT_FILES.items():
+            try:
+                with open(os.path.join(SCHEDULER_STATE_DIR, filename), 'rb') as f:
+                    contents[name] = f.read()
+            except FileNotFoundError:
+                contents[name] = None
+    if contents['sf'] is None:
+        return None
+    return contents['sf'], contents['ne'], contents['bhk']
+
+
+class RefreshScheduler:
+    """Background thread that periodically refreshes the trailing N days"""
+
+    def __init__(self, client_factory: Callable[[], object], interval_minutes: int, trailing_days: int):
+        """
+        Initialize the scheduler.
+
+        Args:
+            client_factory: Zero-argument callable returning a GA4Client
+            interval_minutes: Minutes between refreshes
+            trailing_days: Number of days ending yesterday to refresh
+        """
+        self.interval_seconds = max(60, interval_minutes * 60)
+        self.trailing_days = trailing_days
+        self._client_factory = client_factory
+        self._ga_client = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._latest: Optional[DatasetStore] = None
+        self.current_job: Optional[Job] = None
+        self.last_refreshed: Optional[float] = None
+        self.last_range: Optional[Tuple[str, str]] = None
+        self.last_error: Optional[str] = None
+        self.next_run: Optional[float] = None
+
+    def start(self) -> None:
+        """Start the refresh thread (no-op if already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="pnm-refresh-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the refresh thread after the current refresh"""
+        self._stop.set()
+        if self.current_job is not None:
+            self.current_job.cancel()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self.next_run = time.time() + self.interval_seconds
+            self._stop.wait(self.interval_seconds)
+
+    def run_once(self) -> bool:
+        """
+        Refresh the trailing window now.
+
+        Returns:
+            True if a new result was produced
+        """
+        inputs = load_inputs()
+        if inputs is None:
+            self.last_error = "Waiting for a first Fetch & Process to learn the input files"
+            return False
+
+        end_date = date.today() - timedelta(days=1)
+        start_date = end_date - timedelta(days=self.trailing_days - 1)
+        job = Job("Scheduled Refresh", owner=SCHEDULER_OWNER)
+        self.current_job = job
+        try:
+            if self._ga_client is None:
+                self._ga_client = self._client_factory()
+            result = run_fetch_and_process(job, self._ga_client, start_date, end_date, *inputs)
+        except JobCancelled:
+            return False
+        except Exception as e:
+            self.last_error = f"Scheduled refresh failed: {str(e)}"
+            return False
+        finally:
+            self.current_job = None
+
+        with self._lock:
+            # Holding the result keeps its frames referenced in the dataset registry
+            self._latest = result['dataset']
+            self.last_refreshed = time.time()
+            self.last_range = (str(start_date), str(end_date))
+            self.last_error = "; ".join(result['warnings']) or None
+        return True
+
+    def latest_dataset(self) -> Optional[DatasetStore]:
+        """
+        The most recent refresh result for a session to use.
+
+        Returns:
+            A clone of the latest DatasetStore (safe to map NE/BHK on), or None
+        """
+        with self._lock:
+            if self._latest is None:
+                return None
+            return self._latest.clone()
+
+    def status(self) -> dict:
+        """Scheduler status for display"""
+        return {
+            'running': self.current_job is not None,
+            'last_refreshed': self.last_refreshed,
+            'last_range': self.last_range,
+            'last_error': self.last_error,
+            'next_run': self.next_run,
+            'trailing_days': self.trailing_days,
+            'interval_seconds': self.interval_seconds,
+        }
+
+
+_scheduler: Optional[RefreshScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_refresh_scheduler(client_factory: Optional[Callable[[], object]] = None) -> Optional[RefreshScheduler]:
+    """
+    Get the process-wide scheduler, starting it on first use when enabled in
+    secrets. Returns None when scheduling is disabled.
+
+    Args:
+        client_factory: GA4Client factory used when the scheduler is first created
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            settings = get_scheduler_settings()
+            if not settings['enabled'] or client_factory is None:
+                return None
+            _scheduler = RefreshScheduler(
+                client_factory, settings['interval_minutes'], settings['trailing_days']
+            )
+            _scheduler.start()
+        return _scheduler
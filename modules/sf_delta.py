@@ -0,0 +1,118 @@
+"""
+Salesforce Delta module for remapping only what a new export changed.
+Diffs a newly uploaded Salesforce export against the previous one by row
+fingerprint, re-runs priority dedupe for the affected mobiles only, and
+patches Status/Shifting_Type on already processed frames. The (Mobile,
+Month, Year) keys whose values changed can then be merged on their own.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import SF_REQUIRED_COLUMNS
+from .data_processor import build_salesforce_lookup, lookup_salesforce_columns
+
+
+SF_KEY_COLUMNS = ['Mobile', 'Month', 'Year']
+
+
+def sf_row_fingerprints(sf_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fingerprint every Salesforce row over the columns used for mapping.
+
+    Args:
+        sf_df: Salesforce DataFrame
+
+    Returns:
+        DataFrame with Mobile (as mapped) and a uint64 _Fingerprint per row
+    """
+    columns = sf_df[SF_REQUIRED_COLUMNS].astype(str)
+    return pd.DataFrame({
+        'Mobile': columns['Mobile'].to_numpy(),
+        '_Fingerprint': pd.util.hash_pandas_object(columns, index=False).to_numpy(),
+    })
+
+
+def changed_mobiles(old_sf_df: pd.DataFrame, new_sf_df: pd.DataFrame) -> pd.Index:
+    """
+    Mobiles whose Salesforce rows differ between two exports (added, removed
+    or edited rows; row order is ignored).
+
+    Args:
+        old_sf_df: Previously mapped Salesforce export
+        new_sf_df: Newly uploaded Salesforce export
+
+    Returns:
+        Index of changed mobiles (as strings)
+    """
+    old_rows = sf_row_fingerprints(old_sf_df).assign(_Count=-1)
+    new_rows = sf_row_fingerprints(new_sf_df).assign(_Count=1)
+
+    # Rows present in both exports cancel out; any remainder marks its mobile as changed
+    counts = pd.concat([old_rows, new_rows], ignore_index=True).groupby(
+        ['Mobile', '_Fingerprint'], sort=False
+    )['_Count'].sum()
+    changed = counts[counts != 0].index.get_level_values('Mobile')
+    return pd.Index(changed.unique())
+
+
+def apply_salesforce_delta(
+    frame: pd.DataFrame,
+    new_sf_df: pd.DataFrame,
+    mobiles: pd.Index
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Re-map Status/Shifting_Type for the rows of the changed mobiles.
+    Only those two columns are replaced; every other column is shared with
+    the input frame, which is left untouched.
+
+    Args:
+        frame: Processed GA-SF frame mapped against the previous export
+        new_sf_df: Newly uploaded Salesforce export
+        mobiles: Output of changed_mobiles
+
+    Returns:
+        Tuple of (patched frame, DataFrame of the (Mobile, Month, Year) keys
+        whose Status or Shifting_Type changed)
+    """
+    if frame.empty or len(mobiles) == 0:
+        return frame, pd.DataFrame(columns=SF_KEY_COLUMNS)
+
+    affected = frame['Mobile'].astype(str).isin(mobiles).to_numpy()
+    if not affected.any():
+        return frame, pd.DataFrame(columns=SF_KEY_COLUMNS)
+
+    # Dedupe only the changed mobiles' rows of the new export
+    sf_subset = new_sf_df[new_sf_df['Mobile'].astype(str).isin(mobiles)]
+    lookup = build_salesforce_lookup(sf_subset)
+    remapped = lookup_salesforce_columns(frame[affected], lookup)
+
+    patched = frame.copy(deep=False)
+    changed = np.zeros(len(frame), dtype=bool)
+    for col, values in remapped.items():
+        column = frame[col].to_numpy(dtype=object, copy=True)
+        changed[affected] |= column[affected] != values
+        column[affected] = values
+        patched[col] = column
+
+    keys = frame.loc[changed, SF_KEY_COLUMNS].reset_index(drop=True)
+    return patched, keys
+
+
+def select_changed_rows(df: pd.DataFrame, keys: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Rows of a frame (or one of its NE/BHK views) whose key is in keys.
+
+    Args:
+        df: Frame with Mobile, Month and Year columns
+        keys: DataFrame of (Mobile, Month, Year) keys
+
+    Returns:
+        Matching rows (empty if keys is None or empty)
+    """
+    if keys is None or keys.empty:
+        return df.iloc[0:0]
+    key_index = pd.MultiIndex.from_frame(keys[SF_KEY_COLUMNS].astype({'Mobile': str}))
+    row_index = pd.MultiIndex.from_arrays([df['Mobile'].astype(str), df['Month'], df['Year']])
+    return df[row_index.isin(key_index)]
@@ -0,0 +1,281 @@
+"""
+Snapshots module for persisting processed datasets to local disk.
+Writes the GA-SF base frame and NE/BHK enrichment columns as uncompressed
+Arrow IPC files keyed by the dataset registry key, so a browser refresh,
+server restart or "Clear Cache" can restore them through memory-mapped
+reads instead of re-running the pipeline.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .config import SNAPSHOT_DIR, SNAPSHOT_MAX_AGE_DAYS, SNAPSHOT_MAX_COUNT
+from .dataset_registry import get_dataset_registry, make_enrichment_key
+from .dataset_store import DatasetStore
+from .ga4_cache import ttl_for_range
+
+
+META_FILE = "meta.json"
+BASE_FILE = "base.arrow"
+ENRICHMENT_SLOTS = ('ne', 'bhk')
+
+_write_lock = threading.Lock()
+
+
+def snapshot_id_for(key: tuple) -> str:
+    """
+    Directory name of the snapshot for a dataset registry key.
+
+    Args:
+        key: Key from make_dataset_key
+
+    Returns:
+        Snapshot ID
+    """
+    return hashlib.sha256(json.dumps(list(key)).encode('utf-8')).hexdigest()[:20]
+
+
+def _snapshot_dir(snapshot_id: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, snapshot_id)
+
+
+def _write_table(table: pa.Table, path: str) -> None:
+    """Write an Arrow IPC file atomically (uncompressed so it can be memory mapped)"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_table(path: str) -> pd.DataFrame:
+    """
+    Read an Arrow IPC file through a memory map. Numeric and Arrow-backed
+    string columns reference the mapped pages instead of being copied.
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _read_meta(snapshot_id: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(_snapshot_dir(snapshot_id), META_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(snapshot_id: str, meta: dict) -> None:
+    path = os.path.join(_snapshot_dir(snapshot_id), META_FILE)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, path)
+
+
+def _touch(snapshot_id: str) -> None:
+    """Mark a snapshot as recently used for the retention policy"""
+    meta = _read_meta(snapshot_id)
+    if meta is not None:
+        meta['used_at'] = time.time()
+        _write_meta(snapshot_id, meta)
+
+
+def save_snapshot(dataset: DatasetStore) -> Optional[str]:
+    """
+    Persist a shared dataset and its enrichment columns. The base frame is
+    only written once per key; enrichment files are rewritten when a different
+    NE/BHK upload was mapped.
+
+    Args:
+        dataset: DatasetStore whose base frame came from the dataset registry
+
+    Returns:
+        Snapshot ID, or None if the dataset has no registry key
+    """
+    if dataset.key is None:
+        return None
+
+    snapshot_id = snapshot_id_for(dataset.key)
+    directory = _snapshot_dir(snapshot_id)
+
+    with _write_lock:
+        os.makedirs(directory, exist_ok=True)
+        meta = _read_meta(snapshot_id) or {
+            'key': list(dataset.key),
+            'start_date': dataset.key[1],
+            'end_date': dataset.key[2],
+            'rows': len(dataset.base),
+            'created_at': time.time(),
+            'enrichment': {},
+        }
+
+        base_path = os.path.join(directory, BASE_FILE)
+        if not os.path.exists(base_path):
+            _write_table(pa.Table.from_pandas(dataset.base, preserve_index=True), base_path)
+
+        for slot in ENRICHMENT_SLOTS:
+            columns = dataset.enrichment_columns(slot)
+            held_key = dataset.held_key(slot)
+            if columns is None or held_key is None:
+                continue
+            content_hash = held_key[-1]
+            if meta['enrichment'].get(slot) == content_hash:
+                continue
+            table = pa.table({col: pa.array(values, from_pandas=True) for col, values in columns.items()})
+            _write_table(table, os.path.join(directory, f"{slot}.arrow"))
+            meta['enrichment'][slot] = content_hash
+
+        meta['used_at'] = time.time()
+        _write_meta(snapshot_id, meta)
+
+    prune_snapshots(keep_id=snapshot_id)
+    return snapshot_id
+
+
+def load_snapshot_frame(key: tuple, max_age_seconds: Optional[float] = None) -> Optional[pd.DataFrame]:
+    """
+    Load the base frame saved for a dataset key, if present and recent enough.
+
+    Args:
+        key: Key from make_dataset_key
+        max_age_seconds: Ignore snapshots created longer ago than this
+
+    Returns:
+        Base frame or None
+    """
+    snapshot_id = snapshot_id_for(key)
+    meta = _read_meta(snapshot_id)
+    if meta is None or tuple(meta['key']) != tuple(key):
+        return None
+    if max_age_seconds is not None and time.time() - meta['created_at'] > max_age_seconds:
+        return None
+
+    try:
+        df = _read_table(os.path.join(_snapshot_dir(snapshot_id), BASE_FILE))
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+    _touch(snapshot_id)
+    return df
+
+
+def _load_enrichment(snapshot_id: str, slot: str) -> Dict[str, np.ndarray]:
+    df = _read_table(os.path.join(_snapshot_dir(snapshot_id), f"{slot}.arrow"))
+    return {col: df[col].to_numpy() for col in df.columns}
+
+
+def restore_snapshot(snapshot_id: str) -> DatasetStore:
+    """
+    Rebuild a DatasetStore from a snapshot. The frames are registered in the
+    dataset registry so other sessions restoring or fetching the same inputs
+    share them.
+
+    Args:
+        snapshot_id: ID from list_snapshots
+
+    Returns:
+        Restored DatasetStore
+
+    Raises:
+        ValueError: If the snapshot is missing or unreadable
+    """
+    meta = _read_meta(snapshot_id)
+    if meta is None:
+        raise ValueError(f"Snapshot {snapshot_id} not found")
+
+    key = tuple(meta['key'])
+    registry = get_dataset_registry()
+    # Shared only for as long as a fresh fetch of the same range would be
+    age = time.time() - meta['created_at']
+    ttl = max(0, int(ttl_for_range(meta['end_date']) - age))
+
+    def build_base() -> pd.DataFrame:
+        try:
+            return _read_table(os.path.join(_snapshot_dir(snapshot_id), BASE_FILE))
+        except (OSError, pa.ArrowInvalid) as e:
+            raise ValueError(f"Snapshot {snapshot_id} is unreadable: {str(e)}")
+
+    base_df, _ = registry.get_or_build(key, build_base, ttl)
+    dataset = DatasetStore(base_df, key=key)
+    dataset.hold('base', registry, key, base_df)
+
+    for slot, content_hash in meta.get('enrichment', {}).items():
+        enrichment_key = make_enrichment_key(key, slot, content_hash)
+        columns, _ = registry.get_or_build(
+            enrichment_key, lambda slot=slot: _load_enrichment(snapshot_id, slot), ttl
+        )
+        dataset.hold(slot, registry, enrichment_key, columns)
+        if slot == 'ne':
+            dataset.set_ne_columns(columns)
+        else:
+            dataset.set_bhk_columns(columns)
+
+    _touch(snapshot_id)
+    return dataset
+
+
+def list_snapshots() -> List[dict]:
+    """
+    Saved snapshots, most recently used first.
+
+    Returns:
+        List of dicts with id, start_date, end_date, rows, has_ne, has_bhk,
+        created_at and used_at
+    """
+    try:
+        snapshot_ids = os.listdir(SNAPSHOT_DIR)
+    except FileNotFoundError:
+        return []
+
+    snapshots = []
+    for snapshot_id in snapshot_ids:
+        meta = _read_meta(snapshot_id)
+        if meta is None:
+            continue
+        snapshots.append({
+            'id': snapshot_id,
+            'start_date': meta['start_date'],
+            'end_date': meta['end_date'],
+            'rows': meta['rows'],
+            'has_ne': 'ne' in meta.get('enrichment', {}),
+            'has_bhk': 'bhk' in meta.get('enrichment', {}),
+            'created_at': meta['created_at'],
+            'used_at': meta.get('used_at', meta['created_at']),
+        })
+    return sorted(snapshots, key=lambda snapshot: snapshot['used_at'], reverse=True)
+
+
+def prune_snapshots(keep_id: Optional[str] = None) -> int:
+    """
+    Apply the retention policy: delete snapshots unused for SNAPSHOT_MAX_AGE_DAYS
+    and the least recently used ones beyond SNAPSHOT_MAX_COUNT.
+
+    Args:
+        keep_id: Snapshot that must survive (e.g. the one just written)
+
+    Returns:
+        Number of snapshots deleted
+    """
+    cutoff = time.time() - SNAPSHOT_MAX_AGE_DAYS * 86400
+    removed = 0
+    for index, snapshot in enumerate(list_snapshots()):
+        if snapshot['id'] == keep_id:
+            continue
+        if snapshot['used_at'] < cutoff or index >= SNAPSHOT_MAX_COUNT:
+            shutil.rmtree(_snapshot_dir(snapshot['id']), ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,184 @@
+"""
+Upload Ledger module for making repeated uploads no-ops.
+Records a content fingerprint of every frame merged into a table, with its
+row count, Date range, time and merge stats. Submitting the same frame to
+the same table again returns the recorded stats without loading or merging
+anything, as long as no later upload overlapped its Date range.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .config import UPLOAD_LEDGER_PATH, UPLOAD_LEDGER_MAX_ENTRIES
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the ledger then never skips uploads
+    fcntl = None
+
+
+def fingerprint_frame(df: pd.DataFrame) -> str:
+    """
+    Content hash of a DataFrame (column names, dtypes and values, in row order).
+
+    Args:
+        df: Frame about to be uploaded
+
+    Returns:
+        Hex fingerprint
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:32]
+
+
+def _overlaps(a: Optional[List[str]], b: Optional[List[str]]) -> bool:
+    """Whether two Date ranges intersect (None covers every date)"""
+    if a is None or b is None:
+        return True
+    return a[0] <= b[1] and b[0] <= a[1]
+
+
+class UploadLedger:
+    """
+    Recent uploads per table, kept in a JSON file so the dashboard and batch
+    runs on the same host share it. Every read-modify-write holds an
+    exclusive lock on a sidecar lock file, so one process can't write back
+    entries another has just invalidated.
+    """
+
+    def __init__(self, path: str = UPLOAD_LEDGER_PATH, max_entries: int = UPLOAD_LEDGER_MAX_ENTRIES):
+        """
+        Initialize the ledger.
+
+        Args:
+            path: Ledger file
+            max_entries: Uploads remembered per table
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        """Hold the ledger lock across threads and processes"""
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(f"{self.path}.lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> Dict[str, List[dict]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, tables: Dict[str, List[dict]]) -> None:
+        """Atomically replace the ledger file"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(tables, f, default=str)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, table_ref: str, fingerprint: str) -> Optional[dict]:
+        """
+        The recorded upload of a frame to a table, if it still applies.
+
+        Args:
+            table_ref: Backend-qualified table name (StorageBackend.table_ref)
+            fingerprint: fingerprint_frame of the frame
+
+        Returns:
+            Ledger entry (fingerprint, rows, date_bounds, uploaded_at, stats), or
+            None (always None where the file can't be locked)
+        """
+        if fcntl is None:
+            return None
+        with self._locked(exclusive=False):
+            for entry in self._read().get(table_ref, []):
+                if entry['fingerprint'] == fingerprint:
+                    return entry
+        return None
+
+    def record(
+        self,
+        table_ref: str,
+        fingerprint: str,
+        rows: int,
+        date_bounds: Optional[Tuple[str, str]],
+        stats: dict
+    ) -> None:
+        """
+        Record a successful upload. Earlier uploads whose Date range overlaps
+        it may have been overwritten, so their entries are dropped.
+
+        Args:
+            table_ref: Backend-qualified table name
+            fingerprint: fingerprint_frame of the uploaded frame
+            rows: Rows uploaded
+            date_bounds: Date range the upload could change (None for the whole table)
+            stats: Stats returned by the upload
+        """
+        if fcntl is None:
+            return
+        bounds = list(date_bounds) if date_bounds is not None else None
+        with self._locked(exclusive=True):
+            tables = self._read()
+            entries = [e for e in tables.get(table_ref, []) if not _overlaps(e['date_bounds'], bounds)]
+            entries.append({
+                'fingerprint': fingerprint,
+                'rows': rows,
+                'date_bounds': bounds,
+                'uploaded_at': time.time(),
+                'stats': stats,
+            })
+            tables[table_ref] = entries[-self.max_entries:]
+            self._write(tables)
+
+    def invalidate(self, table_ref: Optional[str] = None, date_bounds: Optional[Tuple[str, str]] = None) -> None:
+        """
+        Forget recorded uploads.
+
+        Args:
+            table_ref: Table to forget, or None for every table
+            date_bounds: Only forget the table's uploads overlapping this Date range
+        """
+        if fcntl is None:
+            return
+        with self._locked(exclusive=True):
+            tables = self._read()
+            if table_ref is None:
+                tables = {}
+            elif date_bounds is None:
+                tables.pop(table_ref, None)
+            else:
+                bounds = list(date_bounds)
+                tables[table_ref] = [e for e in tables.get(table_ref, []) if not _overlaps(e['date_bounds'], bounds)]
+            self._write(tables)
+
+
+_upload_ledger: Optional[UploadLedger] = None
+_upload_ledger_lock = threading.Lock()
+
+
+def get_upload_ledger() -> UploadLedger:
+    """Get the process-wide upload ledger"""
+    global _upload_ledger
+    with _upload_ledger_lock:
+        if _upload_ledger is None:
+            _upload_ledger = UploadLedger()
+        return _upload_ledger
@@ -0,0 +1,126 @@
+"""
+Upload Telemetry module for finding slow or expensive upload steps.
+Every upload reports one record per job it ran (staging loads, merge
+stats, row count, MERGE, cleanup) with its wall time, queue time, bytes
+processed, slot time and affected rows. Records are returned with the
+upload stats, appended to a local JSONL log and summarized per step.
+"""
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from .config import get_telemetry_settings
+
+
+_log_lock = threading.Lock()
+
+
+def step_record(
+    step: str,
+    started: Optional[float],
+    ended: Optional[float],
+    queue_ms: Optional[float] = None,
+    bytes_processed: Optional[int] = None,
+    slot_ms: Optional[int] = None,
+    rows_affected: Optional[int] = None,
+    job_id: Optional[str] = None
+) -> dict:
+    """
+    Telemetry record of one job.
+
+    Args:
+        step: Upload step the job belongs to (setup, load, count, stats, merge, cleanup)
+        started: Start time (epoch seconds)
+        ended: End time (epoch seconds)
+        queue_ms: Time between creation and start
+        bytes_processed: Bytes read by a query, or written by a load
+        slot_ms: Slot time consumed
+        rows_affected: Rows changed by DML, or written by a load
+        job_id: Warehouse job ID, if any
+
+    Returns:
+        Record dict
+    """
+    wall_ms = (ended - started) * 1000 if started is not None and ended is not None else None
+    return {
+        'step': step,
+        'job_id': job_id,
+        'started': started,
+        'ended': ended,
+        'wall_ms': round(wall_ms, 1) if wall_ms is not None else None,
+        'queue_ms': round(queue_ms, 1) if queue_ms is not None else None,
+        'bytes_processed': bytes_processed,
+        'slot_ms': slot_ms,
+        'rows_affected': rows_affected,
+    }
+
+
+def summarize_steps(records: List[dict]) -> List[dict]:
+    """
+    Per-step breakdown of an upload's job records, in the order steps ran.
+    Elapsed time spans the step's first start to its last end, so parallel
+    load jobs aren't double counted.
+
+    Args:
+        records: Records from step_record
+
+    Returns:
+        List of dicts with step, jobs, elapsed_s, queue_s, bytes_processed,
+        slot_ms and rows_affected
+    """
+    steps = {}
+    for record in records:
+        steps.setdefault(record['step'], []).append(record)
+
+    def total(values):
+        values = [v for v in values if v is not None]
+        return sum(values) if values else None
+
+    summary = []
+    for step, step_records in steps.items():
+        starts = [r['started'] for r in step_records if r['started'] is not None]
+        ends = [r['ended'] for r in step_records if r['ended'] is not None]
+        queue_ms = total(r['queue_ms'] for r in step_records)
+        summary.append({
+            'step': step,
+            'jobs': len(step_records),
+            'elapsed_s': round(max(ends) - min(starts), 2) if starts and ends else None,
+            'queue_s': round(queue_ms / 1000, 2) if queue_ms is not None else None,
+            'bytes_processed': total(r['bytes_processed'] for r in step_records),
+            'slot_ms': total(r['slot_ms'] for r in step_records),
+            'rows_affected': total(r['rows_affected'] for r in step_records),
+        })
+    return summary
+
+
+def log_upload_telemetry(table_ref: str, records: List[dict], success: bool) -> List[dict]:
+    """
+    Append an upload's job records to the telemetry log.
+
+    Args:
+        table_ref: Backend-qualified table name
+        records: Records from step_record
+        success: Whether the upload succeeded
+
+    Returns:
+        The logged rows (records tagged with upload_id, table, success and ts)
+    """
+    upload_id = uuid.uuid4().hex
+    ts = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+    rows = [
+        dict(record, upload_id=upload_id, table=table_ref, success=success, ts=ts)
+        for record in records
+    ]
+
+    log_path = get_telemetry_settings()['log_path']
+    directory = os.path.dirname(log_path)
+    with _log_lock:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(log_path, 'a', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+    return rows